@@ -1,5 +1,7 @@
 import asyncio
 import sys
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 # Добавляем корень проекта в PYTHONPATH
@@ -7,23 +9,20 @@ project_root = Path(__file__).parent.parent
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
+from aiogram import Bot
 from loguru import logger
 
 from app.loader import build_bot, build_dp
 from app.utils.config import settings
+from app.utils.logging import setup_logging
 
 
-def setup_logging(level: str = "INFO") -> None:
-    """Настройка loguru."""
-    logger.remove()
-    logger.add(
-        sys.stdout,
-        level=level,
-        backtrace=False,
-        diagnose=False,
-        enqueue=True,
-        format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {level:<8} | {name}:{function}:{line} - {message}",
-    )
+@asynccontextmanager
+async def _phase(name: str):
+    """Замер фазы старта: в лог уходит её длительность."""
+    started = time.perf_counter()
+    yield
+    logger.info(f"Старт: {name} — {(time.perf_counter() - started) * 1000:.0f} мс")
 
 
 async def init_database() -> None:
@@ -31,62 +30,195 @@ async def init_database() -> None:
     Инициализация БД при старте.
     
     БЕЗОПАСНО для перезапуска:
-    - create_all() создаёт таблицы ТОЛЬКО если их нет (данные НЕ удаляются)
+    - миграции применяются только новые (версия в schema_version), данные не трогают;
+      актуальная схема проверяется одним запросом, без блокировки
     - ON CONFLICT DO UPDATE — если админ уже есть, просто обновит флаг
     """
-    from sqlalchemy import text, inspect
-    from app.database.engine import engine, Base, async_session_maker
-    from app.database.models.user import User  # noqa: F401 — нужен для metadata
-    
-    # Проверяем существуют ли таблицы
-    async with engine.begin() as conn:
-        def check_tables(sync_conn):
-            inspector = inspect(sync_conn)
-            return "user" in inspector.get_table_names()
-        
-        tables_exist = await conn.run_sync(check_tables)
-        
-        if tables_exist:
-            logger.info("БД: таблицы уже существуют ✓")
+    from app.database.migrations import LATEST_VERSION, apply_migrations, get_schema_version
+    from app.database.repositories.user import ensure_admins, install_user_status_trigger
+    from app.services.admins import get_config_admin_ids, refresh_admins
+    from app.services.stats import init_stats
+    
+    async with _phase("схема БД"):
+        if settings.db_migrate_on_startup:
+            applied = await apply_migrations()
+            if not applied:
+                logger.info(f"БД: схема актуальна (v{LATEST_VERSION}) ✓")
         else:
-            await conn.run_sync(Base.metadata.create_all)
-            logger.info("БД: таблицы созданы")
-    
-    # Убеждаемся что админы имеют флаг is_admin=true
-    admin_ids = settings.get_admin_ids()
-    if admin_ids:
-        async with async_session_maker() as session:
-            for admin_id in admin_ids:
-                # UPSERT: создать или обновить
-                await session.execute(
-                    text("""
-                        INSERT INTO "user" (id, is_admin, created_at, updated_at)
-                        VALUES (:id, true, timezone('utc', now()), timezone('utc', now()))
-                        ON CONFLICT (id) DO UPDATE SET is_admin = true
-                    """),
-                    {"id": admin_id}
+            version = await get_schema_version()
+            if version < LATEST_VERSION:
+                raise RuntimeError(
+                    f"Схема БД v{version}, нужна v{LATEST_VERSION}: python -m app.scripts migrate"
                 )
-            await session.commit()
-            logger.debug(f"Админы проверены: {admin_ids}")
+    
+    async with _phase("триггеры и статистика"):
+        # Триггер счётчиков статистики + сверка с таблицей
+        await init_stats()
+        # Триггер NOTIFY для кэша статусов пользователей
+        await install_user_status_trigger()
+    
+    async with _phase("админы"):
+        # Админы из конфига получают is_admin=true одним запросом
+        admin_ids = get_config_admin_ids()
+        if admin_ids:
+            await ensure_admins(admin_ids)
+            logger.debug(f"Админы проверены: {sorted(admin_ids)}")
+        # Загружаем админов из БД в память
+        await refresh_admins()
 
 
-async def run_polling() -> None:
-    # Инициализируем БД
+async def on_startup(bot: Bot) -> list[asyncio.Task]:
+    """
+    Общий старт для polling и webhook: всё, что нужно первому апдейту,
+    готовится здесь по фазам (каждая с замером), затем фоновые задачи.
+    """
+    from app.bot.handlers.private.start import WELCOME_PIC_PATH
+    from app.bot.keyboards.inline import prebuild_screens
+    from app.database.engine import warm_up_pool
+    from app.database.listener import run_listener
+    from app.i18n import load_locales, run_locale_watcher
+    from app.services.admins import get_config_admin_ids, run_admin_refresher
+    from app.services.bot_state import load_flags
+    from app.services.gift_outbox import run_gift_workers
+    from app.services.media import prepare_media, preupload_media
+    from app.services.remnawave import run_vpn_mirror
+    from app.services.star_ledger import run_star_ledger_sync, sync_star_balance
+    from app.services.stats import run_stats_reconciler
+    
+    started = time.perf_counter()
+    
+    # Локализации: разворачиваем каталог и проверяем ключи до приёма апдейтов
+    async with _phase("локализации и клавиатуры"):
+        load_locales()
+        logger.debug(f"Экраны собраны: {prebuild_screens()}")
+    
     await init_database()
     
+    async with _phase("пул соединений"):
+        logger.debug(f"Соединений БД открыто: {await warm_up_pool()}")
+    
+    async with _phase("флаги"):
+        await load_flags()
+    
+    async with _phase("медиа"):
+        await prepare_media(WELCOME_PIC_PATH)
+        upload_chat = settings.media_upload_chat_id or min(get_config_admin_ids(), default=None)
+        if upload_chat:
+            await preupload_media(bot, upload_chat, WELCOME_PIC_PATH)
+        else:
+            logger.debug("Медиа: нет чата для загрузки — картинка уйдёт с первым /start")
+    
+    async with _phase("баланс звёзд"):
+        try:
+            stars = await sync_star_balance(bot, reset_reserved=True)
+            logger.info(f"Баланс звёзд: {stars}")
+        except Exception as e:
+            logger.error(f"Не удалось получить баланс звёзд: {e}")
+    
+    logger.info(f"Старт: готово за {(time.perf_counter() - started) * 1000:.0f} мс")
+    
+    background = [
+        asyncio.create_task(run_listener()),
+        asyncio.create_task(run_stats_reconciler()),
+        asyncio.create_task(run_admin_refresher()),
+        asyncio.create_task(run_star_ledger_sync(bot)),
+        asyncio.create_task(run_gift_workers(bot)),
+    ]
+    if settings.vpn_mirror_interval and settings.remnawave_api_url:
+        background.append(asyncio.create_task(run_vpn_mirror()))
+    if settings.i18n_reload_interval:
+        background.append(asyncio.create_task(run_locale_watcher()))
+    return background
+
+
+async def start_health():
+    """Сервер метрик и проб поднимается до старта — /healthz отвечает сразу."""
+    if not settings.metrics_port:
+        return None
+    from app.services.health import start_health_server
+    return await start_health_server()
+
+
+async def stop_health(runner) -> None:
+    from app.services.health import mark_not_ready
+    mark_not_ready()
+    if runner is not None:
+        await runner.cleanup()
+
+
+async def run_polling() -> None:
+    from app.services.health import mark_ready
+    
+    dp = build_dp()
+    bot = build_bot(settings.bot_token)
+    health = await start_health()
+    background = await on_startup(bot)
+    mark_ready()
+    
+    logger.info("🎄 Бот запускается (polling)...")
+    
+    try:
+        await bot.delete_webhook(drop_pending_updates=True)
+        # chat_member не приходит по умолчанию — запрашиваем все используемые типы
+        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+    finally:
+        await stop_health(health)
+        for task in background:
+            task.cancel()
+
+
+async def run_webhook() -> None:
+    from app.bot.webhook import build_webhook_app, wait_for_shutdown_signal
+    from app.services.health import mark_not_ready, mark_ready
+    from aiohttp import web
+    
     dp = build_dp()
     bot = build_bot(settings.bot_token)
+    health = await start_health()
+    background = await on_startup(bot)
     
-    logger.info("🎄 Бот запускается...")
+    app = build_webhook_app(dp, bot)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.webhook_host, settings.webhook_port)
+    await site.start()
     
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    logger.info(
+        f"🎄 Бот запускается (webhook): {settings.webhook_host}:{settings.webhook_port}"
+        f"{settings.webhook_path}"
+    )
+    
+    try:
+        if settings.webhook_url:
+            # Каждая реплика ставит один и тот же URL — операция идемпотентная
+            await bot.set_webhook(
+                url=settings.webhook_url.rstrip("/") + settings.webhook_path,
+                secret_token=settings.webhook_secret,
+                allowed_updates=dp.resolve_used_update_types(),
+            )
+        else:
+            logger.warning("WEBHOOK_URL не задан — вебхук в Telegram не регистрируется")
+        
+        mark_ready()
+        await wait_for_shutdown_signal()
+        # Снимаем реплику с балансировки до остановки приёма апдейтов
+        mark_not_ready()
+        logger.info("Остановка: дожидаемся обработки принятых апдейтов...")
+    finally:
+        # on_shutdown приложения ждёт фоновые апдейты и закрывает сессию бота
+        await runner.cleanup()
+        await stop_health(health)
+        for task in background:
+            task.cancel()
 
 
 def main() -> None:
-    setup_logging(level=settings.log_level)
+    setup_logging()
     logger.info(f"Bot: @{settings.bot_username} | Channel: @{settings.required_channel}")
-    asyncio.run(run_polling())
+    if settings.bot_mode == "webhook":
+        asyncio.run(run_webhook())
+    else:
+        asyncio.run(run_polling())
 
 
 if __name__ == "__main__":
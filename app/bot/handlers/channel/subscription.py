@@ -0,0 +1,21 @@
+"""Отслеживание подписки на канал по событиям chat_member."""
+from aiogram import Router
+from aiogram.types import ChatMemberUpdated
+
+from loguru import logger
+
+from app.services.subscriptions import is_member, is_required_channel, on_member_updated
+
+
+router = Router(name="channel_subscription")
+
+
+@router.chat_member()
+@logger.catch(reraise=True)
+async def on_chat_member(event: ChatMemberUpdated):
+    """Пользователь вступил в канал / вышел из него."""
+    if not is_required_channel(event.chat):
+        return
+
+    member = event.new_chat_member
+    await on_member_updated(member.user.id, is_member(member))
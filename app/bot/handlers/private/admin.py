@@ -1,25 +1,29 @@
 """Админ-команды: статистика, экспорт, баланс, пауза."""
-import csv
-import io
-from datetime import datetime
+import os
+import time
 
 from aiogram import Router, Bot, F
 from aiogram.filters import Command
-from aiogram.types import Message, BufferedInputFile, LabeledPrice, PreCheckoutQuery
+from aiogram.types import Message, FSInputFile, LabeledPrice, PreCheckoutQuery
+
+from html import escape
 
 from loguru import logger
 
-from app.database.repositories.user import (
-    is_admin,
-    get_participants_count,
-    get_gifts_sent_count,
-    get_pending_count,
-    get_all_users,
-    get_pending_gift_users,
-    mark_gift_received,
-)
+from app.database.instrumentation import get_db_metrics
+from app.database.repositories.gift_outbox import get_outbox_counts
+from app.services.admins import is_admin
 from app.services.bot_state import is_bot_paused, set_bot_paused
-from app.i18n import tr
+from app.services.export import commit_export, export_users
+from app.services.gift_drain import (
+    DrainAlreadyRunning,
+    DrainProgress,
+    drain_pending_gifts,
+    is_drain_running,
+)
+from app.services.remnawave import get_vpn_cache_stats, get_vpn_mirror_status
+from app.services.star_ledger import sync_star_balance
+from app.services.stats import get_stats
 from app.utils.config import settings
 
 
@@ -28,9 +32,9 @@ router = Router(name="admin")
 
 # ============ Фильтр админа ============
 
-async def admin_filter(message: Message) -> bool:
-    """Проверка что пользователь — админ."""
-    return await is_admin(message.from_user.id)
+def admin_filter(message: Message) -> bool:
+    """Проверка что пользователь — админ (без обращения к БД)."""
+    return is_admin(message.from_user.id)
 
 
 # ============ /pause — Поставить бота на паузу ============
@@ -43,7 +47,7 @@ async def cmd_pause(message: Message):
         await message.answer("⏸ Бот уже на паузе.")
         return
     
-    set_bot_paused(True)
+    await set_bot_paused(True)
     logger.info(f"Bot paused by admin {message.from_user.id}")
     await message.answer("⏸ <b>Бот поставлен на паузу.</b>\n\nПользователи будут видеть сообщение о паузе.")
 
@@ -58,7 +62,7 @@ async def cmd_resume(message: Message):
         await message.answer("▶️ Бот уже работает.")
         return
     
-    set_bot_paused(False)
+    await set_bot_paused(False)
     logger.info(f"Bot resumed by admin {message.from_user.id}")
     await message.answer("▶️ <b>Бот снят с паузы.</b>\n\nРозыгрыш продолжается!")
 
@@ -69,18 +73,20 @@ async def cmd_resume(message: Message):
 @logger.catch(reraise=True)
 async def cmd_stats(message: Message, bot: Bot):
     """Показать статистику розыгрыша."""
-    total_users = await get_participants_count()
-    gifts_sent = await get_gifts_sent_count()
-    pending = await get_pending_count()
+    stats = await get_stats()
     
     # Баланс звёзд
     try:
-        balance = await bot.get_my_star_balance()
-        star_balance = balance.amount
+        star_balance = await sync_star_balance(bot)
     except Exception as e:
         logger.error(f"Не удалось получить баланс: {e}")
         star_balance = "?"
     
+    outbox = await get_outbox_counts()
+    vpn = get_vpn_cache_stats()
+    mirror = get_vpn_mirror_status()
+    mirror_lag = f"{mirror.lag:.0f} с назад" if mirror.lag is not None else "ещё не было"
+    
     # Статус паузы
     pause_status = "⏸ На паузе" if is_bot_paused() else "▶️ Работает"
     
@@ -88,12 +94,17 @@ async def cmd_stats(message: Message, bot: Bot):
 
 🤖 Статус: <b>{pause_status}</b>
 
-👥 Всего участников: <b>{total_users}</b>
-🎁 Подарков отправлено: <b>{gifts_sent}</b>
-⏳ Ожидают подарок: <b>{pending}</b>
+👥 Всего участников: <b>{stats.participants}</b>
+📢 Подписаны на канал: <b>{stats.subscribed}</b>
+🎁 Подарков отправлено: <b>{stats.gifts_sent}</b>
+⏳ Ожидают подарок: <b>{stats.pending}</b>
+📬 Очередь отправки: <b>{outbox.get("queued", 0)}</b> (отправляются: {outbox.get("sending", 0)}, ошибок: {outbox.get("failed", 0)}, зависли: {outbox.get("stuck", 0)})
 
 ⭐ Баланс бота: <b>{star_balance}</b> звёзд
 💰 Стоимость подарка: <b>{settings.gift_star_cost}</b> звёзд
+
+🔐 Проверки VPN: память <b>{vpn.memory_hits}</b> / БД <b>{vpn.db_hits}</b> / Remnawave <b>{vpn.api_calls}</b> (кэш {vpn.hit_rate:.0%})
+🪞 Зеркало Remnawave: {mirror_lag}, {mirror.last_rows} польз. ({mirror.rows_per_second:.0f}/с)
 """
     
     # Предупреждение если мало звёзд
@@ -103,37 +114,71 @@ async def cmd_stats(message: Message, bot: Bot):
     await message.answer(text)
 
 
+# ============ /db — Метрики БД ============
+
+@router.message(Command("db"), admin_filter)
+@logger.catch(reraise=True)
+async def cmd_db(message: Message):
+    """Пул соединений, ожидание checkout и самые тяжёлые запросы."""
+    metrics = get_db_metrics()
+    wait, ping = metrics.checkout_wait, metrics.pre_ping
+    
+    text = "🗄 <b>База данных</b>\n\n"
+    if metrics.pool:
+        pool = metrics.pool
+        text += (
+            f"Пул: занято <b>{pool.checked_out}</b> / {pool.size} "
+            f"(overflow {pool.overflow}/{settings.db_max_overflow}, свободно {pool.checked_in})\n"
+        )
+    text += (
+        f"Ожидание соединения: p50 {wait.quantile(0.5) * 1000:.1f} мс, "
+        f"p95 {wait.quantile(0.95) * 1000:.1f} мс ({wait.count})\n"
+        f"Pre-ping: p50 {ping.quantile(0.5) * 1000:.1f} мс, p95 {ping.quantile(0.95) * 1000:.1f} мс\n"
+        f"Медленных запросов (≥ {settings.db_slow_query_ms} мс): <b>{metrics.slow_queries}</b>\n"
+    )
+    
+    top = sorted(metrics.statements.items(), key=lambda item: item[1].total, reverse=True)[:5]
+    if top:
+        text += "\n<b>Запросы по суммарному времени:</b>\n"
+        for statement, histogram in top:
+            text += (
+                f"• {histogram.total:.1f} с, {histogram.count} шт., "
+                f"p95 {histogram.quantile(0.95) * 1000:.0f} мс\n"
+                f"<code>{escape(statement[:80])}</code>\n"
+            )
+    
+    await message.answer(text)
+
+
 # ============ /export — Экспорт в CSV ============
 
 @router.message(Command("export"), admin_filter)
 @logger.catch(reraise=True)
 async def cmd_export(message: Message):
-    """Экспорт пользователей в CSV."""
-    users = await get_all_users()
+    """
+    Экспорт пользователей в CSV.
     
-    # Создаём CSV в памяти
-    output = io.StringIO()
-    writer = csv.writer(output)
+    /export — все пользователи
+    /export new — только новые/изменённые с прошлой выгрузки
+    /export gz — сжать в gzip (можно вместе с new)
+    """
+    args = message.text.split()[1:]
+    incremental = "new" in args
+    compress = "gz" in args or settings.export_gzip
     
-    # Заголовки
-    writer.writerow(["user_id", "username", "gift_received", "pending_gift", "created_at"])
+    result = await export_users(incremental=incremental, compress=compress)
     
-    # Данные
-    for user in users:
-        writer.writerow([
-            user.id,
-            user.username or "",
-            "да" if user.gift_received else "нет",
-            "да" if user.pending_gift else "нет",
-            user.created_at.strftime("%Y-%m-%d %H:%M") if user.created_at else "",
-        ])
+    caption = f"📄 Экспорт: {result.rows} пользователей"
+    if result.since:
+        caption += f"\n🕐 С {result.since.strftime('%Y-%m-%d %H:%M')} UTC"
     
-    # Отправляем файл
-    csv_bytes = output.getvalue().encode("utf-8-sig")  # BOM для Excel
-    filename = f"users_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
-    
-    file = BufferedInputFile(csv_bytes, filename=filename)
-    await message.answer_document(file, caption=f"📄 Экспорт: {len(users)} пользователей")
+    try:
+        file = FSInputFile(result.path, filename=result.filename)
+        await message.answer_document(file, caption=caption)
+    finally:
+        os.remove(result.path)
+    # Только после успешной отправки: иначе /export new пропустила бы эти строки
+    await commit_export(result)
 
 
 # ============ /balance — Баланс звёзд ============
@@ -143,19 +188,19 @@ async def cmd_export(message: Message):
 async def cmd_balance(message: Message, bot: Bot):
     """Показать баланс звёзд бота."""
     try:
-        balance = await bot.get_my_star_balance()
+        balance = await sync_star_balance(bot)
         
-        gifts_possible = balance.amount // settings.gift_star_cost
-        pending = await get_pending_count()
+        gifts_possible = balance // settings.gift_star_cost
+        pending = (await get_stats()).pending
         
         text = f"""⭐ <b>Баланс бота</b>
 
-💫 Звёзд на балансе: <b>{balance.amount}</b>
+💫 Звёзд на балансе: <b>{balance}</b>
 🎁 Можно отправить подарков: <b>{gifts_possible}</b>
 ⏳ Ожидают подарок: <b>{pending}</b>
 """
         
-        if balance.amount < settings.min_star_balance:
+        if balance < settings.min_star_balance:
             text += f"\n⚠️ Баланс ниже {settings.min_star_balance}! Пополни бота."
         
         if pending > 0 and gifts_possible >= pending:
@@ -175,22 +220,26 @@ async def cmd_balance(message: Message, bot: Bot):
 @logger.catch(reraise=True)
 async def cmd_send_pending(message: Message, bot: Bot):
     """Отправить подарки всем ожидающим."""
-    pending_users = await get_pending_gift_users()
+    if is_drain_running():
+        await message.answer("⏳ Отправка уже идёт.")
+        return
     
-    if not pending_users:
+    pending = (await get_stats()).pending
+    
+    if not pending:
         await message.answer("✅ Нет пользователей, ожидающих подарок.")
         return
     
     # Проверяем баланс
     try:
-        balance = await bot.get_my_star_balance()
-        needed = len(pending_users) * settings.gift_star_cost
+        balance = await sync_star_balance(bot)
+        needed = pending * settings.gift_star_cost
         
-        if balance.amount < needed:
+        if balance < needed:
             await message.answer(
                 f"❌ Недостаточно звёзд.\n\n"
                 f"Нужно: {needed} ⭐\n"
-                f"Есть: {balance.amount} ⭐"
+                f"Есть: {balance} ⭐"
             )
             return
     except Exception as e:
@@ -198,40 +247,60 @@ async def cmd_send_pending(message: Message, bot: Bot):
         await message.answer("❌ Не удалось проверить баланс.")
         return
     
-    # Отправляем подарки
-    sent = 0
-    failed = 0
-    
-    status_msg = await message.answer(f"⏳ Отправка подарков: 0/{len(pending_users)}...")
+    status_msg = await message.answer(f"⏳ Отправка подарков: 0/{pending}...")
+    last_update = 0.0
     
-    for user in pending_users:
+    async def on_progress(progress: DrainProgress) -> None:
+        nonlocal last_update
+        # Telegram не любит частые edit — обновляем не чаще раза в 2 секунды
+        now = time.monotonic()
+        if now - last_update < 2:
+            return
+        last_update = now
+        
+        eta = progress.eta
         try:
-            await bot.send_gift(
-                gift_id=settings.gift_id,
-                user_id=user.id,
-                text=tr("gift.message"),
+            await status_msg.edit_text(
+                f"⏳ Отправка подарков: {progress.processed}/{progress.total}...\n\n"
+                f"🚀 Скорость: {progress.rate:.1f} подарков/с\n"
+                f"🕐 Осталось: ~{_format_duration(eta) if eta is not None else '?'}"
             )
-            await mark_gift_received(user.id)
-            sent += 1
-            logger.info(f"Pending gift sent to {user.id}")
-        except Exception as e:
-            logger.error(f"Failed to send pending gift to {user.id}: {e}")
-            failed += 1
-        
-        # Обновляем статус каждые 5 отправок
-        if (sent + failed) % 5 == 0:
-            try:
-                await status_msg.edit_text(
-                    f"⏳ Отправка подарков: {sent + failed}/{len(pending_users)}..."
-                )
-            except Exception:
-                pass
+        except Exception:
+            pass
     
-    await status_msg.edit_text(
+    try:
+        progress = await drain_pending_gifts(bot, on_progress)
+    except DrainAlreadyRunning:
+        # Второй /send_pending успел проскочить проверку выше, пока мы ждали баланс
+        await status_msg.edit_text("⏳ Отправка уже идёт.")
+        return
+    
+    text = (
         f"✅ Готово!\n\n"
-        f"📨 Отправлено: {sent}\n"
-        f"❌ Ошибок: {failed}"
+        f"📨 Отправлено: {progress.sent}\n"
+        f"❌ Ошибок: {progress.failed}"
     )
+    if progress.resumed:
+        text += "\n\n🔁 Рассылка продолжена после перезапуска."
+    if progress.uncertain:
+        ids = ", ".join(str(user_id) for user_id in progress.uncertain)
+        text += (
+            f"\n\n⚠️ Отправка прервалась для {len(progress.uncertain)} пользователей — "
+            f"они сняты с ожидания, повторно подарок не уйдёт. "
+            f"Проверь вручную, получили ли они его:\n<code>{ids}</code>"
+        )
+    await status_msg.edit_text(text)
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds} с"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes} мин {seconds} с"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours} ч {minutes} мин"
 
 
 # ============ /donate — Пополнить звёзды ============
@@ -271,13 +340,19 @@ async def successful_payment(message: Message, bot: Bot):
     
     logger.info(f"Payment received: {amount} stars from {message.from_user.id}")
     
+    # Баланс изменился — сверяем учёт звёзд с Telegram
+    try:
+        await sync_star_balance(bot)
+    except Exception as e:
+        logger.error(f"Failed to sync star balance: {e}")
+    
     await message.answer(
         f"✅ Оплата получена!\n\n"
         f"⭐ Добавлено: {amount} звёзд"
     )
     
     # Проверяем есть ли ожидающие подарки
-    pending = await get_pending_count()
+    pending = (await get_stats()).pending
     if pending > 0:
         await message.answer(
             f"⏳ Есть {pending} пользователей, ожидающих подарок.\n"
@@ -300,7 +375,8 @@ async def cmd_admin_help(message: Message):
 <b>Статистика:</b>
 /stats — Статистика розыгрыша
 /balance — Баланс звёзд бота
-/export — Экспорт пользователей в CSV
+/export [new] [gz] — Экспорт пользователей в CSV
+/db — Пул соединений и медленные запросы
 
 <b>Подарки:</b>
 /send_pending — Отправить подарки ожидающим
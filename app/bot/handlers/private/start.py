@@ -1,21 +1,20 @@
 from aiogram import Router, F, Bot
 from aiogram.filters import CommandStart
 from aiogram.enums import ChatType
-from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.types import Message, CallbackQuery
 from aiogram.exceptions import TelegramBadRequest
 
 from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.bot.keyboards.inline import build_main_menu, build_conditions_failed
+from app.bot.keyboards.inline import conditions_failed_screen, main_menu_screen
 from app.bot.handlers.callback.my_callback import GiveawayCallback
-from app.database.repositories.user import (
-    create_user_if_absent,
-    get_user,
-    update_user_subscription,
-    mark_gift_received,
-    set_pending_gift,
-)
+from app.database.repositories.gift_outbox import enqueue_gift, get_gift_status
+from app.database.models.user import User
+from app.database.user_cache import UserStatus
+from app.services.media import answer_photo
 from app.services.remnawave import check_vpn_connected
+from app.services.subscriptions import check_subscription
 from app.services.bot_state import is_bot_paused
 from app.i18n import tr
 from app.utils.config import settings
@@ -28,14 +27,6 @@ router.message.filter(F.chat.type == ChatType.PRIVATE)
 WELCOME_PIC_PATH = "pics/welcome.jpg"
 
 
-def _get_channel_url() -> str:
-    return f"https://t.me/{settings.required_channel}"
-
-
-def _get_vpn_bot_url() -> str:
-    return f"https://t.me/{settings.vpn_bot_username}"
-
-
 async def _safe_edit_message(callback: CallbackQuery, text: str, reply_markup=None) -> None:
     """Безопасное редактирование сообщения (игнорирует ошибки если контент не изменился)."""
     try:
@@ -53,18 +44,15 @@ async def _safe_edit_message(callback: CallbackQuery, text: str, reply_markup=No
 
 
 @router.message(CommandStart())
-async def cmd_start(message: Message):
+async def cmd_start(message: Message, user_status: UserStatus | None):
     """Обработка команды /start."""
     user_id = message.from_user.id
     username = message.from_user.username
     
     logger.info(f"/start from {user_id} (@{username})")
 
-    # Создаём пользователя
-    try:
-        await create_user_if_absent(user_id=user_id, username=username)
-    except Exception as e:
-        logger.error(f"Error creating user {user_id}: {e}")
+    # Статус загружен в DatabaseSessionMiddleware (из кэша или БД)
+    if user_status is None:
         await message.answer("❌ Ошибка. Попробуй позже.")
         return
 
@@ -74,28 +62,32 @@ async def cmd_start(message: Message):
         return
 
     # Проверяем статус пользователя
-    user = await get_user(user_id)
-    if user and user.gift_received:
+    if user_status.gift_received:
         await message.answer(tr("start.already_received"))
         return
     
-    if user and user.pending_gift:
+    if user_status.pending_gift:
         await message.answer(tr("start.pending_gift"))
         return
 
-    # Отправляем приветствие
-    keyboard = build_main_menu(_get_channel_url(), _get_vpn_bot_url())
+    # Отправляем приветствие (экран собран заранее)
+    screen = main_menu_screen()
     
     try:
-        photo = FSInputFile(WELCOME_PIC_PATH)
-        await message.answer_photo(photo=photo, caption=tr("start.welcome"), reply_markup=keyboard)
+        await answer_photo(message, WELCOME_PIC_PATH, caption=screen.text, reply_markup=screen.markup)
     except Exception as e:
         logger.warning(f"Не удалось отправить картинку: {e}")
-        await message.answer(text=tr("start.welcome"), reply_markup=keyboard)
+        await message.answer(text=screen.text, reply_markup=screen.markup)
 
 
 @router.callback_query(GiveawayCallback.filter(F.act == "check"))
-async def check_conditions(callback: CallbackQuery, bot: Bot):
+async def check_conditions(
+    callback: CallbackQuery,
+    bot: Bot,
+    session: AsyncSession,
+    user_status: UserStatus | None,
+    user: User | None = None,
+):
     """Проверка условий и отправка подарка."""
     import asyncio
     
@@ -106,123 +98,66 @@ async def check_conditions(callback: CallbackQuery, bot: Bot):
         await callback.answer(tr("start.paused"), show_alert=True)
         return
 
-    # Получаем пользователя
-    user = await get_user(user_id)
-    if not user:
+    # Статус загружен в DatabaseSessionMiddleware (из кэша или БД)
+    if user_status is None:
         await callback.answer(tr("errors.user_not_found"), show_alert=True)
         return
 
-    if user.gift_received:
+    if user_status.gift_received:
         await callback.answer(tr("start.already_received"), show_alert=True)
         return
 
-    if user.pending_gift:
+    if user_status.pending_gift:
         await callback.answer(tr("start.pending_gift"), show_alert=True)
         return
 
+    # Для нефинального статуса middleware всегда загружает пользователя
+    if user is None:
+        await callback.answer(tr("errors.user_not_found"), show_alert=True)
+        return
+
     # Показываем "загрузку" — Отец Кайфа проверяет...
     await _safe_edit_message(callback, tr("start.checking"))
     await callback.answer()
     
-    # Ждём 3 секунды (даём время на синхронизацию данных)
-    await asyncio.sleep(2)
+    # Даём время на синхронизацию данных (подписка, подключение VPN)
+    await asyncio.sleep(settings.check_conditions_delay)
     
     # Теперь реальная проверка
-    is_subscribed = await _check_channel_subscription(bot, user_id)
-    await update_user_subscription(user_id, is_subscribed)
+    is_subscribed = await check_subscription(bot, user)
     
     is_vpn_connected = await check_vpn_connected(user_id)
     
     # Все условия выполнены — отправляем подарок
     if is_subscribed and is_vpn_connected:
-        await _send_gift(callback, bot, user_id)
+        await _enqueue_gift(callback, user_id, session)
         return
     
-    # Условия НЕ выполнены
-    text = tr("start.conditions_not_met")
-    keyboard = build_conditions_failed(
-        channel_url=_get_channel_url(),
-        bot_url=_get_vpn_bot_url(),
-        is_subscribed=is_subscribed,
-        is_vpn_connected=is_vpn_connected,
-    )
+    # Условия НЕ выполнены (один из 4 заранее собранных экранов)
+    screen = conditions_failed_screen(is_subscribed, is_vpn_connected)
     
-    await _safe_edit_message(callback, text, keyboard)
+    await _safe_edit_message(callback, screen.text, screen.markup)
 
 
-async def _send_gift(callback: CallbackQuery, bot: Bot, user_id: int) -> None:
-    """Отправка Telegram Gift."""
+async def _enqueue_gift(callback: CallbackQuery, user_id: int, session: AsyncSession) -> None:
+    """Поставить подарок в очередь — отправят воркеры (app.services.gift_outbox)."""
+    # Сначала текст «отправляем», потом очередь: иначе быстрый воркер
+    # может успеть написать «подарок у тебя» раньше, и мы его перетрём
+    await _safe_edit_message(callback, tr("start.gift_queued"))
     
-    # Проверяем баланс
-    try:
-        balance = await bot.get_my_star_balance()
-        if balance.amount < settings.gift_star_cost:
-            await _add_to_pending(callback, bot, user_id, balance.amount)
-            return
-    except Exception as e:
-        logger.error(f"Failed to check balance: {e}")
-    
-    # Отправляем подарок
-    try:
-        await bot.send_gift(
-            gift_id=settings.gift_id,
-            user_id=user_id,
-            text=tr("gift.message"),
-        )
-        
-        await mark_gift_received(user_id)
-        await _safe_edit_message(callback, tr("start.gift_sent"))
-        await callback.answer(tr("gift.sent_alert"), show_alert=True)
-        logger.info(f"Gift sent to {user_id}")
-        
-    except TelegramBadRequest as e:
-        error_msg = str(e).lower()
-        if "not enough" in error_msg or "balance" in error_msg:
-            await _add_to_pending(callback, bot, user_id, 0)
-        else:
-            logger.error(f"Telegram error: {e}")
-            await callback.answer(tr("errors.gift_send_failed"), show_alert=True)
-            
-    except Exception as e:
-        logger.error(f"Error sending gift: {e}")
-        await callback.answer(tr("errors.gift_send_failed"), show_alert=True)
-
-
-async def _add_to_pending(callback: CallbackQuery, bot: Bot, user_id: int, balance: int) -> None:
-    """Добавить пользователя в очередь на подарок."""
-    await set_pending_gift(user_id, True)
-    await _notify_admins_low_balance(bot, balance)
-    await _safe_edit_message(callback, tr("start.pending_gift"))
-    await callback.answer(tr("gift.pending_alert"), show_alert=True)
-    logger.warning(f"User {user_id} added to pending (balance: {balance})")
-
-
-async def _notify_admins_low_balance(bot: Bot, current_balance: int) -> None:
-    """Уведомить админов о низком балансе."""
-    admin_ids = settings.get_admin_ids()
-    
-    text = (
-        f"⚠️ <b>Внимание!</b>\n\n"
-        f"Не хватает звёзд для подарка!\n"
-        f"Баланс: {current_balance} ⭐\n\n"
-        f"Пополни: /donate"
+    message = callback.message
+    created = await enqueue_gift(
+        user_id,
+        chat_id=message.chat.id if message else None,
+        message_id=message.message_id if message else None,
+        session=session,
     )
-    
-    for admin_id in admin_ids:
-        try:
-            await bot.send_message(admin_id, text)
-        except Exception as e:
-            logger.error(f"Failed to notify admin {admin_id}: {e}")
-
-
-async def _check_channel_subscription(bot: Bot, user_id: int) -> bool:
-    """Проверить подписку на канал."""
-    try:
-        member = await bot.get_chat_member(
-            chat_id=f"@{settings.required_channel}",
-            user_id=user_id,
-        )
-        return member.status in ("member", "administrator", "creator")
-    except TelegramBadRequest as e:
-        logger.warning(f"Subscription check failed for {user_id}: {e}")
-        return False
+    if created:
+        logger.info(f"Gift queued for {user_id}")
+    elif await get_gift_status(user_id, session=session) == "stuck":
+        # Прошлая отправка оборвалась — повторно не шлём, пользователь ждёт админа
+        await _safe_edit_message(callback, tr("start.gift_stuck"))
+        logger.info(f"Gift for {user_id} is stuck, waiting for admin")
+    else:
+        # Повторное нажатие / другая реплика уже поставила подарок в очередь
+        logger.info(f"Gift for {user_id} already queued")
@@ -2,8 +2,20 @@ from app.bot.keyboards.inline.giveaway import (
     build_main_menu,
     build_conditions_failed,
 )
+from app.bot.keyboards.inline.screens import (
+    FrozenInlineKeyboardMarkup,
+    Screen,
+    main_menu_screen,
+    conditions_failed_screen,
+    prebuild_screens,
+)
 
 __all__ = [
     "build_main_menu",
     "build_conditions_failed",
+    "FrozenInlineKeyboardMarkup",
+    "Screen",
+    "main_menu_screen",
+    "conditions_failed_screen",
+    "prebuild_screens",
 ]
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
@@ -5,7 +7,7 @@ from app.bot.handlers.callback.my_callback import GiveawayCallback
 from app.i18n import tr
 
 
-def build_main_menu(channel_url: str, bot_url: str) -> InlineKeyboardMarkup:
+def build_main_menu(channel_url: str, bot_url: str, lang: Optional[str] = None) -> InlineKeyboardMarkup:
     """
     Главное меню с 3 кнопками:
     - Подписаться на канал (ссылка)
@@ -13,9 +15,9 @@ def build_main_menu(channel_url: str, bot_url: str) -> InlineKeyboardMarkup:
     - Проверить условия (callback)
     """
     builder = InlineKeyboardBuilder()
-    builder.button(text=tr("kb.subscribe_channel"), url=channel_url)
-    builder.button(text=tr("kb.connect_vpn"), url=bot_url)
-    builder.button(text=tr("kb.check_conditions"), callback_data=GiveawayCallback(act="check"))
+    builder.button(text=tr("kb.subscribe_channel", lang), url=channel_url)
+    builder.button(text=tr("kb.connect_vpn", lang), url=bot_url)
+    builder.button(text=tr("kb.check_conditions", lang), callback_data=GiveawayCallback(act="check"))
     builder.adjust(1)
     return builder.as_markup()
 
@@ -25,6 +27,7 @@ def build_conditions_failed(
     bot_url: str,
     is_subscribed: bool,
     is_vpn_connected: bool,
+    lang: Optional[str] = None,
 ) -> InlineKeyboardMarkup:
     """
     Меню когда условия НЕ выполнены.
@@ -34,14 +37,14 @@ def build_conditions_failed(
     
     # Кнопка канала со статусом
     sub_status = "✅" if is_subscribed else "❌"
-    builder.button(text=f"{sub_status} Подписка на канал", url=channel_url)
+    builder.button(text=tr("kb.subscribe_status", lang, status=sub_status), url=channel_url)
     
     # Кнопка VPN со статусом
     vpn_status = "✅" if is_vpn_connected else "❌"
-    builder.button(text=f"{vpn_status} Подключить VPN", url=bot_url)
+    builder.button(text=tr("kb.vpn_status", lang, status=vpn_status), url=bot_url)
     
     # Кнопка повторной проверки
-    builder.button(text=tr("kb.try_again"), callback_data=GiveawayCallback(act="check"))
+    builder.button(text=tr("kb.try_again", lang), callback_data=GiveawayCallback(act="check"))
     
     builder.adjust(1)
     return builder.as_markup()
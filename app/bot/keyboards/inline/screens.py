@@ -0,0 +1,106 @@
+"""
+Готовые экраны: текст + клавиатура.
+
+Вариантов немного (главное меню и 4 сочетания подписка/VPN на язык),
+поэтому каждый собирается один раз и дальше отдаётся один и тот же
+неизменяемый объект. JSON клавиатуры тоже кэшируется на объекте и
+подставляется сессией бота (CachedMarkupSession) без повторной сериализации.
+При перезагрузке локализаций экраны пересобираются.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+from aiogram.types import InlineKeyboardMarkup
+from pydantic import ConfigDict, PrivateAttr
+
+from app.bot.keyboards.inline.giveaway import build_conditions_failed, build_main_menu
+from app.i18n import catalog_version, get_current_lang, get_locales, tr
+from app.utils.config import settings
+
+
+class FrozenInlineKeyboardMarkup(InlineKeyboardMarkup):
+    """Общая для всех клавиатура: менять нельзя, JSON считается один раз."""
+
+    model_config = ConfigDict(frozen=True)
+
+    _payload: Optional[str] = PrivateAttr(default=None)
+
+
+@dataclass(frozen=True)
+class Screen:
+    text: str
+    markup: FrozenInlineKeyboardMarkup
+
+
+# (экран, язык, флаги...) → Screen
+_screens: dict[tuple, Screen] = {}
+_screens_version: int = -1
+
+
+def _freeze(markup: InlineKeyboardMarkup) -> FrozenInlineKeyboardMarkup:
+    return FrozenInlineKeyboardMarkup(inline_keyboard=markup.inline_keyboard)
+
+
+def _channel_url() -> str:
+    return f"https://t.me/{settings.required_channel}"
+
+
+def _vpn_bot_url() -> str:
+    return f"https://t.me/{settings.vpn_bot_username}"
+
+
+def _get(key: tuple) -> Optional[Screen]:
+    global _screens_version
+    version = catalog_version()
+    if version != _screens_version:
+        _screens.clear()
+        _screens_version = version
+    return _screens.get(key)
+
+
+def main_menu_screen(lang: Optional[str] = None) -> Screen:
+    """Приветствие с главным меню."""
+    lang = lang or get_current_lang()
+    key = ("main_menu", lang)
+    screen = _get(key)
+    if screen is None:
+        screen = _screens[key] = Screen(
+            text=tr("start.welcome", lang),
+            markup=_freeze(build_main_menu(_channel_url(), _vpn_bot_url(), lang)),
+        )
+    return screen
+
+
+def conditions_failed_screen(
+    is_subscribed: bool,
+    is_vpn_connected: bool,
+    lang: Optional[str] = None,
+) -> Screen:
+    """Условия не выполнены: статус в кнопках (✅/❌)."""
+    lang = lang or get_current_lang()
+    key = ("conditions_failed", lang, is_subscribed, is_vpn_connected)
+    screen = _get(key)
+    if screen is None:
+        screen = _screens[key] = Screen(
+            text=tr("start.conditions_not_met", lang),
+            markup=_freeze(build_conditions_failed(
+                _channel_url(),
+                _vpn_bot_url(),
+                is_subscribed=is_subscribed,
+                is_vpn_connected=is_vpn_connected,
+                lang=lang,
+            )),
+        )
+    return screen
+
+
+def prebuild_screens() -> int:
+    """Собрать все экраны для всех языков заранее (при старте). Возвращает число экранов."""
+    for lang in get_locales():
+        main_menu_screen(lang)
+        for is_subscribed in (False, True):
+            for is_vpn_connected in (False, True):
+                conditions_failed_screen(is_subscribed, is_vpn_connected, lang)
+    return len(_screens)
@@ -0,0 +1,64 @@
+"""Middleware: одна сессия БД на апдейт, статус и пользователь в data."""
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.enums import ChatType
+from aiogram.types import Update
+from loguru import logger
+
+from app.database.engine import async_session_maker
+from app.database.repositories.user import get_or_create_user
+from app.database.user_cache import get_user_status
+
+
+class DatabaseSessionMiddleware(BaseMiddleware):
+    """
+    Открывает одну сессию на апдейт (data["session"]) и для личных сообщений
+    и callback кладёт статус пользователя в data["user_status"].
+
+    Если статус в кэше финальный (подарок получен или ждёт) — в БД не ходим
+    вовсе. Иначе пользователь загружается/создаётся одним запросом
+    (data["user"]), статус берётся из него.
+
+    После загрузки пользователя сессия коммитится и отдаёт соединение в пул:
+    хендлер «Проверить» долго ждёт внешние API и не должен держать соединение.
+    Всё, что хендлер записал через эту сессию, коммитится одним разом в конце.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with async_session_maker() as session:
+            data["session"] = session
+
+            from_user = data.get("event_from_user")
+            if from_user is not None and _is_user_facing(event):
+                status = get_user_status(from_user.id)
+                if status is None or not status.is_final:
+                    try:
+                        data["user"] = await get_or_create_user(
+                            from_user.id, username=from_user.username, session=session
+                        )
+                        await session.commit()
+                        status = get_user_status(from_user.id)
+                    except Exception as e:
+                        # Хендлер сам ответит пользователю ошибкой (user_status is None)
+                        logger.error(f"Error loading user {from_user.id}: {e}")
+                        await session.rollback()
+                        status = None
+                data["user_status"] = status
+
+            result = await handler(event, data)
+            if session.in_transaction():
+                await session.commit()
+            return result
+
+
+def _is_user_facing(event: Update) -> bool:
+    """Апдейты, для которых нужен пользователь: личка и нажатия кнопок."""
+    if event.callback_query is not None:
+        return True
+    return event.message is not None and event.message.chat.type == ChatType.PRIVATE
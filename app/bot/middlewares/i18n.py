@@ -0,0 +1,23 @@
+"""Middleware: язык пользователя для tr() на время апдейта."""
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from app.i18n import resolve_lang, set_current_lang
+
+
+class I18nMiddleware(BaseMiddleware):
+    """Выбирает язык по from_user.language_code (с фолбэком) и кладёт в data["lang"]."""
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        from_user = data.get("event_from_user")
+        lang = resolve_lang(from_user.language_code if from_user else None)
+        set_current_lang(lang)
+        data["lang"] = lang
+        return await handler(event, data)
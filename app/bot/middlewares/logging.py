@@ -5,6 +5,8 @@ from aiogram import BaseMiddleware
 from aiogram.types import Message, CallbackQuery
 from loguru import logger
 
+from app.utils.logging import log_sampled
+
 
 class MessageLoggingMiddleware(BaseMiddleware):
     """Логирует входящие сообщения."""
@@ -15,10 +17,14 @@ class MessageLoggingMiddleware(BaseMiddleware):
         event: Message,
         data: Dict[str, Any],
     ) -> Any:
-        logger.info(
-            f"📨 Message from {event.from_user.id} (@{event.from_user.username}): "
-            f"{event.text or event.caption or '[media]'}"
-        )
+        if log_sampled("message"):
+            # Шаблон с аргументами: строка собирается, только если запись уходит в sink
+            logger.bind(event="message", user_id=event.from_user.id).info(
+                "📨 Message from {} (@{}): {}",
+                event.from_user.id,
+                event.from_user.username,
+                event.text or event.caption or "[media]",
+            )
         return await handler(event, data)
 
 
@@ -31,7 +37,11 @@ class CallbackLoggingMiddleware(BaseMiddleware):
         event: CallbackQuery,
         data: Dict[str, Any],
     ) -> Any:
-        logger.info(
-            f"🔘 Callback from {event.from_user.id} (@{event.from_user.username}): {event.data}"
-        )
+        if log_sampled("callback"):
+            logger.bind(event="callback", user_id=event.from_user.id).info(
+                "🔘 Callback from {} (@{}): {}",
+                event.from_user.id,
+                event.from_user.username,
+                event.data,
+            )
         return await handler(event, data)
@@ -0,0 +1,68 @@
+"""Middleware метрик: время обработки апдейтов и запросов к Bot API."""
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import Update
+
+from app.utils.metrics import Counter, Histogram
+
+
+_update_seconds = Histogram("bot_update_seconds", "Обработка апдейта", ["type"])
+_updates = Counter("bot_updates_total", "Апдейты по типу и результату", ["type", "status"])
+
+_api_seconds = Histogram("bot_telegram_request_seconds", "Запросы к Bot API", ["method"])
+_api_errors = Counter("bot_telegram_errors_total", "Ошибки Bot API", ["method", "error"])
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Внешний middleware апдейтов: латентность и исход по типу апдейта."""
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        try:
+            update_type = event.event_type
+        except Exception:
+            update_type = "unknown"
+
+        started = time.perf_counter()
+        status = "error"
+        try:
+            result = await handler(event, data)
+            status = "unhandled" if result is UNHANDLED else "handled"
+            return result
+        finally:
+            _update_seconds.labels(update_type).observe(time.perf_counter() - started)
+            _updates.labels(update_type, status).inc()
+
+
+class BotApiMetricsMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: латентность и ошибки по методу Bot API."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = method.__api_method__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter:
+            _api_errors.labels(name, "retry_after").inc()
+            raise
+        except Exception as e:
+            _api_errors.labels(name, type(e).__name__).inc()
+            raise
+        finally:
+            _api_seconds.labels(name).observe(time.perf_counter() - started)
@@ -0,0 +1,126 @@
+"""
+Middleware записи входящих апдейтов для последующего replay.
+
+Включается RECORD_UPDATES_PATH: каждая строка gzip-JSONL —
+{"t": секунды от начала записи, "update": апдейт в формате Bot API}.
+Сериализация — в обработчике, сжатие и запись — в фоновом потоке
+(BatchedFileSink), апдейт не ждёт диска.
+
+Обезличивание: id пользователей и личных чатов заменяются ключевым хэшем
+(одинаковый id → одинаковая замена в пределах RECORD_UPDATES_SALT), имена
+и username — заглушками, свободный текст сообщений — пробелами той же длины.
+Объект User обезличивается под любым ключом (пересылки, new_chat_members...).
+Команды (/start ...) и callback data сохраняются: от них зависит маршрут.
+Каналы и группы (отрицательные id) не трогаем.
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+from loguru import logger
+
+from app.utils.logging import BatchedFileSink
+
+
+# Объекты пользователя/чата внутри апдейта (User распознаётся и без ключа —
+# по is_bot и числовому id, — но чаты без is_bot опознаются только так)
+_PERSON_KEYS = frozenset({
+    "from", "user", "chat", "sender_chat", "old_chat_member", "new_chat_member",
+    "sender_user", "forward_from", "forward_from_chat", "new_chat_members",
+    "left_chat_member", "users", "voter_chat", "actor_chat", "sender_business_bot",
+})
+# Имена отправителя строкой (скрытый автор пересылки и т. п.)
+_NAME_KEYS = frozenset({"sender_user_name", "forward_sender_name", "author_signature"})
+# Поля, которые не пишем вообще
+_DROP_KEYS = frozenset({"last_name", "phone_number", "bio", "photo"})
+# Сдвиг обезличенных id: не пересекаются с «маленькими» настоящими
+_ANON_BASE = 10**12
+
+
+class UpdateRecorderMiddleware(BaseMiddleware):
+    """Внешний middleware апдейтов: пишет каждый апдейт в файл записи."""
+
+    def __init__(self, path: str, salt: Optional[str] = None) -> None:
+        if salt is None:
+            # Без соли замены стабильны только в пределах одного процесса
+            logger.warning("RECORD_UPDATES_SALT не задан — id обезличиваются случайным ключом процесса")
+            key = os.urandom(32)
+        else:
+            key = hashlib.sha256(salt.encode()).digest()
+        self._key = key
+        self._sink = BatchedFileSink(path, compress=True)
+        self._started = time.monotonic()
+        self._recorded = 0
+        logger.info(f"Запись апдейтов: {path}")
+
+    def _digest(self, value: Any) -> int:
+        digest = hashlib.blake2b(str(value).encode(), key=self._key, digest_size=8).digest()
+        return int.from_bytes(digest, "big") % _ANON_BASE
+
+    def anonymize_id(self, value: int) -> int:
+        """Стабильная замена telegram id (положительного) в пределах ключа."""
+        return _ANON_BASE + self._digest(value)
+
+    def _scrub(self, data: Any, person: bool = False) -> Any:
+        if isinstance(data, list):
+            return [self._scrub(item, person=person) for item in data]
+        if not isinstance(data, dict):
+            return data
+
+        # Любой объект User — под каким бы ключом он ни лежал
+        looks_like_user = "is_bot" in data
+        is_person = (
+            (person or looks_like_user)
+            and not data.get("is_bot")
+            and isinstance(data.get("id"), int)
+            and data["id"] > 0
+        )
+        out = {}
+        for key, value in data.items():
+            if key in _DROP_KEYS:
+                continue
+            if is_person and key == "id":
+                value = self.anonymize_id(value)
+            elif is_person and key == "username":
+                value = f"user{self.anonymize_id(data['id'])}"
+            elif is_person and key == "first_name":
+                value = "User"
+            elif key in _NAME_KEYS and isinstance(value, str):
+                value = "User"
+            elif key == "user_id" and isinstance(value, int) and value > 0:
+                value = self.anonymize_id(value)
+            elif key == "chat_instance":
+                value = str(self._digest(value))
+            elif key in ("text", "caption") and isinstance(value, str) and not value.startswith("/"):
+                value = " " * len(value)
+            else:
+                value = self._scrub(value, person=key in _PERSON_KEYS)
+            out[key] = value
+        return out
+
+    def record(self, update: Update) -> None:
+        payload = update.model_dump(mode="json", by_alias=True, exclude_none=True)
+        line = {"t": round(time.monotonic() - self._started, 4), "update": self._scrub(payload)}
+        self._sink.write(json.dumps(line, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._recorded += 1
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        try:
+            self.record(event)
+        except Exception as e:
+            logger.opt(exception=e).error("Не удалось записать апдейт {}", event.update_id)
+        return await handler(event, data)
+
+    async def close(self) -> None:
+        """Дописать буфер и закрыть файл (dp.shutdown)."""
+        self._sink.stop()
+        logger.info(f"Запись апдейтов остановлена: {self._recorded} апдейтов")
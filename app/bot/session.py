@@ -0,0 +1,28 @@
+"""Сессия бота, подставляющая готовый JSON общих клавиатур."""
+from typing import Any, Dict
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+
+from app.bot.keyboards.inline.screens import FrozenInlineKeyboardMarkup
+
+
+class CachedMarkupSession(AiohttpSession):
+    """
+    FrozenInlineKeyboardMarkup сериализуется один раз: JSON сохраняется на
+    самом объекте и дальше подставляется в запрос как есть.
+    """
+
+    def prepare_value(
+        self,
+        value: Any,
+        bot: Bot,
+        files: Dict[str, Any],
+        _dumps_json: bool = True,
+    ) -> Any:
+        if _dumps_json and isinstance(value, FrozenInlineKeyboardMarkup):
+            payload = value._payload
+            if payload is None:
+                payload = value._payload = super().prepare_value(value, bot, files)
+            return payload
+        return super().prepare_value(value, bot, files, _dumps_json)
@@ -0,0 +1,51 @@
+"""Webhook-режим: aiohttp-сервер поверх SimpleRequestHandler aiogram."""
+import asyncio
+import signal
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+from loguru import logger
+
+from app.utils.config import settings
+
+
+class GracefulRequestHandler(SimpleRequestHandler):
+    """
+    Отвечает Telegram сразу (апдейт обрабатывается в фоне), а при остановке
+    дожидается уже принятых апдейтов, прежде чем закрыть сессию бота.
+    """
+
+    async def close(self) -> None:
+        pending = set(self._background_feed_update_tasks)
+        if pending:
+            logger.info(f"Webhook: ждём {len(pending)} апдейтов в обработке")
+            _, not_done = await asyncio.wait(pending, timeout=settings.webhook_shutdown_timeout)
+            if not_done:
+                logger.warning(f"Webhook: {len(not_done)} апдейтов не успели обработаться")
+        await super().close()
+
+
+def build_webhook_app(dp: Dispatcher, bot: Bot) -> web.Application:
+    if not settings.webhook_secret:
+        logger.warning("WEBHOOK_SECRET не задан — запросы к вебхуку не проверяются")
+
+    app = web.Application()
+    handler = GracefulRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=settings.webhook_secret,
+        handle_in_background=True,
+    )
+    handler.register(app, path=settings.webhook_path)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def wait_for_shutdown_signal() -> None:
+    """Ждать SIGTERM / SIGINT (docker stop, Ctrl+C)."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
@@ -1,4 +1,4 @@
-from app.database.engine import Base, async_session_maker, get_session
+from app.database.engine import Base, async_session_maker, get_session, use_session
 
-__all__ = ["Base", "async_session_maker", "get_session"]
+__all__ = ["Base", "async_session_maker", "get_session", "use_session"]
 
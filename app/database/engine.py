@@ -1,18 +1,34 @@
 from __future__ import annotations
 
-from typing import AsyncGenerator
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator, Callable, Optional
 
+from loguru import logger
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session
 
+from app.database.instrumentation import InstrumentedPool, instrument_engine
 from app.utils.config import settings
 
 
+_connect_args = {"prepared_statement_cache_size": settings.db_statement_cache_size}
+if settings.db_command_timeout is not None:
+    _connect_args["command_timeout"] = settings.db_command_timeout
+
 engine = create_async_engine(
     settings.database_url,
     echo=False,
-    pool_pre_ping=True,
+    poolclass=InstrumentedPool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    connect_args=_connect_args,
 )
+instrument_engine(engine)
 
 async_session_maker = async_sessionmaker(
     engine,
@@ -27,4 +43,81 @@ class Base(DeclarativeBase):
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+@asynccontextmanager
+async def use_session(session: Optional[AsyncSession] = None) -> AsyncIterator[AsyncSession]:
+    """
+    Сессия для функций репозитория.
+
+    Передали сессию (например, из DatabaseSessionMiddleware) — работаем в ней,
+    коммитит вызывающий код. Не передали — открываем свою и коммитим в конце.
+    """
+    if session is not None:
+        yield session
+        return
+    async with async_session_maker() as s:
+        yield s
+        await s.commit()
+
+
+# session.info: колбэки, ждущие коммита сессии вызывающего кода
+_AFTER_COMMIT = "after_commit_callbacks"
+
+
+def _run_after_commit(sync_session: Session) -> None:
+    for callback in sync_session.info.pop(_AFTER_COMMIT, ()):
+        callback()
+
+
+def _drop_after_commit(sync_session: Session) -> None:
+    sync_session.info.pop(_AFTER_COMMIT, None)
+
+
+def call_after_commit(session: Optional[AsyncSession], callback: Callable[[], None]) -> None:
+    """
+    Выполнить callback после коммита (например, поправить кэш в памяти).
+
+    Без сессии use_session уже закоммитил — вызываем сразу. С сессией
+    вызывающего — после её коммита; при откате колбэк отбрасывается.
+    """
+    if session is None:
+        callback()
+        return
+    sync_session = session.sync_session
+    callbacks = sync_session.info.get(_AFTER_COMMIT)
+    if callbacks is None:
+        callbacks = sync_session.info[_AFTER_COMMIT] = []
+        if not event.contains(sync_session, "after_commit", _run_after_commit):
+            event.listen(sync_session, "after_commit", _run_after_commit)
+            event.listen(sync_session, "after_rollback", _drop_after_commit)
+    callbacks.append(callback)
+
+
+async def warm_up_pool(size: Optional[int] = None) -> int:
+    """
+    Открыть size соединений пула заранее (по умолчанию DB_POOL_SIZE), чтобы
+    первые апдейты не платили за подключение. Возвращает число открытых.
+    """
+    size = size or settings.db_pool_size
+
+    async def connect():
+        conn = await engine.connect()
+        await conn.execute(text("SELECT 1"))
+        return conn
+
+    # Все одновременно: иначе пул отдавал бы одно и то же соединение
+    results = await asyncio.gather(*(connect() for _ in range(size)), return_exceptions=True)
+    opened = [conn for conn in results if not isinstance(conn, BaseException)]
+    for conn in opened:
+        await conn.close()
+    errors = [e for e in results if isinstance(e, BaseException)]
+    if errors and not opened:
+        raise errors[0]
+    if errors:
+        logger.warning(
+            f"БД: пул прогрет не полностью — {len(opened)} из {size}, "
+            f"ошибок {len(errors)}: {errors[0]!r}"
+        )
+    return len(opened)
@@ -0,0 +1,148 @@
+"""
+Метрики БД на событиях SQLAlchemy.
+
+- задержка каждого запроса: гистограмма по тексту запроса
+- ожидание соединения в пуле и время pre-ping при checkout
+- занятые соединения и overflow пула
+- лог медленных запросов (порог db_slow_query_ms)
+
+Всё регистрируется в app.utils.metrics (эндпоинт /metrics); снимок для
+команды /db — get_db_metrics().
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+from app.utils.config import settings
+from app.utils.metrics import Counter, Gauge, Histogram, HistogramChild
+
+
+# Сколько разных запросов различаем; остальные попадают в "other"
+_MAX_STATEMENTS = 200
+# Длина текста запроса в ключе и в логе
+_STATEMENT_PREVIEW = 120
+
+
+@dataclass
+class PoolState:
+    size: int
+    checked_out: int
+    overflow: int
+    checked_in: int
+
+
+@dataclass
+class DbMetrics:
+    pool: Optional[PoolState]
+    checkout_wait: HistogramChild
+    pre_ping: HistogramChild
+    statements: dict[str, HistogramChild]
+    slow_queries: int
+
+
+_statements = Histogram("bot_db_statement_seconds", "Время выполнения запроса", ["statement"])
+_checkout_wait = Histogram("bot_db_pool_checkout_seconds", "Ожидание соединения в пуле")
+_pre_ping = Histogram("bot_db_pool_pre_ping_seconds", "Pre-ping при выдаче соединения")
+_slow_queries = Counter("bot_db_slow_queries_total", "Запросы дольше DB_SLOW_QUERY_MS")
+_pool: Optional[Pool] = None
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул, замеряющий ожидание свободного соединения."""
+
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        record = super()._do_get()
+        got_at = time.perf_counter()
+        _checkout_wait.observe(got_at - started)
+        # Время между получением и событием checkout — это pre-ping
+        record.info["_got_at"] = got_at
+        return record
+
+
+def _statement_key(statement: str) -> str:
+    key = " ".join(statement.split())[:_STATEMENT_PREVIEW]
+    if (key,) not in _statements and len(_statements) >= _MAX_STATEMENTS:
+        return "other"
+    return key
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("_query_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info["_query_started"].pop()
+    elapsed = time.perf_counter() - started
+
+    key = _statement_key(statement)
+    _statements.labels(key).observe(elapsed)
+
+    if settings.db_slow_query_ms and elapsed * 1000 >= settings.db_slow_query_ms:
+        _slow_queries.inc()
+        logger.warning(f"Медленный запрос {elapsed * 1000:.0f} мс: {key}")
+
+
+def _on_error(context) -> None:
+    # Запрос упал — after_cursor_execute не будет, снимаем отметку
+    started = context.connection.info.get("_query_started") if context.connection else None
+    if started:
+        started.pop()
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    got_at = connection_record.info.pop("_got_at", None)
+    if got_at is not None:
+        _pre_ping.observe(time.perf_counter() - got_at)
+
+
+def _pool_state() -> Optional[PoolState]:
+    if not isinstance(_pool, AsyncAdaptedQueuePool):
+        return None
+    return PoolState(
+        size=_pool.size(),
+        checked_out=_pool.checkedout(),
+        overflow=max(_pool.overflow(), 0),
+        checked_in=_pool.checkedin(),
+    )
+
+
+def _pool_field(name: str):
+    def read() -> Optional[float]:
+        state = _pool_state()
+        return getattr(state, name) if state else None
+    return read
+
+
+Gauge("bot_db_pool_size", "Размер пула", _pool_field("size"))
+Gauge("bot_db_pool_checked_out", "Занятые соединения", _pool_field("checked_out"))
+Gauge("bot_db_pool_overflow", "Соединения сверх размера пула", _pool_field("overflow"))
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Подписать метрики на события движка и пула."""
+    global _pool
+    sync_engine = engine.sync_engine
+    _pool = sync_engine.pool
+    event.listen(sync_engine, "before_cursor_execute", _before_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_execute)
+    event.listen(sync_engine, "handle_error", _on_error)
+    event.listen(_pool, "checkout", _on_checkout)
+
+
+def get_db_metrics() -> DbMetrics:
+    """Снимок метрик БД."""
+    return DbMetrics(
+        pool=_pool_state(),
+        checkout_wait=_checkout_wait.child,
+        pre_ping=_pre_ping.child,
+        statements={values[0]: child for values, child in _statements.children().items()},
+        slow_queries=int(_slow_queries.value),
+    )
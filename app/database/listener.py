@@ -0,0 +1,79 @@
+"""LISTEN/NOTIFY: одно выделенное asyncpg-соединение на процесс."""
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+import asyncpg
+from loguru import logger
+from sqlalchemy.engine import make_url
+
+from app.utils.config import settings
+
+
+# Пауза перед переподключением после обрыва
+_RECONNECT_DELAY = 2.0
+
+_handlers: dict[str, list[Callable[[str], None]]] = {}
+# Вызываются после каждого (пере)подключения: пока соединения не было,
+# уведомления могли потеряться — подписчик перечитывает своё состояние
+_resync_hooks: list[Callable[[], Awaitable[None]]] = []
+
+_connected: bool = False
+
+
+def subscribe(
+    channel: str,
+    handler: Callable[[str], None],
+    resync: Optional[Callable[[], Awaitable[None]]] = None,
+) -> None:
+    """Подписаться на канал NOTIFY; handler получает payload."""
+    _handlers.setdefault(channel, []).append(handler)
+    if resync is not None:
+        _resync_hooks.append(resync)
+
+
+def is_listener_connected() -> bool:
+    """Есть ли сейчас LISTEN-соединение (уведомления доходят)."""
+    return _connected
+
+
+def _dsn() -> str:
+    url = make_url(settings.database_url).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+def _dispatch(connection: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+    for handler in _handlers.get(channel, ()):
+        try:
+            handler(payload)
+        except Exception as e:
+            logger.error(f"NOTIFY {channel}: ошибка обработчика: {e}")
+
+
+async def run_listener() -> None:
+    """Держать LISTEN-соединение, переподключаясь при обрывах."""
+    global _connected
+    while True:
+        closed = asyncio.Event()
+        conn: Optional[asyncpg.Connection] = None
+        try:
+            conn = await asyncpg.connect(_dsn())
+            conn.add_termination_listener(lambda _: closed.set())
+            for channel in _handlers:
+                await conn.add_listener(channel, _dispatch)
+            for resync in _resync_hooks:
+                await resync()
+            logger.debug(f"LISTEN: {', '.join(_handlers)}")
+            _connected = True
+            await closed.wait()
+            logger.warning("LISTEN-соединение закрыто, переподключаемся")
+        except asyncio.CancelledError:
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+            raise
+        except Exception as e:
+            logger.error(f"LISTEN: ошибка соединения: {e}")
+        finally:
+            _connected = False
+        await asyncio.sleep(_RECONNECT_DELAY)
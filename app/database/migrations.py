@@ -0,0 +1,182 @@
+"""
+Версионные миграции схемы.
+
+Применённые версии записываются в schema_version; при старте (или через
+python -m app.scripts migrate) выполняются только новые. Миграции
+выполняются под pg_advisory_lock — реплики, стартующие одновременно,
+применяют их по очереди, а не параллельно. Блокировка берётся опросом
+pg_try_advisory_lock, чтобы ожидающий не держал снимок (см. _acquire_lock).
+
+Миграция 1 — create_all по моделям, поэтому новая БД сразу получает
+актуальную схему, а остальные миграции должны быть идемпотентными
+(IF NOT EXISTS): на новой БД они ничего не делают, на старой — догоняют.
+Индексы на живых таблицах строятся CREATE INDEX CONCURRENTLY (без
+блокировки записи) — такие миграции выполняются вне транзакции.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Optional, Union
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.database.engine import Base, engine
+
+
+SchemaStep = Union[str, Callable[[AsyncConnection], Awaitable[None]]]
+
+# Ключ pg_advisory_lock на время миграций и пауза между попытками его взять (с)
+_LOCK_KEY = 0x6D696772  # "migr"
+_LOCK_POLL_INTERVAL = 0.5
+
+_CREATE_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version integer PRIMARY KEY,
+    name text NOT NULL,
+    applied_at timestamp without time zone NOT NULL DEFAULT timezone('utc', now())
+)
+"""
+
+_INVALID_INDEX = """
+SELECT NOT i.indisvalid
+FROM pg_index i
+JOIN pg_class c ON c.oid = i.indexrelid
+WHERE c.relname = :name AND c.relnamespace = current_schema()::regnamespace
+"""
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    steps: tuple[SchemaStep, ...]
+    # False — шаги нельзя выполнять в транзакции (CREATE INDEX CONCURRENTLY)
+    transactional: bool = True
+
+
+async def _create_all(conn: AsyncConnection) -> None:
+    import app.database.models  # noqa: F401 — нужен для metadata
+    await conn.run_sync(Base.metadata.create_all)
+
+
+def concurrent_index(name: str, definition: str) -> SchemaStep:
+    """Шаг: CREATE INDEX CONCURRENTLY IF NOT EXISTS name definition."""
+    async def step(conn: AsyncConnection) -> None:
+        # Прерванный CONCURRENTLY оставляет невалидный индекс — IF NOT EXISTS его бы пропустил
+        invalid = (await conn.execute(text(_INVALID_INDEX), {"name": name})).scalar()
+        if invalid:
+            logger.warning(f"БД: индекс {name} невалиден (прерванное построение) — пересоздаём")
+            await conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+        await conn.execute(text(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" {definition}'))
+    return step
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, "базовая схема", (_create_all,)),
+    Migration(2, "user.subscription_updated_at", (
+        'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS subscription_updated_at TIMESTAMP WITHOUT TIME ZONE',
+    )),
+    Migration(3, "индекс ожидающих подарок", (
+        concurrent_index("ix_user_pending_gift", 'ON "user" (id) WHERE pending_gift IS TRUE'),
+    ), transactional=False),
+    Migration(4, "индекс получивших подарок", (
+        concurrent_index("ix_user_gift_received", 'ON "user" (id) WHERE gift_received IS TRUE'),
+    ), transactional=False),
+    Migration(5, "индекс user.created_at", (
+        concurrent_index("ix_user_created_at", 'ON "user" (created_at)'),
+    ), transactional=False),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+async def _read_version(conn: AsyncConnection) -> int:
+    exists = (await conn.execute(text("SELECT to_regclass('schema_version') IS NOT NULL"))).scalar()
+    if not exists:
+        return 0
+    return (await conn.execute(text("SELECT COALESCE(max(version), 0) FROM schema_version"))).scalar_one()
+
+
+async def get_schema_version() -> int:
+    """Текущая версия схемы одним запросом (0 — миграции ещё не применялись)."""
+    try:
+        async with engine.connect() as conn:
+            return (await conn.execute(text("SELECT COALESCE(max(version), 0) FROM schema_version"))).scalar_one()
+    except ProgrammingError:
+        # schema_version ещё нет
+        return 0
+
+
+async def get_applied_migrations() -> list[tuple[int, str, datetime]]:
+    """(версия, название, когда применена) из schema_version."""
+    async with engine.connect() as conn:
+        if not await _read_version(conn):
+            return []
+        result = await conn.execute(text("SELECT version, name, applied_at FROM schema_version ORDER BY version"))
+        return [tuple(row) for row in result.all()]
+
+
+async def _run_steps(conn: AsyncConnection, migration: Migration) -> None:
+    for step in migration.steps:
+        if isinstance(step, str):
+            await conn.execute(text(step))
+        else:
+            await step(conn)
+    await conn.execute(
+        text("INSERT INTO schema_version (version, name) VALUES (:version, :name)"),
+        {"version": migration.version, "name": migration.name},
+    )
+
+
+async def _acquire_lock(conn: AsyncConnection) -> None:
+    """
+    Взять pg_advisory_lock опросом pg_try_advisory_lock.
+
+    Не pg_advisory_lock: ожидающий в нём запрос держит снимок, а
+    CREATE INDEX CONCURRENTLY у держателя блокировки ждёт завершения всех
+    старых снимков — вместе они дали бы deadlock. Между попытками у
+    ожидающей реплики нет открытого запроса.
+    """
+    waited = False
+    while not (await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _LOCK_KEY})).scalar():
+        if not waited:
+            logger.info("БД: миграции применяет другой процесс — ждём")
+            waited = True
+        await asyncio.sleep(_LOCK_POLL_INTERVAL)
+
+
+async def apply_migrations(target: Optional[int] = None) -> list[Migration]:
+    """Применить новые миграции (до target включительно). Возвращает применённые."""
+    applied: list[Migration] = []
+    # Обычный старт: схема актуальна — один запрос, без блокировки
+    if await get_schema_version() >= (target or LATEST_VERSION):
+        return applied
+    async with engine.connect() as lock_conn:
+        lock_conn = await lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+        await _acquire_lock(lock_conn)
+        try:
+            await lock_conn.execute(text(_CREATE_VERSION_TABLE))
+            current = await _read_version(lock_conn)
+            for migration in MIGRATIONS:
+                if migration.version <= current or (target is not None and migration.version > target):
+                    continue
+                started = time.perf_counter()
+                if migration.transactional:
+                    async with engine.begin() as conn:
+                        await _run_steps(conn, migration)
+                else:
+                    await _run_steps(lock_conn, migration)
+                applied.append(migration)
+                logger.info(
+                    f"БД: миграция {migration.version} «{migration.name}» "
+                    f"применена за {time.perf_counter() - started:.2f} с"
+                )
+        finally:
+            await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _LOCK_KEY})
+    return applied
@@ -1,4 +1,21 @@
 from app.database.models.user import User
+from app.database.models.media import MediaFile
+from app.database.models.gift_drain import GiftDrain
+from app.database.models.export_log import ExportLog
+from app.database.models.stats import StatsCounter
+from app.database.models.star_ledger import StarLedger
+from app.database.models.vpn_user import VpnUser
+from app.database.models.runtime_flag import RuntimeFlag
+from app.database.models.gift_outbox import GiftOutbox
 
-__all__ = ["User"]
-
+__all__ = [
+    "User",
+    "MediaFile",
+    "GiftDrain",
+    "ExportLog",
+    "StatsCounter",
+    "StarLedger",
+    "VpnUser",
+    "RuntimeFlag",
+    "GiftOutbox",
+]
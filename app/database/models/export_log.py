@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import Boolean, DateTime, Integer, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.engine import Base
+
+
+class ExportLog(Base):
+    """История /export (нужна для инкрементальных выгрузок)."""
+    __tablename__ = "export_log"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    is_incremental: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default=text("false"))
+    rows: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+
+    # Время БД на момент начала выгрузки — граница для следующей инкрементальной
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), nullable=False)
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Boolean, DateTime, Integer, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.engine import Base
+
+
+class GiftDrain(Base):
+    """Чекпоинт массовой отправки ожидающих подарков (/send_pending)."""
+    __tablename__ = "gift_drain"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    is_finished: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default=text("false"))
+
+    # Все user_id <= cursor уже обработаны и закоммичены
+    cursor: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=text("0"))
+    # Текущая пачка: отправка начата, результат ещё не записан
+    in_flight: Mapped[list[int]] = mapped_column(
+        ARRAY(BigInteger), nullable=False, server_default=text("'{}'")
+    )
+    # Пачка, прерванная падением процесса: неизвестно, ушёл ли подарок
+    uncertain: Mapped[list[int]] = mapped_column(
+        ARRAY(BigInteger), nullable=False, server_default=text("'{}'")
+    )
+
+    sent: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    failed: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False),
+        server_default=text("timezone('utc', now())"),
+        nullable=False,
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False),
+        server_default=text("timezone('utc', now())"),
+        onupdate=text("timezone('utc', now())"),
+        nullable=False,
+    )
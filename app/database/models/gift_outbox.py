@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.engine import Base
+
+
+class GiftOutbox(Base):
+    """
+    Очередь отправки подарков: не больше одной строки на пользователя.
+
+    status: queued → sending → sent | pending (не хватило звёзд) | failed | stuck.
+    Строка, застрявшая в sending (процесс упал во время отправки), повторно
+    не отправляется — подарок мог уйти; поиск зависших переводит её в stuck.
+    """
+    __tablename__ = "gift_outbox"
+    __table_args__ = (
+        Index("ix_gift_outbox_queued", "id", postgresql_where=text("status = 'queued'")),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, nullable=False, unique=True)
+
+    # Сообщение пользователя, которое обновим по результату
+    chat_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    message_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    status: Mapped[str] = mapped_column(String(16), nullable=False, server_default=text("'queued'"))
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False),
+        server_default=text("timezone('utc', now())"),
+        nullable=False,
+    )
+    error: Mapped[str | None] = mapped_column(String(255), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False),
+        server_default=text("timezone('utc', now())"),
+        nullable=False,
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False),
+        server_default=text("timezone('utc', now())"),
+        onupdate=text("timezone('utc', now())"),
+        nullable=False,
+    )
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import DateTime, String, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.engine import Base
+
+
+class RuntimeFlag(Base):
+    """Флаг, общий для всех процессов бота (пауза и т.д.)."""
+    __tablename__ = "runtime_flag"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    value: Mapped[Any] = mapped_column(JSONB, nullable=False)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False),
+        server_default=text("timezone('utc', now())"),
+        onupdate=text("timezone('utc', now())"),
+        nullable=False,
+    )
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, SmallInteger, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.engine import Base
+
+
+class StarLedger(Base):
+    """Общий для всех реплик баланс звёзд (одна строка, id = 1)."""
+    __tablename__ = "star_ledger"
+
+    id: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    # Баланс по последней синхронизации с Telegram минус подтверждённые отправки
+    balance: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=text("0"))
+    # Зарезервировано под подарки, которые сейчас отправляются
+    reserved: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=text("0"))
+
+    synced_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False),
+        server_default=text("timezone('utc', now())"),
+        nullable=False,
+    )
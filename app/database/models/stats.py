@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from sqlalchemy import BigInteger, SmallInteger, String, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.engine import Base
+
+
+class StatsCounter(Base):
+    """
+    Счётчик по пользователям (участники, подписаны, подарки, очередь).
+
+    Обновляется триггером на "user"; разбит на шарды, чтобы параллельные
+    транзакции не дрались за одну строку. Значение = сумма по шардам.
+    """
+    __tablename__ = "stats_counter"
+
+    name: Mapped[str] = mapped_column(String(32), primary_key=True)
+    shard: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    value: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=text("0"))
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import BigInteger, DateTime, String, Boolean, text
+from sqlalchemy import BigInteger, DateTime, Index, String, Boolean, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database.engine import Base
@@ -11,6 +11,15 @@ from app.database.engine import Base
 class User(Base):
     """Участник розыгрыша."""
     __tablename__ = "user"
+    # Создаются миграциями (CONCURRENTLY); здесь — чтобы совпадала схема новой БД
+    __table_args__ = (
+        # Очередь ожидающих (keyset по id) и их число
+        Index("ix_user_pending_gift", "id", postgresql_where=text("pending_gift IS TRUE")),
+        # Число получивших подарок
+        Index("ix_user_gift_received", "id", postgresql_where=text("gift_received IS TRUE")),
+        # /export: ORDER BY created_at
+        Index("ix_user_created_at", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
     username: Mapped[str | None] = mapped_column(String(64), nullable=True)
@@ -18,8 +27,10 @@ class User(Base):
     # Админ
     is_admin: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default=text("false"))
     
-    # Кэш статуса подписки (обновляется при проверке)
+    # Кэш статуса подписки (обновляется при проверке и по chat_member)
     is_subscribed: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default=text("false"))
+    # Когда статус подписки пришёл из chat_member (NULL — событий не было)
+    subscription_updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=False), nullable=True)
     
     # Получил ли подарок
     gift_received: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default=text("false"))
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, String, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.engine import Base
+
+
+class VpnUser(Base):
+    """Пользователь Remnawave ({prefix}_{telegram_id}), подключивший VPN."""
+    __tablename__ = "vpn_user"
+
+    username: Mapped[str] = mapped_column(String(64), primary_key=True)
+    telegram_id: Mapped[int] = mapped_column(BigInteger, nullable=False, index=True)
+
+    # first_connected из Remnawave — после появления уже не сбрасывается
+    first_connected_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=False), nullable=True)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False),
+        server_default=text("timezone('utc', now())"),
+        onupdate=text("timezone('utc', now())"),
+        nullable=False,
+    )
@@ -1,27 +1,119 @@
 from app.database.repositories.user import (
     create_user_if_absent,
+    get_or_create_user,
     get_user,
     update_user_subscription,
+    set_subscription_from_event,
     mark_gift_received,
     set_pending_gift,
     get_pending_gift_users,
+    get_pending_gift_user_ids,
     get_all_users,
     get_participants_count,
     get_gifts_sent_count,
     get_pending_count,
-    is_admin,
+    get_admin_user_ids,
+    ensure_admins,
+)
+from app.database.repositories.media import (
+    get_media_file_id,
+    save_media_file_id,
+)
+from app.database.repositories.gift_drain import (
+    drain_lock,
+    get_active_drain,
+    create_drain,
+    resume_drain,
+    start_drain_chunk,
+    commit_drain_chunk,
+    finish_drain,
+)
+from app.database.repositories.export import (
+    get_last_export_at,
+    copy_users_csv,
+    save_export,
+)
+from app.database.repositories.stats import (
+    UserStats,
+    install_stats_triggers,
+    get_user_stats,
+    reconcile_user_stats,
+)
+from app.database.repositories.star_ledger import (
+    reserve_ledger_stars,
+    release_ledger_stars,
+    set_ledger_balance,
+    get_ledger_available,
+)
+from app.database.repositories.vpn_user import (
+    is_vpn_connected_saved,
+    save_vpn_connected,
+    upsert_vpn_users,
+)
+from app.database.repositories.runtime_flag import (
+    get_runtime_flags,
+    set_runtime_flag,
+)
+from app.database.repositories.gift_outbox import (
+    enqueue_gift,
+    claim_gift,
+    complete_gift,
+    defer_gift_to_pending,
+    retry_gift_later,
+    fail_gift,
+    get_gift_status,
+    get_outbox_counts,
+    mark_stuck_gifts,
 )
 
 __all__ = [
     "create_user_if_absent",
+    "get_or_create_user",
     "get_user",
     "update_user_subscription",
+    "set_subscription_from_event",
     "mark_gift_received",
     "set_pending_gift",
     "get_pending_gift_users",
+    "get_pending_gift_user_ids",
     "get_all_users",
     "get_participants_count",
     "get_gifts_sent_count",
     "get_pending_count",
-    "is_admin",
+    "get_admin_user_ids",
+    "ensure_admins",
+    "get_media_file_id",
+    "save_media_file_id",
+    "drain_lock",
+    "get_active_drain",
+    "create_drain",
+    "resume_drain",
+    "start_drain_chunk",
+    "commit_drain_chunk",
+    "finish_drain",
+    "get_last_export_at",
+    "copy_users_csv",
+    "save_export",
+    "UserStats",
+    "install_stats_triggers",
+    "get_user_stats",
+    "reconcile_user_stats",
+    "reserve_ledger_stars",
+    "release_ledger_stars",
+    "set_ledger_balance",
+    "get_ledger_available",
+    "is_vpn_connected_saved",
+    "save_vpn_connected",
+    "upsert_vpn_users",
+    "get_runtime_flags",
+    "set_runtime_flag",
+    "enqueue_gift",
+    "claim_gift",
+    "complete_gift",
+    "defer_gift_to_pending",
+    "retry_gift_later",
+    "fail_gift",
+    "get_gift_status",
+    "get_outbox_counts",
+    "mark_stuck_gifts",
 ]
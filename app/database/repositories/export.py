@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import func, select, text
+
+from app.database.engine import async_session_maker
+from app.database.models.export_log import ExportLog
+
+
+# Форматирование делает сам Postgres — Python только перекладывает байты
+_EXPORT_QUERY = """
+    SELECT
+        id,
+        COALESCE(username, ''),
+        CASE WHEN gift_received THEN 'да' ELSE 'нет' END,
+        CASE WHEN pending_gift THEN 'да' ELSE 'нет' END,
+        COALESCE(to_char(created_at, 'YYYY-MM-DD HH24:MI'), '')
+    FROM "user"
+    {where}
+    ORDER BY created_at
+"""
+
+
+async def get_last_export_at() -> Optional[datetime]:
+    """Время начала последней выгрузки."""
+    async with async_session_maker() as s:
+        result = await s.execute(select(func.max(ExportLog.started_at)))
+        return result.scalar()
+
+
+async def copy_users_csv(
+    output: Callable[[bytes], Awaitable[None]],
+    *,
+    since: Optional[datetime] = None,
+) -> tuple[int, datetime]:
+    """
+    Выгрузить пользователей в CSV через COPY ... TO STDOUT.
+
+    Строки не попадают в Python-объекты: asyncpg отдаёт готовые куски CSV
+    в output(). Если задан since — только созданные/изменённые после него.
+    Возвращает (число строк, время начала выгрузки по часам БД).
+    """
+    async with async_session_maker() as s:
+        conn = await s.connection()
+        started_at = (await conn.execute(text("SELECT timezone('utc', now())"))).scalar_one()
+
+        raw = (await conn.get_raw_connection()).driver_connection
+        if since is None:
+            status = await raw.copy_from_query(
+                _EXPORT_QUERY.format(where=""), output=output, format="csv"
+            )
+        else:
+            status = await raw.copy_from_query(
+                _EXPORT_QUERY.format(where="WHERE updated_at > $1 OR created_at > $1"),
+                since,
+                output=output,
+                format="csv",
+            )
+        await s.commit()
+
+    # asyncpg возвращает статус вида "COPY 123"
+    return int(status.split()[-1]), started_at
+
+
+async def save_export(started_at: datetime, rows: int, *, is_incremental: bool) -> None:
+    """Записать выгрузку в историю."""
+    async with async_session_maker() as s:
+        s.add(ExportLog(started_at=started_at, rows=rows, is_incremental=is_incremental))
+        await s.commit()
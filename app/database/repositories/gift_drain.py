@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database.engine import async_session_maker, engine
+from app.database.models.gift_drain import GiftDrain
+from app.database.models.gift_outbox import GiftOutbox
+from app.database.models.user import User
+from app.database.user_cache import update_user_status
+
+
+# Ключ pg_advisory_lock на время рассылки: одна рассылка на все реплики
+_LOCK_KEY = 0x64726169  # "drai"
+
+
+@asynccontextmanager
+async def drain_lock() -> AsyncIterator[bool]:
+    """
+    pg_try_advisory_lock на время рассылки. False — её уже ведёт другой процесс.
+
+    Блокировку держит отдельное соединение: если процесс упал, Postgres
+    снимет её сам, и незавершённая рассылка действительно прервана.
+    """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        acquired = (await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _LOCK_KEY})).scalar()
+        try:
+            yield bool(acquired)
+        finally:
+            if acquired:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _LOCK_KEY})
+
+
+async def get_active_drain() -> Optional[GiftDrain]:
+    """
+    Получить незавершённую рассылку (если процесс упал посреди /send_pending).
+
+    Вызывать под drain_lock: без неё незавершённой выглядит и рассылка,
+    которая прямо сейчас идёт в другой реплике.
+    """
+    async with async_session_maker() as s:
+        result = await s.execute(
+            select(GiftDrain)
+            .where(GiftDrain.is_finished.is_(False))
+            .order_by(GiftDrain.id.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+
+async def create_drain() -> GiftDrain:
+    """Начать новую рассылку."""
+    async with async_session_maker() as s:
+        drain = GiftDrain()
+        s.add(drain)
+        await s.commit()
+        await s.refresh(drain)
+        return drain
+
+
+async def resume_drain(drain_id: int, in_flight: list[int], uncertain: list[int], cursor: int) -> None:
+    """
+    Перенести прерванную пачку в uncertain и сдвинуть курсор за неё.
+
+    Её пользователи снимаются с pending_gift, а их строки очереди
+    переходят в stuck: ни новая рассылка, ни «Проверить» не отправят им
+    второй подарок, пока админ не разберётся.
+    """
+    now = func.timezone("utc", func.now())
+    async with async_session_maker() as s:
+        await s.execute(update(User).where(User.id.in_(in_flight)).values(pending_gift=False))
+        stmt = insert(GiftOutbox).values(
+            [{"user_id": user_id, "status": "stuck", "error": "drain interrupted"} for user_id in in_flight]
+        )
+        await s.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[GiftOutbox.user_id],
+                set_={"status": "stuck", "error": stmt.excluded.error, "updated_at": now},
+                where=GiftOutbox.status != "sent",
+            )
+        )
+        await s.execute(
+            update(GiftDrain)
+            .where(GiftDrain.id == drain_id)
+            .values(in_flight=[], uncertain=uncertain, cursor=cursor)
+        )
+        await s.commit()
+    for user_id in in_flight:
+        update_user_status(user_id, pending_gift=False)
+
+
+async def start_drain_chunk(drain_id: int, user_ids: list[int]) -> None:
+    """Записать пачку, которую сейчас отправляем."""
+    async with async_session_maker() as s:
+        await s.execute(
+            update(GiftDrain).where(GiftDrain.id == drain_id).values(in_flight=user_ids)
+        )
+        await s.commit()
+
+
+async def commit_drain_chunk(
+    drain_id: int,
+    sent_ids: list[int],
+    *,
+    cursor: int,
+    sent: int,
+    failed: int,
+) -> None:
+    """
+    Одной транзакцией: отметить подарки пачки полученными (один UPDATE)
+    и сдвинуть чекпоинт.
+    """
+    async with async_session_maker() as s:
+        if sent_ids:
+            await s.execute(
+                update(User)
+                .where(User.id.in_(sent_ids))
+                .values(
+                    gift_received=True,
+                    gift_received_at=datetime.utcnow(),
+                    pending_gift=False,
+                )
+            )
+            # Строки очереди, ушедшие в pending, закрываем тоже
+            await s.execute(
+                update(GiftOutbox).where(GiftOutbox.user_id.in_(sent_ids)).values(status="sent")
+            )
+        await s.execute(
+            update(GiftDrain)
+            .where(GiftDrain.id == drain_id)
+            .values(in_flight=[], cursor=cursor, sent=sent, failed=failed)
+        )
+        await s.commit()
+    for user_id in sent_ids:
+        update_user_status(user_id, gift_received=True, pending_gift=False)
+
+
+async def finish_drain(drain_id: int) -> None:
+    """Отметить рассылку завершённой."""
+    async with async_session_maker() as s:
+        await s.execute(
+            update(GiftDrain).where(GiftDrain.id == drain_id).values(is_finished=True)
+        )
+        await s.commit()
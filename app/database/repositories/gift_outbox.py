@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import Row, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.engine import async_session_maker, use_session
+from app.database.models.gift_outbox import GiftOutbox
+from app.database.models.user import User
+from app.database.user_cache import update_user_status
+
+
+# Канал NOTIFY: будит воркеры сразу после постановки подарка в очередь
+OUTBOX_CHANNEL = "gift_outbox"
+
+
+async def enqueue_gift(
+    user_id: int,
+    chat_id: Optional[int],
+    message_id: Optional[int],
+    *,
+    session: Optional[AsyncSession] = None,
+) -> bool:
+    """
+    Поставить подарок в очередь. False — пользователь уже в очереди (или получил).
+
+    Строка в failed (Telegram отклонил отправку — подарок точно не ушёл)
+    ставится в очередь заново. Воркеры увидят строку и получат NOTIFY после коммита.
+    """
+    now = func.timezone("utc", func.now())
+    stmt = insert(GiftOutbox).values(user_id=user_id, chat_id=chat_id, message_id=message_id)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[GiftOutbox.user_id],
+        set_={
+            "status": "queued",
+            "chat_id": stmt.excluded.chat_id,
+            "message_id": stmt.excluded.message_id,
+            "next_attempt_at": now,
+            "error": None,
+            "updated_at": now,
+        },
+        where=GiftOutbox.status == "failed",
+    )
+    async with use_session(session) as s:
+        result = await s.execute(stmt.returning(GiftOutbox.id))
+        created = result.scalar_one_or_none() is not None
+        if created:
+            await s.execute(select(func.pg_notify(OUTBOX_CHANNEL, "")))
+        return created
+
+
+async def get_gift_status(user_id: int, *, session: Optional[AsyncSession] = None) -> Optional[str]:
+    """Статус строки очереди пользователя (None — строки нет)."""
+    async with use_session(session) as s:
+        result = await s.execute(select(GiftOutbox.status).where(GiftOutbox.user_id == user_id))
+        return result.scalar_one_or_none()
+
+
+async def claim_gift() -> Optional[Row]:
+    """
+    Забрать один подарок из очереди (status → sending) прямо перед отправкой.
+
+    По одной строке: если процесс упадёт во время send_gift, в sending
+    останется только та строка, отправка которой действительно началась.
+    FOR UPDATE SKIP LOCKED: параллельные воркеры и реплики не получат
+    одну и ту же строку и не ждут друг друга.
+    """
+    now = func.timezone("utc", func.now())
+    claimable = (
+        select(GiftOutbox.id)
+        .where(GiftOutbox.status == "queued", GiftOutbox.next_attempt_at <= now)
+        .order_by(GiftOutbox.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    async with async_session_maker() as s:
+        result = await s.execute(
+            update(GiftOutbox)
+            .where(GiftOutbox.id.in_(claimable))
+            .values(status="sending", attempts=GiftOutbox.attempts + 1)
+            .returning(
+                GiftOutbox.id,
+                GiftOutbox.user_id,
+                GiftOutbox.chat_id,
+                GiftOutbox.message_id,
+            )
+        )
+        row = result.one_or_none()
+        await s.commit()
+        return row
+
+
+async def complete_gift(outbox_id: int, user_id: int) -> None:
+    """Подарок ушёл: одной транзакцией отмечаем очередь и пользователя."""
+    async with async_session_maker() as s:
+        await s.execute(
+            update(GiftOutbox).where(GiftOutbox.id == outbox_id).values(status="sent", error=None)
+        )
+        await s.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(
+                gift_received=True,
+                gift_received_at=datetime.utcnow(),
+                pending_gift=False,
+            )
+        )
+        await s.commit()
+    update_user_status(user_id, gift_received=True, pending_gift=False)
+
+
+async def defer_gift_to_pending(outbox_id: int, user_id: int) -> None:
+    """Не хватило звёзд: пользователь уходит в очередь /send_pending."""
+    async with async_session_maker() as s:
+        await s.execute(
+            update(GiftOutbox).where(GiftOutbox.id == outbox_id).values(status="pending")
+        )
+        await s.execute(update(User).where(User.id == user_id).values(pending_gift=True))
+        await s.commit()
+    update_user_status(user_id, pending_gift=True)
+
+
+async def retry_gift_later(outbox_id: int, delay: float) -> None:
+    """Вернуть в очередь (подарок точно не ушёл, например flood control)."""
+    async with async_session_maker() as s:
+        await s.execute(
+            update(GiftOutbox)
+            .where(GiftOutbox.id == outbox_id)
+            .values(
+                status="queued",
+                next_attempt_at=datetime.utcnow() + timedelta(seconds=delay),
+            )
+        )
+        await s.commit()
+
+
+async def fail_gift(outbox_id: int, error: str, *, status: str = "failed") -> None:
+    """
+    Отправка не удалась (автоматически не повторяем).
+
+    failed — подарок точно не ушёл, следующее «Проверить» поставит его заново;
+    stuck — неизвестно, ушёл ли (сетевая ошибка), решает админ.
+    """
+    async with async_session_maker() as s:
+        await s.execute(
+            update(GiftOutbox)
+            .where(GiftOutbox.id == outbox_id)
+            .values(status=status, error=error[:255])
+        )
+        await s.commit()
+
+
+async def mark_stuck_gifts(older_than: float) -> list[int]:
+    """
+    Строки, которые дольше older_than секунд в sending (процесс упал во время
+    отправки), → stuck. Повторно не отправляются — подарок мог уйти,
+    решает админ. Возвращает user_id помеченных.
+    """
+    async with async_session_maker() as s:
+        result = await s.execute(
+            update(GiftOutbox)
+            .where(
+                GiftOutbox.status == "sending",
+                GiftOutbox.updated_at < datetime.utcnow() - timedelta(seconds=older_than),
+            )
+            .values(status="stuck")
+            .returning(GiftOutbox.user_id)
+        )
+        user_ids = list(result.scalars().all())
+        await s.commit()
+        return user_ids
+
+
+async def get_outbox_counts() -> dict[str, int]:
+    """Число строк очереди по статусам."""
+    async with async_session_maker() as s:
+        result = await s.execute(
+            select(GiftOutbox.status, func.count(GiftOutbox.id)).group_by(GiftOutbox.status)
+        )
+        return dict(result.all())
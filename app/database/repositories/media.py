@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database.engine import async_session_maker
+from app.database.models.media import MediaFile
+
+
+async def get_media_file_id(content_hash: str) -> Optional[str]:
+    """Получить file_id загруженного файла по хэшу содержимого."""
+    async with async_session_maker() as s:
+        result = await s.execute(
+            select(MediaFile.file_id).where(MediaFile.content_hash == content_hash)
+        )
+        return result.scalar_one_or_none()
+
+
+async def save_media_file_id(content_hash: str, path: str, file_id: str) -> None:
+    """Сохранить file_id (перезаписывает, если файл перезагружали)."""
+    async with async_session_maker() as s:
+        stmt = insert(MediaFile).values(content_hash=content_hash, path=path, file_id=file_id)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MediaFile.content_hash],
+            set_={"path": stmt.excluded.path, "file_id": stmt.excluded.file_id},
+        )
+        await s.execute(stmt)
+        await s.commit()
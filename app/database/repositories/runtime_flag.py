@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database.engine import async_session_maker
+from app.database.models.runtime_flag import RuntimeFlag
+
+
+# Канал NOTIFY, в который уходит {"name": ..., "value": ...} при изменении флага
+FLAGS_CHANNEL = "runtime_flags"
+
+
+async def get_runtime_flags() -> dict[str, Any]:
+    """Все флаги."""
+    async with async_session_maker() as s:
+        result = await s.execute(select(RuntimeFlag.name, RuntimeFlag.value))
+        return dict(result.all())
+
+
+async def set_runtime_flag(name: str, value: Any) -> None:
+    """Записать флаг и оповестить остальные процессы (NOTIFY уходит при коммите)."""
+    async with async_session_maker() as s:
+        stmt = insert(RuntimeFlag).values(name=name, value=value)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RuntimeFlag.name],
+            set_={"value": stmt.excluded.value, "updated_at": func.timezone("utc", func.now())},
+        )
+        await s.execute(stmt)
+        await s.execute(
+            select(func.pg_notify(FLAGS_CHANNEL, json.dumps({"name": name, "value": value})))
+        )
+        await s.commit()
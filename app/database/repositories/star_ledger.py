@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database.engine import async_session_maker
+from app.database.models.star_ledger import StarLedger
+
+
+_LEDGER_ID = 1
+
+
+async def reserve_ledger_stars(amount: int) -> Optional[bool]:
+    """
+    Атомарно зарезервировать звёзды.
+
+    True — зарезервировано, False — не хватает, None — баланс ещё ни разу
+    не синхронизировали (строки нет).
+    """
+    async with async_session_maker() as s:
+        result = await s.execute(
+            update(StarLedger)
+            .where(
+                StarLedger.id == _LEDGER_ID,
+                StarLedger.balance - StarLedger.reserved >= amount,
+            )
+            .values(reserved=StarLedger.reserved + amount)
+            .returning(StarLedger.id)
+        )
+        reserved = result.scalar_one_or_none() is not None
+        await s.commit()
+        if reserved:
+            return True
+
+        exists = await s.execute(select(StarLedger.id).where(StarLedger.id == _LEDGER_ID))
+        return False if exists.scalar_one_or_none() is not None else None
+
+
+async def release_ledger_stars(amount: int, *, spent: bool) -> None:
+    """Снять резерв; spent=True — звёзды потрачены (подарок ушёл)."""
+    values = {"reserved": func.greatest(StarLedger.reserved - amount, 0)}
+    if spent:
+        values["balance"] = StarLedger.balance - amount
+
+    async with async_session_maker() as s:
+        await s.execute(update(StarLedger).where(StarLedger.id == _LEDGER_ID).values(**values))
+        await s.commit()
+
+
+async def set_ledger_balance(balance: int) -> None:
+    """
+    Записать баланс из Telegram.
+
+    reserved не трогаем: строка общая для реплик, и в нём резервы подарков,
+    которые другие реплики отправляют прямо сейчас.
+    """
+    async with async_session_maker() as s:
+        stmt = insert(StarLedger).values(id=_LEDGER_ID, balance=balance)
+        set_ = {"balance": stmt.excluded.balance, "synced_at": func.timezone("utc", func.now())}
+        await s.execute(stmt.on_conflict_do_update(index_elements=[StarLedger.id], set_=set_))
+        await s.commit()
+
+
+async def get_ledger_available() -> Optional[int]:
+    """Свободный баланс (balance - reserved) или None, если ещё не синхронизировали."""
+    async with async_session_maker() as s:
+        result = await s.execute(
+            select(StarLedger.balance - StarLedger.reserved).where(StarLedger.id == _LEDGER_ID)
+        )
+        return result.scalar_one_or_none()
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.database.engine import async_session_maker, engine
+from app.database.models.stats import StatsCounter
+
+
+# Число шардов счётчика: соединение пишет в шард pg_backend_pid() % _SHARDS
+_SHARDS = 16
+
+_TRIGGER_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION user_stats_counter() RETURNS trigger AS $$
+DECLARE
+    d_participants int := 0;
+    d_subscribed int := 0;
+    d_gifts_sent int := 0;
+    d_pending int := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        d_participants := d_participants - 1;
+        d_subscribed := d_subscribed - OLD.is_subscribed::int;
+        d_gifts_sent := d_gifts_sent - OLD.gift_received::int;
+        d_pending := d_pending - OLD.pending_gift::int;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        d_participants := d_participants + 1;
+        d_subscribed := d_subscribed + NEW.is_subscribed::int;
+        d_gifts_sent := d_gifts_sent + NEW.gift_received::int;
+        d_pending := d_pending + NEW.pending_gift::int;
+    END IF;
+
+    INSERT INTO stats_counter AS c (name, shard, value)
+    SELECT v.name, pg_backend_pid() % {_SHARDS}, v.delta
+    FROM (VALUES
+        ('participants', d_participants),
+        ('subscribed', d_subscribed),
+        ('gifts_sent', d_gifts_sent),
+        ('pending', d_pending)
+    ) AS v(name, delta)
+    WHERE v.delta <> 0
+    ON CONFLICT (name, shard) DO UPDATE SET value = c.value + EXCLUDED.value;
+
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+_TRIGGER = """
+CREATE OR REPLACE TRIGGER user_stats_counter
+AFTER INSERT OR DELETE OR UPDATE OF is_subscribed, gift_received, pending_gift ON "user"
+FOR EACH ROW EXECUTE FUNCTION user_stats_counter()
+"""
+
+_COUNT_QUERY = """
+SELECT
+    COUNT(*),
+    COUNT(*) FILTER (WHERE is_subscribed),
+    COUNT(*) FILTER (WHERE gift_received),
+    COUNT(*) FILTER (WHERE pending_gift)
+FROM "user"
+"""
+
+
+@dataclass(frozen=True)
+class UserStats:
+    participants: int = 0
+    subscribed: int = 0
+    gifts_sent: int = 0
+    pending: int = 0
+
+
+async def install_stats_triggers() -> None:
+    """Создать/обновить триггер, поддерживающий stats_counter (идемпотентно)."""
+    async with async_session_maker() as s:
+        await s.execute(text(_TRIGGER_FUNCTION))
+        await s.execute(text(_TRIGGER))
+        await s.commit()
+
+
+async def _read_counters(s: AsyncSession | AsyncConnection) -> UserStats:
+    result = await s.execute(
+        select(StatsCounter.name, func.sum(StatsCounter.value)).group_by(StatsCounter.name)
+    )
+    values = {name: int(value) for name, value in result.all()}
+    return UserStats(**{name: values.get(name, 0) for name in UserStats.__dataclass_fields__})
+
+
+async def get_user_stats() -> UserStats:
+    """Все счётчики одним запросом (согласованный снимок)."""
+    async with async_session_maker() as s:
+        return await _read_counters(s)
+
+
+async def reconcile_user_stats() -> tuple[UserStats, UserStats]:
+    """
+    Пересчитать счётчики одним COUNT(*) FILTER (...) и исправить расхождение.
+
+    Счётчики и таблица читаются в одном снимке REPEATABLE READ (триггер
+    меняет их в той же транзакции, что и "user"), поэтому разница между
+    ними — точное расхождение. Оно добавляется к счётчикам отдельной
+    короткой транзакцией: изменения, закоммиченные во время скана, уже
+    учтены триггером и не теряются, а вставки и апдейты "user" ни на чём
+    не ждут. Возвращает (было, стало) на момент снимка.
+    """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="REPEATABLE READ")
+        async with conn.begin():
+            before = await _read_counters(conn)
+            row = (await conn.execute(text(_COUNT_QUERY))).one()
+            actual = UserStats(*row)
+
+    corrections = [
+        {"name": name, "shard": 0, "value": getattr(actual, name) - getattr(before, name)}
+        for name in UserStats.__dataclass_fields__
+        if getattr(actual, name) != getattr(before, name)
+    ]
+    if corrections:
+        stmt = insert(StatsCounter)
+        async with async_session_maker() as s:
+            await s.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[StatsCounter.name, StatsCounter.shard],
+                    set_={"value": StatsCounter.value + stmt.excluded.value},
+                ),
+                corrections,
+            )
+            await s.commit()
+    return before, actual
@@ -1,14 +1,49 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Optional
 
-from sqlalchemy import select, update, func
+from sqlalchemy import select, text, update, func
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.engine import async_session_maker
+from app.database.engine import async_session_maker, call_after_commit, use_session
 from app.database.models.user import User
+from app.database.user_cache import USER_STATUS_CHANNEL, remember_user_status, update_user_status
+
+
+_STATUS_TRIGGER_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION user_status_notify() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('{USER_STATUS_CHANNEL}', json_build_object('id', OLD.id, 'deleted', true)::text);
+    ELSIF (OLD.gift_received, OLD.pending_gift, OLD.is_subscribed)
+          IS DISTINCT FROM (NEW.gift_received, NEW.pending_gift, NEW.is_subscribed) THEN
+        PERFORM pg_notify('{USER_STATUS_CHANNEL}', json_build_object(
+            'id', NEW.id,
+            'gift_received', NEW.gift_received,
+            'pending_gift', NEW.pending_gift,
+            'is_subscribed', NEW.is_subscribed
+        )::text);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+_STATUS_TRIGGER = """
+CREATE OR REPLACE TRIGGER user_status_notify
+AFTER DELETE OR UPDATE OF is_subscribed, gift_received, pending_gift ON "user"
+FOR EACH ROW EXECUTE FUNCTION user_status_notify()
+"""
+
+
+async def install_user_status_trigger() -> None:
+    """Создать/обновить триггер, рассылающий изменения статуса через NOTIFY."""
+    async with async_session_maker() as s:
+        await s.execute(text(_STATUS_TRIGGER_FUNCTION))
+        await s.execute(text(_STATUS_TRIGGER))
+        await s.commit()
 
 
 async def create_user_if_absent(
@@ -18,8 +53,7 @@ async def create_user_if_absent(
     session: Optional[AsyncSession] = None,
 ) -> bool:
     """Возвращает True, если пользователь создан; False, если уже существовал."""
-    sess = session or async_session_maker()
-    async with sess as s:
+    async with use_session(session) as s:
         stmt = (
             insert(User)
             .values(id=user_id, username=username)
@@ -27,29 +61,88 @@ async def create_user_if_absent(
             .returning(User.id)
         )
         res = await s.execute(stmt)
-        await s.commit()
         return res.scalar_one_or_none() is not None
 
 
-async def get_user(user_id: int) -> Optional[User]:
+async def get_or_create_user(
+    user_id: int,
+    *,
+    username: Optional[str] = None,
+    session: Optional[AsyncSession] = None,
+) -> User:
+    """
+    Получить пользователя, создав при необходимости, — обычно один запрос
+    INSERT ... ON CONFLICT DO UPDATE ... RETURNING (заодно обновляет username).
+
+    UPDATE выполняется, только если username поменялся: иначе каждый апдейт
+    писал бы новую версию строки (WAL, блокировка). Когда обновлять нечего,
+    RETURNING пуст и пользователь дочитывается SELECT'ом.
+    """
+    async with use_session(session) as s:
+        stmt = insert(User).values(id=user_id, username=username)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.id],
+            set_={"username": stmt.excluded.username},
+            where=User.username.is_distinct_from(stmt.excluded.username),
+        ).returning(User)
+        result = await s.scalars(stmt, execution_options={"populate_existing": True})
+        user = result.one_or_none()
+        if user is None:
+            result = await s.scalars(
+                select(User).where(User.id == user_id),
+                execution_options={"populate_existing": True},
+            )
+            user = result.one()
+        remember_user_status(
+            user.id,
+            gift_received=user.gift_received,
+            pending_gift=user.pending_gift,
+            is_subscribed=user.is_subscribed,
+        )
+        return user
+
+
+async def get_user(user_id: int, *, session: Optional[AsyncSession] = None) -> Optional[User]:
     """Получить пользователя по id."""
-    async with async_session_maker() as s:
+    async with use_session(session) as s:
         result = await s.execute(select(User).where(User.id == user_id))
         return result.scalar_one_or_none()
 
 
-async def update_user_subscription(user_id: int, is_subscribed: bool) -> None:
-    """Обновить статус подписки на канал."""
-    async with async_session_maker() as s:
+async def update_user_subscription(
+    user_id: int,
+    is_subscribed: bool,
+    *,
+    session: Optional[AsyncSession] = None,
+) -> None:
+    """Обновить статус подписки на канал (ответ get_chat_member)."""
+    async with use_session(session) as s:
         await s.execute(
-            update(User).where(User.id == user_id).values(is_subscribed=is_subscribed)
+            update(User)
+            .where(User.id == user_id)
+            .values(is_subscribed=is_subscribed, subscription_updated_at=datetime.utcnow())
         )
+    call_after_commit(session, lambda: update_user_status(user_id, is_subscribed=is_subscribed))
+
+
+async def set_subscription_from_event(user_id: int, is_subscribed: bool) -> bool:
+    """Записать статус подписки из chat_member. False — пользователя нет в БД."""
+    async with async_session_maker() as s:
+        result = await s.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(is_subscribed=is_subscribed, subscription_updated_at=datetime.utcnow())
+            .returning(User.id)
+        )
+        found = result.scalar_one_or_none() is not None
         await s.commit()
+    update_user_status(user_id, is_subscribed=is_subscribed)
+    return found
 
 
-async def mark_gift_received(user_id: int) -> None:
+async def mark_gift_received(user_id: int, *, session: Optional[AsyncSession] = None) -> None:
     """Отметить, что пользователь получил подарок."""
-    async with async_session_maker() as s:
+    async with use_session(session) as s:
         await s.execute(
             update(User)
             .where(User.id == user_id)
@@ -59,16 +152,23 @@ async def mark_gift_received(user_id: int) -> None:
                 pending_gift=False,
             )
         )
-        await s.commit()
+    # Финальный статус: попав в кэш, он избавит пользователя от запросов в БД —
+    # поэтому только после коммита
+    call_after_commit(session, lambda: update_user_status(user_id, gift_received=True, pending_gift=False))
 
 
-async def set_pending_gift(user_id: int, pending: bool) -> None:
+async def set_pending_gift(
+    user_id: int,
+    pending: bool,
+    *,
+    session: Optional[AsyncSession] = None,
+) -> None:
     """Установить флаг ожидания подарка."""
-    async with async_session_maker() as s:
+    async with use_session(session) as s:
         await s.execute(
             update(User).where(User.id == user_id).values(pending_gift=pending)
         )
-        await s.commit()
+    call_after_commit(session, lambda: update_user_status(user_id, pending_gift=pending))
 
 
 async def get_pending_gift_users() -> list[User]:
@@ -80,6 +180,18 @@ async def get_pending_gift_users() -> list[User]:
         return list(result.scalars().all())
 
 
+async def get_pending_gift_user_ids(after_id: int = 0, limit: int = 100) -> list[int]:
+    """Следующая пачка id ожидающих подарок (keyset-пагинация по id)."""
+    async with async_session_maker() as s:
+        result = await s.execute(
+            select(User.id)
+            .where(User.pending_gift.is_(True), User.id > after_id)
+            .order_by(User.id)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+
 async def get_all_users() -> list[User]:
     """Получить всех пользователей для экспорта."""
     async with async_session_maker() as s:
@@ -112,14 +224,20 @@ async def get_pending_count() -> int:
         return result.scalar() or 0
 
 
-async def is_admin(user_id: int) -> bool:
-    """Проверить, является ли пользователь админом."""
-    from app.utils.config import settings
-    
-    # Сначала проверяем в конфиге
-    if user_id in settings.get_admin_ids():
-        return True
-    
-    # Потом в БД
-    user = await get_user(user_id)
-    return user.is_admin if user else False
+async def ensure_admins(admin_ids: Iterable[int]) -> None:
+    """Пометить пользователей админами (создав при необходимости) — одним INSERT ... ON CONFLICT."""
+    ids = sorted(set(admin_ids))
+    if not ids:
+        return
+    async with async_session_maker() as s:
+        stmt = insert(User).values([{"id": admin_id, "is_admin": True} for admin_id in ids])
+        stmt = stmt.on_conflict_do_update(index_elements=[User.id], set_={"is_admin": True})
+        await s.execute(stmt)
+        await s.commit()
+
+
+async def get_admin_user_ids() -> list[int]:
+    """Получить id пользователей с флагом is_admin."""
+    async with async_session_maker() as s:
+        result = await s.execute(select(User.id).where(User.is_admin.is_(True)))
+        return list(result.scalars().all())
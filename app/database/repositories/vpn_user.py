@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database.engine import async_session_maker
+from app.database.models.vpn_user import VpnUser
+
+
+async def is_vpn_connected_saved(username: str) -> bool:
+    """Есть ли сохранённое подключение VPN для пользователя Remnawave."""
+    async with async_session_maker() as s:
+        result = await s.execute(
+            select(VpnUser.username).where(
+                VpnUser.username == username,
+                VpnUser.first_connected_at.is_not(None),
+            )
+        )
+        return result.scalar_one_or_none() is not None
+
+
+async def save_vpn_connected(username: str, telegram_id: int, first_connected_at: datetime) -> None:
+    """Сохранить подтверждённое подключение VPN."""
+    async with async_session_maker() as s:
+        stmt = insert(VpnUser).values(
+            username=username,
+            telegram_id=telegram_id,
+            first_connected_at=first_connected_at,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[VpnUser.username],
+            set_={"first_connected_at": stmt.excluded.first_connected_at},
+        )
+        await s.execute(stmt)
+        await s.commit()
+
+
+async def upsert_vpn_users(rows: list[dict]) -> None:
+    """
+    Пакетно записать подключившихся пользователей Remnawave
+    (username, telegram_id, first_connected_at).
+
+    Идемпотентно: строки с уже известным first_connected_at не обновляются.
+    """
+    if not rows:
+        return
+    async with async_session_maker() as s:
+        stmt = insert(VpnUser).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[VpnUser.username],
+            set_={
+                "telegram_id": stmt.excluded.telegram_id,
+                "first_connected_at": func.coalesce(
+                    VpnUser.first_connected_at, stmt.excluded.first_connected_at
+                ),
+                "updated_at": func.timezone("utc", func.now()),
+            },
+            where=VpnUser.first_connected_at.is_(None),
+        )
+        await s.execute(stmt)
+        await s.commit()
@@ -0,0 +1,104 @@
+"""
+Кэш статусов пользователей в памяти процесса.
+
+user_id → UserStatus (gift_received, pending_gift, is_subscribed), LRU на
+user_cache_size записей. Записи обновляются сразу при записи в БД
+(write-through) и по NOTIFY от триггера на "user" — так другие реплики
+тоже видят изменения. Пользователь, уже получивший подарок, на повторные
+/start и «Проверить» отвечается без обращения к БД.
+"""
+from __future__ import annotations
+
+import json
+from collections import OrderedDict
+from typing import Optional
+
+from loguru import logger
+
+from app.database.listener import subscribe
+from app.utils.config import settings
+
+
+# Канал NOTIFY, в который триггер шлёт новый статус пользователя
+USER_STATUS_CHANNEL = "user_status"
+
+
+class UserStatus:
+    """Компактный статус пользователя."""
+
+    __slots__ = ("gift_received", "pending_gift", "is_subscribed")
+
+    def __init__(self, gift_received: bool, pending_gift: bool, is_subscribed: bool) -> None:
+        self.gift_received = gift_received
+        self.pending_gift = pending_gift
+        self.is_subscribed = is_subscribed
+
+    @property
+    def is_final(self) -> bool:
+        """Участие завершено: подарок получен или ждёт /send_pending."""
+        return self.gift_received or self.pending_gift
+
+    def __repr__(self) -> str:
+        return (
+            f"UserStatus(gift_received={self.gift_received}, "
+            f"pending_gift={self.pending_gift}, is_subscribed={self.is_subscribed})"
+        )
+
+
+_cache: OrderedDict[int, UserStatus] = OrderedDict()
+
+
+def get_user_status(user_id: int) -> Optional[UserStatus]:
+    """Статус из кэша (None — нет в кэше)."""
+    status = _cache.get(user_id)
+    if status is not None:
+        _cache.move_to_end(user_id)
+    return status
+
+
+def remember_user_status(
+    user_id: int,
+    *,
+    gift_received: bool,
+    pending_gift: bool,
+    is_subscribed: bool,
+) -> UserStatus:
+    """Положить статус в кэш (вытесняя самые давние записи)."""
+    status = UserStatus(gift_received, pending_gift, is_subscribed)
+    _cache[user_id] = status
+    _cache.move_to_end(user_id)
+    while len(_cache) > settings.user_cache_size:
+        _cache.popitem(last=False)
+    return status
+
+
+def update_user_status(user_id: int, **changes: bool) -> None:
+    """Write-through: поправить поля, если пользователь есть в кэше."""
+    status = _cache.get(user_id)
+    if status is None:
+        return
+    for name, value in changes.items():
+        setattr(status, name, value)
+
+
+def forget_user_status(user_id: int) -> None:
+    _cache.pop(user_id, None)
+
+
+def _on_notify(payload: str) -> None:
+    data = json.loads(payload)
+    user_id = data.pop("id")
+    if data.pop("deleted", False):
+        forget_user_status(user_id)
+    else:
+        update_user_status(user_id, **data)
+
+
+async def _resync() -> None:
+    # Пока LISTEN-соединения не было, уведомления могли потеряться
+    if _cache:
+        logger.debug(f"Кэш статусов: сброс {len(_cache)} записей после переподключения")
+    _cache.clear()
+
+
+subscribe(USER_STATUS_CHANNEL, _on_notify, resync=_resync)
@@ -1,4 +1,21 @@
-from app.i18n.catalog import tr
-
-__all__ = ["tr"]
+from app.i18n.catalog import (
+    catalog_version,
+    get_current_lang,
+    get_locales,
+    load_locales,
+    resolve_lang,
+    run_locale_watcher,
+    set_current_lang,
+    tr,
+)
 
+__all__ = [
+    "tr",
+    "load_locales",
+    "get_locales",
+    "get_current_lang",
+    "catalog_version",
+    "resolve_lang",
+    "run_locale_watcher",
+    "set_current_lang",
+]
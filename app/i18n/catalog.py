@@ -1,50 +1,223 @@
+"""
+Каталог локализаций.
+
+Все locales/*.yml при загрузке разворачиваются в плоские словари
+"start.welcome" → шаблон, по одному на язык. Шаблон разбирается заранее:
+строки без подстановок отдаются как есть, с подстановками — склейкой
+готовых сегментов (без повторного разбора строки на каждый tr()).
+Ошибки шаблонов и ключи, которых нет в языке по умолчанию (или которые
+используются в коде, но отсутствуют в каталоге), пишутся в лог при загрузке.
+
+Язык берётся из контекста апдейта (I18nMiddleware → from_user.language_code)
+с фолбэком: "pt-BR" → "pt" → язык по умолчанию.
+"""
 from __future__ import annotations
 
+import asyncio
+import re
+from contextvars import ContextVar
 from pathlib import Path
-from typing import Any
+from string import Formatter
+from typing import Any, Optional
 
 import yaml
+from loguru import logger
+
+from app.utils.config import settings
 
 _LOCALES_DIR = Path(__file__).parent / "locales"
-_cache: dict[str, dict] = {}
+_APP_DIR = Path(__file__).parent.parent
+
+# Ключи, используемые в коде: tr("start.welcome", ...)
+_KEY_USAGE = re.compile(r"""\btr\(\s*["']([\w.]+)["']""")
+
+_formatter = Formatter()
+
+
+class _Template:
+    """
+    Шаблон, разобранный при загрузке: кортеж (текст, поле, формат, конверсия).
+
+    При вызове сегменты только склеиваются — строка не разбирается заново.
+    Поля сложнее имени ({user.name}, {items[0]}, вложенный формат) редки:
+    для них segments = None и используется format_map.
+    """
+    __slots__ = ("text", "has_fields", "segments")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        # Разбор шаблона заодно проверяет синтаксис (ValueError при ошибке)
+        segments = tuple(_formatter.parse(text))
+        self.has_fields = any(field is not None for _, field, _, _ in segments)
+        simple = all(
+            field is None or (field.isidentifier() and "{" not in spec)
+            for _, field, spec, _ in segments
+        )
+        self.segments: Optional[tuple[tuple[str, Optional[str], str, Optional[str]], ...]] = (
+            segments if simple else None
+        )
+
+    def render(self, kwargs: dict[str, Any]) -> str:
+        if self.segments is None:
+            return self.text.format_map(kwargs)
+        parts = []
+        for literal, field, spec, conversion in self.segments:
+            parts.append(literal)
+            if field is not None:
+                value = kwargs[field]
+                if conversion:
+                    value = _formatter.convert_field(value, conversion)
+                parts.append(value if type(value) is str and not spec else format(value, spec))
+        return "".join(parts)
+
+
+# язык → ключ → шаблон
+_catalogs: dict[str, dict[str, _Template]] = {}
+# mtime файлов на момент загрузки (для горячей перезагрузки)
+_mtimes: dict[Path, float] = {}
+# Язык по умолчанию и его каталог — отдельно, чтобы tr() не ходил в settings
+_default_lang: str = settings.i18n_default_locale
+_default_catalog: dict[str, _Template] = {}
+# language_code → язык каталога
+_resolved: dict[str, str] = {}
+# Растёт при каждой загрузке — по нему сбрасываются кэши, собранные из текстов
+_version: int = 0
+
+_current_lang: ContextVar[Optional[str]] = ContextVar("i18n_lang", default=None)
+
+
+def _flatten(data: Any, prefix: str, out: dict[str, _Template], lang: str) -> None:
+    if isinstance(data, dict):
+        for key, value in data.items():
+            _flatten(value, f"{prefix}.{key}" if prefix else str(key), out, lang)
+        return
+    if data is None:
+        return
+    try:
+        out[prefix] = _Template(str(data))
+    except ValueError as e:
+        logger.error(f"i18n: {lang}.{prefix}: неверный шаблон: {e}")
+
+
+def _used_keys() -> set[str]:
+    keys: set[str] = set()
+    for path in _APP_DIR.rglob("*.py"):
+        keys.update(_KEY_USAGE.findall(path.read_text(encoding="utf-8")))
+    return keys
+
+
+def load_locales() -> None:
+    """Загрузить (или перезагрузить) все языки и проверить ключи."""
+    global _catalogs, _mtimes, _default_catalog, _version
+    catalogs: dict[str, dict[str, _Template]] = {}
+    mtimes: dict[Path, float] = {}
 
+    for path in sorted(_LOCALES_DIR.glob("*.yml")):
+        mtimes[path] = path.stat().st_mtime
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+        catalog: dict[str, _Template] = {}
+        _flatten(data, "", catalog, path.stem)
+        catalogs[path.stem] = catalog
 
-def _load_locale(lang: str) -> dict:
-    if lang not in _cache:
-        path = _LOCALES_DIR / f"{lang}.yml"
-        if path.exists():
-            with open(path, "r", encoding="utf-8") as f:
-                _cache[lang] = yaml.safe_load(f) or {}
+    default = catalogs.get(settings.i18n_default_locale, {})
+    if not default:
+        logger.error(f"i18n: нет языка по умолчанию {settings.i18n_default_locale}")
+
+    for lang, catalog in catalogs.items():
+        missing = default.keys() - catalog.keys()
+        if missing:
+            logger.warning(f"i18n: в {lang} нет ключей (будет {settings.i18n_default_locale}): {sorted(missing)}")
+
+    unknown = _used_keys() - default.keys()
+    if unknown:
+        logger.error(f"i18n: ключи используются в коде, но отсутствуют в каталоге: {sorted(unknown)}")
+
+    # Подмена целиком: параллельные tr() видят либо старый, либо новый каталог
+    _catalogs = catalogs
+    _default_catalog = default
+    _mtimes = mtimes
+    _resolved.clear()
+    _version += 1
+    logger.debug(f"i18n: загружено {', '.join(f'{lang}={len(c)}' for lang, c in catalogs.items())}")
+
+
+def get_locales() -> list[str]:
+    """Загруженные языки."""
+    return list(_catalogs)
+
+
+def catalog_version() -> int:
+    """Номер загрузки каталога (меняется при горячей перезагрузке)."""
+    return _version
+
+
+def get_current_lang() -> str:
+    """Язык текущего апдейта (или по умолчанию)."""
+    return _current_lang.get() or _default_lang
+
+
+def locales_changed() -> bool:
+    """Изменились ли файлы локализаций с последней загрузки."""
+    current = {path: path.stat().st_mtime for path in _LOCALES_DIR.glob("*.yml")}
+    return current != _mtimes
+
+
+def resolve_lang(language_code: Optional[str]) -> str:
+    """language_code Telegram → язык каталога ("pt-BR" → "pt" → по умолчанию)."""
+    if not language_code:
+        return settings.i18n_default_locale
+    lang = _resolved.get(language_code)
+    if lang is None:
+        code = language_code.lower().replace("_", "-")
+        for candidate in (code, code.split("-")[0]):
+            if candidate in _catalogs:
+                lang = candidate
+                break
         else:
-            _cache[lang] = {}
-    return _cache[lang]
+            lang = settings.i18n_default_locale
+        _resolved[language_code] = lang
+    return lang
+
+
+def set_current_lang(lang: Optional[str]) -> None:
+    """Язык для tr() без явного lang в текущем контексте (апдейте)."""
+    _current_lang.set(lang)
 
 
-def tr(key: str, lang: str = "ru", **kwargs: Any) -> str:
+def tr(key: str, lang: Optional[str] = None, **kwargs: Any) -> str:
     """
     Получить текст по ключу из локализации.
-    
+
     Пример: tr("start.welcome", name="Вася") → "Привет, Вася!"
-    
+
     Ключ может быть вложенным: "start.conditions.title"
     """
-    data = _load_locale(lang)
-    
-    # Разбираем вложенные ключи: "start.welcome" → data["start"]["welcome"]
-    keys = key.split(".")
-    value = data
-    for k in keys:
-        if isinstance(value, dict):
-            value = value.get(k)
-        else:
-            value = None
-            break
-    
-    if value is None:
-        return f"[{key}]"  # Если ключ не найден — показываем placeholder
-    
-    if isinstance(value, str) and kwargs:
-        return value.format(**kwargs)
-    
-    return str(value)
+    if not _catalogs:
+        load_locales()
+    lang = lang or _current_lang.get()
+
+    template = None
+    if lang is not None and lang != _default_lang:
+        catalog = _catalogs.get(lang)
+        if catalog is not None:
+            template = catalog.get(key)
+    if template is None:
+        template = _default_catalog.get(key)
+        if template is None:
+            return f"[{key}]"  # Если ключ не найден — показываем placeholder
+    if template.has_fields and kwargs:
+        return template.render(kwargs)
+    return template.text
+
 
+async def run_locale_watcher() -> None:
+    """Перезагружать каталог при изменении файлов (раз в i18n_reload_interval секунд)."""
+    while True:
+        await asyncio.sleep(settings.i18n_reload_interval)
+        try:
+            if locales_changed():
+                load_locales()
+                logger.info("i18n: локализации перезагружены")
+        except Exception as e:
+            logger.error(f"i18n: не удалось перезагрузить локализации: {e}")
@@ -1,16 +1,39 @@
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 
 from app.bot.handlers.private.start import router as start_router
 from app.bot.handlers.private.admin import router as admin_router
+from app.bot.handlers.channel.subscription import router as subscription_router
+from app.bot.middlewares.database import DatabaseSessionMiddleware
+from app.bot.middlewares.i18n import I18nMiddleware
 from app.bot.middlewares.logging import MessageLoggingMiddleware, CallbackLoggingMiddleware
+from app.bot.middlewares.metrics import BotApiMetricsMiddleware, UpdateMetricsMiddleware
+from app.bot.middlewares.recorder import UpdateRecorderMiddleware
+from app.bot.session import CachedMarkupSession
+from app.utils.config import settings
 
 
 def build_dp() -> Dispatcher:
     dp = Dispatcher(storage=MemoryStorage())
     
+    # Метрики (первым — чтобы учитывать и время работы с БД)
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    
+    # Запись апдейтов для replay (RECORD_UPDATES_PATH)
+    if settings.record_updates_path:
+        recorder = UpdateRecorderMiddleware(settings.record_updates_path, settings.record_updates_salt)
+        dp.update.outer_middleware(recorder)
+        dp.shutdown.register(recorder.close)
+    
+    # Сессия БД + пользователь на каждый апдейт
+    dp.update.outer_middleware(DatabaseSessionMiddleware())
+    
+    # Язык пользователя для tr()
+    dp.update.outer_middleware(I18nMiddleware())
+    
     # Middleware для логирования
     dp.message.middleware(MessageLoggingMiddleware())
     dp.callback_query.middleware(CallbackLoggingMiddleware())
@@ -18,11 +41,21 @@ def build_dp() -> Dispatcher:
     # Роутеры (admin первым для приоритета команд)
     dp.include_router(admin_router)
     dp.include_router(start_router)
+    dp.include_router(subscription_router)
     return dp
 
 
+def _build_session() -> CachedMarkupSession:
+    if settings.telegram_api_server:
+        return CachedMarkupSession(api=TelegramAPIServer.from_base(settings.telegram_api_server))
+    return CachedMarkupSession()
+
+
 def build_bot(bot_token: str) -> Bot:
-    return Bot(
+    bot = Bot(
         token=bot_token,
+        session=_build_session(),
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
+    bot.session.middleware(BotApiMetricsMiddleware())
+    return bot
@@ -0,0 +1,46 @@
+"""
+Единая точка входа для скриптов: python -m app.scripts <команда> [аргументы]
+
+    python -m app.scripts replay updates.jsonl.gz --speed 10
+    python -m app.scripts loadtest --users 500
+    python -m app.scripts bench-logging
+
+Команда — имя модуля в app/scripts (дефисы вместо подчёркиваний),
+аргументы передаются ему как есть. Без команды — список доступных.
+"""
+import os
+import pkgutil
+import runpy
+import sys
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def _commands() -> dict[str, str]:
+    scripts_dir = os.path.dirname(os.path.abspath(__file__))
+    return {
+        module.name.replace("_", "-"): f"app.scripts.{module.name}"
+        for module in pkgutil.iter_modules([scripts_dir])
+        if not module.name.startswith("_")
+    }
+
+
+def main() -> None:
+    commands = _commands()
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command not in commands:
+        asked_help = command in (None, "-h", "--help")
+        if not asked_help:
+            print(f"Неизвестная команда: {command}\n")
+        print("python -m app.scripts <команда> [аргументы]\n\nКоманды:")
+        for name in sorted(commands):
+            print(f"  {name}")
+        sys.exit(0 if asked_help else 2)
+
+    sys.argv = [f"app.scripts {command}", *sys.argv[2:]]
+    runpy.run_module(commands[command], run_name="__main__", alter_sys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+"""
+Микробенчмарки CPU на апдейт — без сети и БД.
+
+Запускай: python -m app.scripts bench-hot-paths [--save] [--threshold 0.25]
+
+Меряется: tr(), клавиатуры из giveaway.py, pack/unpack GiveawayCallback,
+логирующие middleware, admin_filter и полный Dispatcher.feed_update для
+/start и «Проверить». В feed_update настоящие build_dp() и сериализация
+запросов к Bot API; подменены только ввод-вывод: ответ Telegram (сессия
+без HTTP), загрузка пользователя из БД, file_id картинки и пауза проверки.
+
+Для каждого пути — операций в секунду (лучший из --rounds замеров) и память
+(tracemalloc): пик на одну операцию и сколько остаётся после неё. Результаты
+сравниваются с JSON-бейзлайном (--baseline); если путь замедлился или стал
+выделять больше порога — код выхода 1. Без бейзлайна сравнивать не с чем —
+код выхода 2. --save записывает текущий прогон как бейзлайн (с версией Python
+и архитектурой: сравнивать имеет смысл только на той же машине); порог на
+отдельный путь — "thresholds": {"имя": 0.3} в том же файле.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional, Union
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.enums import ParseMode
+from aiogram.methods import TelegramMethod
+from aiogram.types import CallbackQuery, Chat, Message, Update, User as TgUser
+
+from app.bot.session import CachedMarkupSession
+from app.utils.config import settings
+from app.utils.logging import setup_logging
+
+Bench = Callable[[], Union[Any, Awaitable[Any]]]
+
+_BOT_ID = 42
+_USER_ID = 10**12 + 7
+# Сколько операций гонять под tracemalloc
+_ALLOC_OPS = 200
+# Запас по памяти: мелкие колебания аллокатора не считаем регрессией
+_ALLOC_SLACK = 512
+
+
+@dataclass
+class Result:
+    ops_per_sec: float
+    peak_bytes: int
+    retained_bytes: float
+
+
+# ============ Telegram без сети ============
+
+class OfflineSession(CachedMarkupSession):
+    """Сессия, которая собирает запрос как для HTTP, но отвечает сама."""
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        self.build_form_data(bot=bot, method=method)
+        result = _fake_result(method.__api_method__, method)
+        response = self.check_response(
+            bot=bot,
+            method=method,
+            status_code=200,
+            content=json.dumps({"ok": True, "result": result}),
+        )
+        return response.result
+
+
+def _fake_result(name: str, method: TelegramMethod) -> Any:
+    if name in ("sendPhoto", "sendMessage", "editMessageCaption", "editMessageText"):
+        chat_id = getattr(method, "chat_id", None) or _USER_ID
+        message = {
+            "message_id": 1,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": _BOT_ID, "is_bot": True, "first_name": "Bench"},
+        }
+        if name == "sendPhoto":
+            message["photo"] = [{"file_id": "bench", "file_unique_id": "bench", "width": 1, "height": 1}]
+        return message
+    if name == "getChatMember":
+        return {"status": "member", "user": {"id": method.user_id, "is_bot": False, "first_name": "User"}}
+    return True
+
+
+def _start_update(bot: Bot, update_id: int) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": _USER_ID, "type": "private"},
+            "from": {"id": _USER_ID, "is_bot": False, "first_name": "User", "username": "bench", "language_code": "ru"},
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    }, context={"bot": bot})
+
+
+def _check_update(bot: Bot, update_id: int) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": {"id": _USER_ID, "is_bot": False, "first_name": "User", "username": "bench", "language_code": "ru"},
+            "chat_instance": "bench",
+            "data": "giveaway:check",
+            "message": {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": {"id": _USER_ID, "type": "private"},
+                "from": {"id": _BOT_ID, "is_bot": True, "first_name": "Bench"},
+                "photo": [{"file_id": "bench", "file_unique_id": "bench", "width": 1, "height": 1}],
+                "caption": "bench",
+            },
+        },
+    }, context={"bot": bot})
+
+
+def _isolate_io() -> None:
+    """Подменить ввод-вывод, до которого доходят /start и «Проверить»."""
+    import app.bot.middlewares.database as database_middleware
+    from app.bot.handlers.private.start import WELCOME_PIC_PATH
+    from app.database.models.user import User
+    from app.database.user_cache import remember_user_status
+    from app.services import media, remnawave
+
+    async def get_or_create_user(user_id: int, *, username=None, session=None) -> User:
+        # Подписка известна по chat_member — check_subscription не ходит в Telegram
+        user = User(
+            id=user_id,
+            username=username,
+            is_subscribed=True,
+            subscription_updated_at=datetime.utcnow(),
+            gift_received=False,
+            pending_gift=False,
+        )
+        remember_user_status(user_id, gift_received=False, pending_gift=False, is_subscribed=True)
+        return user
+
+    database_middleware.get_or_create_user = get_or_create_user
+
+    # file_id картинки уже известен — answer_photo не читает файл и не ходит в БД
+    settings.media_check_interval = float("inf")
+    media._entries[str(Path(WELCOME_PIC_PATH))] = media._MediaEntry(
+        mtime_ns=0, size=0, content_hash="bench", file_id="bench", data=None, checked_at=time.monotonic(),
+    )
+
+    # Без Remnawave проверка VPN отвечает «не подключён» без запросов:
+    # «Проверить» доходит до экрана «условия не выполнены»
+    settings.remnawave_api_url = None
+    remnawave._sdk = None
+    settings.check_conditions_delay = 0
+
+
+# ============ Пути ============
+
+def build_benches() -> dict[str, Bench]:
+    from app.bot.handlers.callback.my_callback import GiveawayCallback
+    from app.bot.handlers.private.admin import admin_filter
+    from app.bot.keyboards.inline.giveaway import build_conditions_failed, build_main_menu
+    from app.bot.middlewares.logging import CallbackLoggingMiddleware, MessageLoggingMiddleware
+    from app.i18n import load_locales, tr
+    from app.loader import build_dp
+
+    load_locales()
+    _isolate_io()
+
+    bot = Bot(
+        token=f"{_BOT_ID}:bench",
+        session=OfflineSession(),
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+    dp = build_dp()
+    channel_url = f"https://t.me/{settings.required_channel}"
+    bot_url = f"https://t.me/{settings.vpn_bot_username}"
+    packed = GiveawayCallback(act="check").pack()
+
+    tg_user = TgUser(id=_USER_ID, is_bot=False, first_name="User", username="bench")
+    message = Message(
+        message_id=1,
+        date=datetime.now(),
+        chat=Chat(id=_USER_ID, type="private"),
+        from_user=tg_user,
+        text="/start",
+    )
+    callback = CallbackQuery(id="1", from_user=tg_user, chat_instance="bench", data=packed)
+    message_logging = MessageLoggingMiddleware()
+    callback_logging = CallbackLoggingMiddleware()
+
+    async def noop(event, data):
+        return None
+
+    update_ids = iter(range(1, 10**9))
+
+    return {
+        "tr": lambda: tr("start.welcome"),
+        "tr.fields": lambda: tr("kb.subscribe_status", status="✅"),
+        "tr.lang_fallback": lambda: tr("start.welcome", "en"),
+        "kb.main_menu": lambda: build_main_menu(channel_url, bot_url),
+        "kb.conditions_failed": lambda: build_conditions_failed(channel_url, bot_url, True, False),
+        "callback.pack": lambda: GiveawayCallback(act="check").pack(),
+        "callback.unpack": lambda: GiveawayCallback.unpack(packed),
+        "mw.message_logging": lambda: message_logging(noop, message, {}),
+        "mw.callback_logging": lambda: callback_logging(noop, callback, {}),
+        "admin_filter": lambda: admin_filter(message),
+        "feed_update./start": lambda: dp.feed_update(bot, _start_update(bot, next(update_ids))),
+        "feed_update.check": lambda: dp.feed_update(bot, _check_update(bot, next(update_ids))),
+    }
+
+
+# ============ Замеры ============
+
+async def _is_async(bench: Bench) -> bool:
+    """Пробный вызов (он же прогрев): вернул корутину — путь асинхронный."""
+    result = bench()
+    if asyncio.iscoroutine(result):
+        await result
+        return True
+    return False
+
+
+async def _run(bench: Bench, n: int, is_async: bool) -> float:
+    started = time.perf_counter()
+    if is_async:
+        for _ in range(n):
+            await bench()
+    else:
+        for _ in range(n):
+            bench()
+    return time.perf_counter() - started
+
+
+async def _ops_per_sec(bench: Bench, is_async: bool, rounds: int, min_time: float) -> float:
+    n = 1
+    while (elapsed := await _run(bench, n, is_async)) < min_time:
+        n *= 2
+    best = elapsed
+    for _ in range(rounds - 1):
+        best = min(best, await _run(bench, n, is_async))
+    return n / best
+
+
+async def _memory(bench: Bench, is_async: bool) -> tuple[int, float]:
+    """Медианный пик tracemalloc на операцию и прирост памяти на операцию."""
+    tracemalloc.start()
+    try:
+        peaks = []
+        baseline = tracemalloc.get_traced_memory()[0]
+        for _ in range(_ALLOC_OPS):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            await _run(bench, 1, is_async)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        retained = (tracemalloc.get_traced_memory()[0] - baseline) / _ALLOC_OPS
+    finally:
+        tracemalloc.stop()
+    peaks.sort()
+    return peaks[len(peaks) // 2], retained
+
+
+async def measure(benches: dict[str, Bench], rounds: int, min_time: float) -> dict[str, Result]:
+    results = {}
+    for name, bench in benches.items():
+        is_async = await _is_async(bench)
+        ops = await _ops_per_sec(bench, is_async, rounds, min_time)
+        peak, retained = await _memory(bench, is_async)
+        results[name] = Result(ops_per_sec=ops, peak_bytes=peak, retained_bytes=retained)
+    return results
+
+
+def compare(
+    results: dict[str, Result],
+    baseline: dict[str, Any],
+    threshold: float,
+) -> list[str]:
+    """Регрессии относительно бейзлайна (пустой список — всё в пределах порога)."""
+    regressions = []
+    thresholds = baseline.get("thresholds", {})
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        limit = thresholds.get(name, threshold)
+        if result.ops_per_sec < base["ops_per_sec"] * (1 - limit):
+            regressions.append(
+                f"{name}: {result.ops_per_sec:,.0f} оп/с против {base['ops_per_sec']:,.0f} "
+                f"(-{1 - result.ops_per_sec / base['ops_per_sec']:.0%}, порог {limit:.0%})"
+            )
+        if result.peak_bytes > base["peak_bytes"] * (1 + limit) + _ALLOC_SLACK:
+            regressions.append(
+                f"{name}: пик {result.peak_bytes} Б/оп против {base['peak_bytes']} (порог {limit:.0%})"
+            )
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else {}
+    if not baseline.get("results") and not args.save:
+        print(f"❌ Бейзлайна нет ({baseline_path}) — сначала запиши его: --save", file=sys.stderr)
+        return 2
+    if baseline and not args.save:
+        here = (platform.python_version(), platform.machine())
+        if (baseline.get("python"), baseline.get("machine")) != here:
+            print(
+                f"⚠️ Бейзлайн снят на Python {baseline.get('python')} / {baseline.get('machine')}, "
+                f"сейчас {here[0]} / {here[1]} — сравнение может быть нечестным",
+                file=sys.stderr,
+            )
+
+    # Логи middleware и хендлеров уходят в /dev/null: меряем процесс, а не терминал
+    stdout = sys.stdout
+    devnull = open(os.devnull, "w")
+    sys.stdout = devnull
+    try:
+        setup_logging()
+        benches = build_benches()
+        if args.only:
+            prefixes = tuple(args.only.split(","))
+            benches = {name: bench for name, bench in benches.items() if name.startswith(prefixes)}
+        results = await measure(benches, args.rounds, args.min_time)
+    finally:
+        sys.stdout = stdout
+        devnull.close()
+
+    base_results = baseline.get("results", {})
+    print(f"{'путь':<24} {'оп/с':>12} {'мкс/оп':>9} {'пик Б/оп':>10} {'остаётся Б/оп':>14} {'к бейзлайну':>12}")
+    for name, result in results.items():
+        base = base_results.get(name)
+        delta = f"{result.ops_per_sec / base['ops_per_sec'] - 1:+.0%}" if base else "—"
+        print(
+            f"{name:<24} {result.ops_per_sec:>12,.0f} {1e6 / result.ops_per_sec:>9.1f} "
+            f"{result.peak_bytes:>10} {result.retained_bytes:>14.1f} {delta:>12}"
+        )
+
+    if args.save:
+        baseline_path.write_text(json.dumps({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "results": {**base_results, **{name: asdict(result) for name, result in results.items()}},
+            "thresholds": baseline.get("thresholds", {}),
+        }, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"\nБейзлайн сохранён: {baseline_path}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print("\n❌ Регрессии:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\n✅ В пределах порога {args.threshold:.0%}")
+    return 0
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Микробенчмарки CPU на апдейт с порогом регрессии")
+    parser.add_argument("--baseline", default="bench_hot_paths.json", help="JSON-бейзлайн")
+    parser.add_argument("--save", action="store_true", help="записать прогон как бейзлайн")
+    parser.add_argument("--threshold", type=float, default=0.25, help="допустимое ухудшение (0.25 — 25%%)")
+    parser.add_argument("--rounds", type=int, default=5, help="замеров на путь (берётся лучший)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="минимальная длительность замера, с")
+    parser.add_argument("--only", default="", help="только пути с этими префиксами (через запятую)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
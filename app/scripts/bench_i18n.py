@@ -0,0 +1,61 @@
+"""
+Микробенчмарк tr(): прежний обход вложенных словарей против плоского каталога.
+
+Запускай: python -m app.scripts.bench_i18n [--calls 200000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import yaml
+
+from app.i18n.catalog import _LOCALES_DIR, load_locales, tr
+
+
+with open(_LOCALES_DIR / "ru.yml", "r", encoding="utf-8") as f:
+    _legacy_data = yaml.safe_load(f) or {}
+
+
+def legacy_tr(key: str, lang: str = "ru", **kwargs) -> str:
+    """Прежняя реализация: split + обход словарей + format на каждый вызов."""
+    value = _legacy_data
+    for k in key.split("."):
+        if isinstance(value, dict):
+            value = value.get(k)
+        else:
+            value = None
+            break
+    if value is None:
+        return f"[{key}]"
+    if isinstance(value, str) and kwargs:
+        return value.format(**kwargs)
+    return str(value)
+
+
+CASES = {
+    "простой ключ": ("start.welcome", {}),
+    # Шаблон с подстановкой: tr() склеивает заранее разобранные сегменты
+    "ключ с kwargs": ("kb.subscribe_status", {"status": "✅"}),
+    "нет ключа": ("start.missing", {}),
+}
+
+
+def main(calls: int) -> None:
+    load_locales()
+    print(f"{'случай':<16} {'было, нс':>10} {'стало, нс':>10} {'ускорение':>10}")
+    for name, (key, kwargs) in CASES.items():
+        assert legacy_tr(key, **kwargs) == tr(key, **kwargs)
+        before = timeit.timeit(lambda: legacy_tr(key, **kwargs), number=calls) / calls * 1e9
+        after = timeit.timeit(lambda: tr(key, **kwargs), number=calls) / calls * 1e9
+        print(f"{name:<16} {before:>10.0f} {after:>10.0f} {before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+    main(args.calls)
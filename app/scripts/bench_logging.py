@@ -0,0 +1,109 @@
+"""
+Микробенчмарк логирования: сколько стоит MessageLoggingMiddleware на один апдейт.
+
+Запускай: python -m app.scripts.bench_logging [--updates 20000]
+
+Вывод (stdout) перенаправляется в /dev/null, файл пишется во временный
+каталог — меряется только работа процесса, а не терминала/диска.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from aiogram.types import Chat, Message, User
+from loguru import logger
+
+from app.bot.middlewares.logging import MessageLoggingMiddleware
+from app.utils.config import settings
+from app.utils.logging import setup_logging
+
+
+class _LegacyMiddleware(MessageLoggingMiddleware):
+    """Как было: f-строка форматируется на каждый апдейт до проверки уровня."""
+
+    async def __call__(self, handler, event, data):
+        logger.info(
+            f"📨 Message from {event.from_user.id} (@{event.from_user.username}): "
+            f"{event.text or event.caption or '[media]'}"
+        )
+        return await handler(event, data)
+
+
+MODES = {
+    # название: (middleware, настройки)
+    "legacy text": (_LegacyMiddleware, {}),
+    "text": (MessageLoggingMiddleware, {}),
+    "text, без enqueue": (MessageLoggingMiddleware, {"log_enqueue": False}),
+    "json": (MessageLoggingMiddleware, {"log_format": "json"}),
+    "json, sampling 1%": (MessageLoggingMiddleware, {"log_format": "json", "log_sampling": {"message": 0.01}}),
+    "json + file": (MessageLoggingMiddleware, {"log_format": "json", "log_file": "{tmp}/bot.log"}),
+    "level WARNING": (MessageLoggingMiddleware, {"log_level": "WARNING"}),
+}
+
+
+def _message(i: int) -> Message:
+    return Message(
+        message_id=i,
+        date=datetime.now(),
+        chat=Chat(id=i, type="private"),
+        from_user=User(id=i, is_bot=False, first_name="Test", username=f"user{i}"),
+        text="/start",
+    )
+
+
+async def _handler(event, data):
+    return None
+
+
+async def _run(middleware: MessageLoggingMiddleware, messages: list[Message]) -> float:
+    started = time.perf_counter()
+    for message in messages:
+        await middleware(_handler, message, {})
+    return time.perf_counter() - started
+
+
+async def main(updates: int) -> None:
+    messages = [_message(i) for i in range(updates)]
+    defaults = {name: getattr(settings, name) for name in ("log_format", "log_sampling", "log_file", "log_level", "log_enqueue")}
+    stdout = sys.stdout
+    devnull = open(os.devnull, "w")
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (middleware_class, overrides) in MODES.items():
+            for key, value in {**defaults, **overrides}.items():
+                if isinstance(value, str):
+                    value = value.format(tmp=tmp)
+                setattr(settings, key, value)
+
+            sys.stdout = devnull
+            try:
+                setup_logging()
+                elapsed = await _run(middleware_class(), messages)
+                await logger.complete()
+                logger.remove()
+            finally:
+                sys.stdout = stdout
+            results.append((name, elapsed))
+
+    for key, value in defaults.items():
+        setattr(settings, key, value)
+    devnull.close()
+
+    print(f"{'режим':<22} {'мкс/апдейт':>12} {'апдейтов/с':>12}")
+    for name, elapsed in results:
+        print(f"{name:<22} {elapsed / updates * 1e6:>12.1f} {updates / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--updates", type=int, default=20_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.updates))
@@ -0,0 +1,123 @@
+"""
+Бенчмарк функций app/database/repositories/user.py на разных размерах таблицы.
+
+Запускай: python -m app.scripts bench-user-repo [--sizes 10000,100000,1000000]
+
+Для каждого размера таблица догружается синтетическими пользователями
+(seed_users, COPY) до нужного числа строк, после чего каждая функция
+вызывается --repeats раз (тяжёлые выборки всей таблицы — --heavy-repeats).
+Вывод — таблица p50 / p95 в миллисекундах. Только для отдельной базы:
+синтетические строки (id >= --id-base) в конце удаляются, если не задан --keep.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sys
+import time
+from typing import Awaitable, Callable, Optional
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.database.engine import engine
+from app.database.repositories import user as repo
+from app.scripts.loadtest.utils import percentile
+from app.scripts.seed_users import ID_BASE, SeedProfile, delete_synthetic, seed_users
+from app.utils.logging import setup_logging
+
+
+# Возвращают всю таблицу (или её долю) — вызываются реже
+_HEAVY = {"get_all_users", "get_pending_gift_users"}
+
+
+def _cases(size: int, id_base: int) -> dict[str, Callable[[], Awaitable[object]]]:
+    """Функция репозитория → вызов со случайными аргументами из синтетических id."""
+    rng = random.Random(size)
+    new_ids = itertools.count(id_base + 5 * 10**11)
+
+    def existing() -> int:
+        return id_base + rng.randrange(size)
+
+    return {
+        "create_user_if_absent": lambda: repo.create_user_if_absent(next(new_ids)),
+        "get_or_create_user": lambda: repo.get_or_create_user(existing()),
+        "get_user": lambda: repo.get_user(existing()),
+        "update_user_subscription": lambda: repo.update_user_subscription(existing(), True),
+        "set_subscription_from_event": lambda: repo.set_subscription_from_event(existing(), True),
+        "mark_gift_received": lambda: repo.mark_gift_received(existing()),
+        "set_pending_gift": lambda: repo.set_pending_gift(existing(), False),
+        "get_pending_gift_user_ids": lambda: repo.get_pending_gift_user_ids(rng.choice((0, existing())), 100),
+        "get_pending_gift_users": repo.get_pending_gift_users,
+        "get_all_users": repo.get_all_users,
+        "get_participants_count": repo.get_participants_count,
+        "get_gifts_sent_count": repo.get_gifts_sent_count,
+        "get_pending_count": repo.get_pending_count,
+        "get_admin_user_ids": repo.get_admin_user_ids,
+    }
+
+
+async def _measure(call: Callable[[], Awaitable[object]], repeats: int) -> list[float]:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await call()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+async def main(args: argparse.Namespace) -> None:
+    from app.__main__ import init_database
+
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    await init_database()
+    await delete_synthetic(args.id_base)
+
+    # функция → размер → (p50, p95) в мс
+    results: dict[str, dict[int, tuple[float, float]]] = {}
+    loaded = 0
+    try:
+        for size in sizes:
+            started = time.perf_counter()
+            await seed_users(size - loaded, SeedProfile(), id_base=args.id_base, first=loaded)
+            print(f"{size} строк: загрузка {time.perf_counter() - started:.1f} с", file=sys.stderr)
+            loaded = size
+
+            for name, call in _cases(size, args.id_base).items():
+                if args.only and name not in args.only.split(","):
+                    continue
+                repeats = args.heavy_repeats if name in _HEAVY else args.repeats
+                await call()  # прогрев: кэш подготовленных запросов, страницы в shared_buffers
+                ms = [t * 1000 for t in await _measure(call, repeats)]
+                results.setdefault(name, {})[size] = (percentile(ms, 0.5), percentile(ms, 0.95))
+    finally:
+        if not args.keep:
+            await delete_synthetic(args.id_base)
+        await engine.dispose()
+
+    header = f"{'функция (p50 / p95, мс)':<30}" + "".join(f"{size:>22,}" for size in sizes)
+    print(header)
+    print("-" * len(header))
+    for name, by_size in results.items():
+        cells = "".join(
+            f"{f'{by_size[size][0]:.2f} / {by_size[size][1]:.2f}':>22}" if size in by_size else f"{'—':>22}"
+            for size in sizes
+        )
+        print(f"{name:<30}{cells}")
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Бенчмарк репозитория пользователей на 10k/100k/1M строк")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="размеры таблицы через запятую")
+    parser.add_argument("--repeats", type=int, default=200, help="вызовов точечных функций")
+    parser.add_argument("--heavy-repeats", type=int, default=3, help="вызовов выборок всей таблицы")
+    parser.add_argument("--only", default="", help="только эти функции (через запятую)")
+    parser.add_argument("--id-base", type=int, default=ID_BASE, help="первый синтетический id")
+    parser.add_argument("--keep", action="store_true", help="не удалять синтетические строки в конце")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    setup_logging("WARNING")
+    asyncio.run(main(parse_args()))
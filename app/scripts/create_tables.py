@@ -1,16 +1,15 @@
-"""Скрипт для создания таблиц в БД."""
+"""Скрипт для создания таблиц в БД (применяет миграции схемы)."""
 import asyncio
 
-from app.database.engine import engine, Base
-from app.database.models import User  # noqa: F401 — нужен для регистрации модели
+from app.database.engine import engine
+from app.database.migrations import apply_migrations
 
 
 async def create_tables():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await apply_migrations()
+    await engine.dispose()
     print("✅ Таблицы созданы!")
 
 
 if __name__ == "__main__":
     asyncio.run(create_tables())
-
@@ -0,0 +1,112 @@
+"""
+Проверка планов горячих запросов: используют ли они индексы из миграций.
+
+Запускай: python -m app.scripts explain-check [--planner]
+
+По умолчанию seq scan запрещается (SET LOCAL enable_seqscan = off) — так
+проверяется, что индекс вообще применим к запросу (условие частичного
+индекса совпадает с WHERE), независимо от размера таблицы. Если хоть один
+запрос не использует ожидаемый индекс — код выхода 1.
+
+--planner — планы как есть, без запретов: на реальном объёме данных
+(например, после seed-users) показывает, что выберет планировщик.
+Только отчёт, код выхода всегда 0.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Iterator, Optional
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql
+
+from app.database.engine import engine
+from app.database.models.user import User
+from app.database.repositories.export import _EXPORT_QUERY
+
+
+def _sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+# Запрос (как в репозиториях) → индекс, который он должен использовать
+CHECKS: list[tuple[str, str, str]] = [
+    (
+        "очередь ожидающих (/send_pending)",
+        _sql(select(User.id).where(User.pending_gift.is_(True), User.id > 0).order_by(User.id).limit(100)),
+        "ix_user_pending_gift",
+    ),
+    (
+        "ожидающие целиком",
+        _sql(select(User).where(User.pending_gift.is_(True))),
+        "ix_user_pending_gift",
+    ),
+    (
+        "число ожидающих",
+        _sql(select(func.count(User.id)).where(User.pending_gift.is_(True))),
+        "ix_user_pending_gift",
+    ),
+    (
+        "число получивших подарок",
+        _sql(select(func.count(User.id)).where(User.gift_received.is_(True))),
+        "ix_user_gift_received",
+    ),
+    (
+        "/export (ORDER BY created_at)",
+        _EXPORT_QUERY.format(where=""),
+        "ix_user_created_at",
+    ),
+]
+
+
+def _nodes(plan: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _nodes(child)
+
+
+def _describe(plan: dict[str, Any]) -> str:
+    return " → ".join(
+        f"{node['Node Type']}" + (f" ({node['Index Name']})" if "Index Name" in node else "")
+        for node in _nodes(plan)
+    )
+
+
+async def main(args: argparse.Namespace) -> int:
+    failed = 0
+    try:
+        async with engine.connect() as conn:
+            if not args.planner:
+                await conn.execute(text("SET LOCAL enable_seqscan = off"))
+            for name, sql, index in CHECKS:
+                result = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+                raw = result.scalar_one()
+                plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+                used = any(node.get("Index Name") == index for node in _nodes(plan))
+                mark = "✅" if used else ("⚠️" if args.planner else "❌")
+                print(f"{mark} {name}: {_describe(plan)}")
+                if not used:
+                    failed += 1
+            await conn.rollback()
+    finally:
+        await engine.dispose()
+
+    if failed and not args.planner:
+        print(f"\n❌ Не используют ожидаемый индекс: {failed} из {len(CHECKS)}")
+        return 1
+    return 0
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="EXPLAIN горячих запросов: используются ли индексы")
+    parser.add_argument("--planner", action="store_true", help="без запрета seq scan, только отчёт")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
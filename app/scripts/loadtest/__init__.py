@@ -0,0 +1,5 @@
+"""
+Нагрузочный стенд: фейковые Bot API и Remnawave + генератор трафика.
+
+Запускай: python -m app.scripts.loadtest --help
+"""
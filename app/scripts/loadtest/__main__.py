@@ -0,0 +1,221 @@
+"""
+Нагрузочный прогон сценария розыгрыша без Telegram и Remnawave.
+
+Запускай: python -m app.scripts.loadtest --users 500 --rate 50
+
+1. Поднимает фейковые Bot API и Remnawave на localhost.
+2. Запускает бота (python -m app) отдельным процессом, направив его на
+   фейки (TELEGRAM_API_SERVER, REMNAWAVE_API_URL). БД — из DATABASE_URL,
+   нужна настоящая Postgres (лучше отдельная база).
+3. N пользователей с темпом --rate делают /start, затем «Проверить».
+4. Печатает перцентили end-to-end задержки, пропускную способность и
+   число запросов к БД на сценарий (по /metrics бота).
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import sys
+import time
+from typing import Optional
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import aiohttp
+
+from app.scripts.loadtest.fake_remnawave import FakeRemnawave
+from app.scripts.loadtest.fake_telegram import BOT_USERNAME, FakeTelegram
+from app.scripts.loadtest.utils import free_port, percentile, serve
+
+
+async def _scrape_db_statements(http: aiohttp.ClientSession, metrics_url: str) -> float:
+    """Сумма bot_db_statement_seconds_count — сколько запросов к БД выполнил бот."""
+    async with http.get(metrics_url) as response:
+        text = await response.text()
+    return sum(
+        float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if line.startswith("bot_db_statement_seconds_count")
+    )
+
+
+async def _wait_ready(http: aiohttp.ClientSession, url: str, bot: asyncio.subprocess.Process) -> None:
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if bot.returncode is not None:
+            raise RuntimeError(f"бот завершился с кодом {bot.returncode}")
+        try:
+            async with http.get(url) as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError("бот не стал ready за 60 секунд")
+
+
+class Phase:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.latencies: list[float] = []
+        self.timeouts = 0
+        self.duration = 0.0
+        self.db_statements = 0.0
+
+    def report(self) -> str:
+        done = len(self.latencies)
+        flows = done + self.timeouts
+        ms = [v * 1000 for v in self.latencies]
+        return (
+            f"{self.name:<8} ok={done:<6} timeout={self.timeouts:<5} "
+            f"{done / self.duration if self.duration else 0:>7.1f}/с  "
+            f"p50={percentile(ms, 0.5):>7.0f} p95={percentile(ms, 0.95):>7.0f} "
+            f"p99={percentile(ms, 0.99):>7.0f} max={max(ms, default=0):>7.0f} мс  "
+            f"БД/сценарий={self.db_statements / flows if flows else 0:.1f}"
+        )
+
+
+async def _run_phase(
+    phase: Phase,
+    user_ids: list[int],
+    rate: float,
+    timeout: float,
+    flow,
+) -> None:
+    async def one(user_id: int) -> None:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(flow(user_id), timeout)
+            phase.latencies.append(time.perf_counter() - started)
+        except asyncio.TimeoutError:
+            phase.timeouts += 1
+
+    started = time.perf_counter()
+    tasks = []
+    for i, user_id in enumerate(user_ids):
+        # Равномерный темп: i-й пользователь стартует в i / rate
+        delay = started + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(user_id)))
+    await asyncio.gather(*tasks)
+    phase.duration = time.perf_counter() - started
+
+
+async def main(args: argparse.Namespace) -> None:
+    telegram = FakeTelegram(
+        latency=args.tg_latency,
+        error_rate=args.error_rate,
+        subscribed_ratio=args.subscribed_ratio,
+    )
+    remnawave = FakeRemnawave(latency=args.rw_latency, connected_ratio=args.connected_ratio)
+
+    base = args.user_id_base or random.randint(10**12, 2 * 10**12)
+    user_ids = [base + i for i in range(args.users)]
+    remnawave.add_users(user_ids)
+
+    tg_port, rw_port, metrics_port = free_port(), free_port(), free_port()
+    runners = [
+        await serve(telegram.build_app(), tg_port),
+        await serve(remnawave.build_app(), rw_port),
+    ]
+
+    env = {
+        **os.environ,
+        "BOT_TOKEN": "123456:loadtest",
+        "BOT_MODE": "polling",
+        "TELEGRAM_API_SERVER": f"http://127.0.0.1:{tg_port}",
+        "REMNAWAVE_API_URL": f"http://127.0.0.1:{rw_port}",
+        "REMNAWAVE_API_KEY": "loadtest",
+        "METRICS_HOST": "127.0.0.1",
+        "METRICS_PORT": str(metrics_port),
+        "VPN_MIRROR_INTERVAL": "0",
+    }
+    for key, value in {
+        "BOT_USERNAME": BOT_USERNAME,
+        "VPN_BOT_USERNAME": "loadtest_vpn_bot",
+        "REQUIRED_CHANNEL": "loadtest_channel",
+        "GIFT_ID": "loadtest",
+        "LOG_LEVEL": "WARNING",
+    }.items():
+        env.setdefault(key, value)
+
+    bot = await asyncio.create_subprocess_exec(sys.executable, "-m", "app", env=env)
+    metrics_url = f"http://127.0.0.1:{metrics_port}"
+    messages: dict[int, dict] = {}
+
+    async def start_flow(user_id: int) -> None:
+        photo = telegram.expect("sendPhoto", user_id)
+        text = telegram.expect("sendMessage", user_id)
+        telegram.push_start(user_id)
+        done, pending = await _first(photo, text)
+        messages[user_id] = done.result()
+
+    async def check_flow(user_id: int) -> None:
+        gift = telegram.expect("sendGift", user_id)
+        failed = telegram.expect("conditions_failed", user_id)
+        telegram.push_check(user_id, messages[user_id])
+        await _first(gift, failed)
+
+    try:
+        async with aiohttp.ClientSession() as http:
+            await _wait_ready(http, f"{metrics_url}/readyz", bot)
+
+            phases = [Phase("/start"), Phase("check")]
+            for phase, flow, ids in (
+                (phases[0], start_flow, user_ids),
+                (phases[1], check_flow, None),
+            ):
+                ids = ids if ids is not None else [u for u in user_ids if u in messages]
+                before = await _scrape_db_statements(http, f"{metrics_url}/metrics")
+                await _run_phase(phase, ids, args.rate, args.timeout, flow)
+                if phase.name == "check":
+                    # Подарки уходят из очереди фоновыми воркерами — даём им закончить
+                    await asyncio.sleep(1)
+                phase.db_statements = await _scrape_db_statements(http, f"{metrics_url}/metrics") - before
+    finally:
+        if bot.returncode is None:
+            bot.send_signal(signal.SIGINT)
+            try:
+                await asyncio.wait_for(bot.wait(), 15)
+            except asyncio.TimeoutError:
+                bot.kill()
+        for runner in runners:
+            await runner.cleanup()
+
+    print()
+    print(f"Пользователей: {args.users}, темп: {args.rate}/с, задержка Bot API: {args.tg_latency * 1000:.0f} мс, "
+          f"429: {args.error_rate:.0%}")
+    for phase in phases:
+        print(phase.report())
+    print(f"Bot API: {dict(telegram.calls)}")
+    if telegram.throttled:
+        print(f"429 отдано: {dict(telegram.throttled)}")
+    print(f"Remnawave: {remnawave.requests} запросов")
+
+
+async def _first(*futures: asyncio.Future):
+    done, pending = await asyncio.wait(futures, return_when=asyncio.FIRST_COMPLETED)
+    for future in pending:
+        future.cancel()
+    return next(iter(done)), pending
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон /start + «Проверить» на фейковых API")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=20.0, help="сценариев в секунду")
+    parser.add_argument("--timeout", type=float, default=30.0, help="таймаут одного сценария, с")
+    parser.add_argument("--tg-latency", type=float, default=0.05, help="задержка Bot API, с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--rw-latency", type=float, default=0.05, help="задержка Remnawave, с")
+    parser.add_argument("--connected-ratio", type=float, default=1.0, help="доля подключивших VPN")
+    parser.add_argument("--subscribed-ratio", type=float, default=1.0, help="доля подписанных")
+    parser.add_argument("--user-id-base", type=int, default=0, help="первый telegram id (по умолчанию случайный)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,91 @@
+"""Фейковая панель Remnawave: ровно те эндпоинты, которые зовёт бот."""
+from __future__ import annotations
+
+import asyncio
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+
+@dataclass
+class FakeRemnawave:
+    """
+    Пользователи {prefix}_{telegram_id} для заданных telegram_id.
+
+    connected_ratio — доля пользователей с заполненным firstConnectedAt.
+    auto_users — неизвестный {prefix}_{id} создаётся при первом запросе
+    (для replay, где id пользователей заранее неизвестны).
+    """
+    prefix: str = "1"
+    connected_ratio: float = 1.0
+    latency: float = 0.0
+    auto_users: bool = False
+    requests: int = 0
+    _users: dict[str, dict] = field(default_factory=dict)
+
+    def add_users(self, telegram_ids: list[int]) -> None:
+        now = datetime.now(timezone.utc).isoformat()
+        for telegram_id in telegram_ids:
+            username = f"{self.prefix}_{telegram_id}"
+            connected = random.random() < self.connected_ratio
+            self._users[username] = _user_payload(username, telegram_id, now if connected else None, now)
+
+    async def _delay(self) -> None:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def _by_username(self, request: web.Request) -> web.Response:
+        await self._delay()
+        username = request.match_info["username"]
+        user = self._users.get(username)
+        if user is None and self.auto_users:
+            prefix, _, telegram_id = username.rpartition("_")
+            if prefix == self.prefix and telegram_id.isdigit():
+                self.add_users([int(telegram_id)])
+                user = self._users[username]
+        if user is None:
+            return web.json_response({"message": "User not found", "statusCode": 404}, status=404)
+        return web.json_response({"response": user})
+
+    async def _all_users(self, request: web.Request) -> web.Response:
+        await self._delay()
+        start = int(request.query.get("start", 0))
+        size = int(request.query.get("size", 25))
+        users = list(self._users.values())
+        return web.json_response({"response": {"users": users[start:start + size], "total": len(users)}})
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/api/users/by-username/{username}", self._by_username)
+        app.router.add_get("/api/users", self._all_users)
+        return app
+
+
+def _user_payload(username: str, telegram_id: int, first_connected: str | None, now: str) -> dict:
+    return {
+        "uuid": str(uuid.uuid4()),
+        "shortUuid": uuid.uuid4().hex[:12],
+        "username": username,
+        "status": "ACTIVE",
+        "trafficLimitBytes": 0,
+        "trafficLimitStrategy": "NO_RESET",
+        "expireAt": "2030-01-01T00:00:00Z",
+        "telegramId": telegram_id,
+        "trojanPassword": "x",
+        "vlessUuid": str(uuid.uuid4()),
+        "ssPassword": "x",
+        "lastTriggeredThreshold": 0,
+        "createdAt": now,
+        "updatedAt": now,
+        "subscriptionUrl": "https://example.com/sub",
+        "activeInternalSquads": [],
+        "userTraffic": {
+            "usedTrafficBytes": 0,
+            "lifetimeUsedTrafficBytes": 0,
+            "firstConnectedAt": first_connected,
+        },
+    }
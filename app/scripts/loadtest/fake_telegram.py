@@ -0,0 +1,193 @@
+"""
+Фейковый Bot API: методы, которые использует бот, с настраиваемой
+задержкой и инъекцией 429 (Too Many Requests).
+
+Апдейты кладутся в очередь через push_update() и отдаются боту через
+getUpdates (long polling). Генератор трафика ждёт реакции бота через
+expect(): future разрешается, когда бот вызовет нужный метод для нужного
+чата/пользователя.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from aiohttp import web
+
+
+BOT_ID = 42
+BOT_USERNAME = "loadtest_bot"
+
+
+@dataclass
+class FakeTelegram:
+    latency: float = 0.0
+    # Доля запросов throttled_methods, на которые отвечаем 429
+    error_rate: float = 0.0
+    retry_after: int = 1
+    throttled_methods: frozenset[str] = frozenset({"sendGift", "sendPhoto", "editMessageCaption"})
+    subscribed_ratio: float = 1.0
+    calls: Counter = field(default_factory=Counter)
+    throttled: Counter = field(default_factory=Counter)
+
+    def __post_init__(self) -> None:
+        self._updates: list[dict] = []
+        self._update_id = 0
+        self._new_updates = asyncio.Event()
+        self._message_id = 0
+        self._waiters: dict[tuple[str, int], list[asyncio.Future]] = {}
+        self._subscribed: dict[int, bool] = {}
+
+    # ============ Апдейты ============
+
+    def push_update(self, payload: dict) -> int:
+        self._update_id += 1
+        self._updates.append({"update_id": self._update_id, **payload})
+        self._new_updates.set()
+        return self._update_id
+
+    def push_start(self, user_id: int) -> None:
+        self.push_update({
+            "message": {
+                "message_id": self._next_message_id(),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": _user(user_id),
+                "text": "/start",
+                "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+            }
+        })
+
+    def push_check(self, user_id: int, message: dict) -> None:
+        self.push_update({
+            "callback_query": {
+                "id": f"{user_id}-{time.monotonic_ns()}",
+                "from": _user(user_id),
+                "chat_instance": str(user_id),
+                "message": message,
+                "data": "giveaway:check",
+            }
+        })
+
+    def expect(self, method: str, target: int) -> asyncio.Future:
+        """Future, который разрешится результатом первого вызова method для target."""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault((method, target), []).append(future)
+        return future
+
+    def _resolve(self, method: str, target: Optional[int], result: Any) -> None:
+        if target is None:
+            return
+        for future in self._waiters.pop((method, target), ()):
+            if not future.done():
+                future.set_result(result)
+
+    def _next_message_id(self) -> int:
+        self._message_id += 1
+        return self._message_id
+
+    # ============ Bot API ============
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(await request.post()) if request.can_read_body else {}
+        self.calls[method] += 1
+
+        if method != "getUpdates":
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if method in self.throttled_methods and random.random() < self.error_rate:
+                self.throttled[method] += 1
+                return web.json_response({
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                })
+
+        handler = getattr(self, f"_m_{method}", None)
+        result = await handler(params) if handler else True
+        return web.json_response({"ok": True, "result": result})
+
+    async def _m_getMe(self, params: dict) -> dict:
+        return {"id": BOT_ID, "is_bot": True, "first_name": "Loadtest", "username": BOT_USERNAME}
+
+    async def _m_getUpdates(self, params: dict) -> list[dict]:
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        if offset:
+            self._updates = [u for u in self._updates if u["update_id"] >= offset]
+        if not self._updates and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout=min(timeout, 1.0))
+            except asyncio.TimeoutError:
+                pass
+        return self._updates[:limit]
+
+    def _message(self, chat_id: int, **content: Any) -> dict:
+        return {
+            "message_id": self._next_message_id(),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": BOT_ID, "is_bot": True, "first_name": "Loadtest"},
+            **content,
+        }
+
+    async def _m_sendPhoto(self, params: dict) -> dict:
+        chat_id = int(params["chat_id"])
+        message = self._message(
+            chat_id,
+            photo=[{"file_id": "loadtest-photo", "file_unique_id": "loadtest-photo", "width": 1, "height": 1}],
+            caption=params.get("caption", ""),
+        )
+        self._resolve("sendPhoto", chat_id, message)
+        return message
+
+    async def _m_sendMessage(self, params: dict) -> dict:
+        chat_id = int(params["chat_id"])
+        message = self._message(chat_id, text=params.get("text", ""))
+        self._resolve("sendMessage", chat_id, message)
+        return message
+
+    async def _m_editMessageCaption(self, params: dict) -> dict:
+        chat_id = int(params["chat_id"])
+        message = self._message(chat_id, caption=params.get("caption", ""))
+        if params.get("reply_markup"):
+            # Правка с клавиатурой — экран «условия не выполнены»
+            self._resolve("conditions_failed", chat_id, json.loads(params["reply_markup"]))
+        self._resolve("editMessageCaption", chat_id, message)
+        return message
+
+    async def _m_editMessageText(self, params: dict) -> dict:
+        chat_id = int(params["chat_id"])
+        return self._message(chat_id, text=params.get("text", ""))
+
+    async def _m_getChatMember(self, params: dict) -> dict:
+        user_id = int(params["user_id"])
+        subscribed = self._subscribed.get(user_id)
+        if subscribed is None:
+            subscribed = self._subscribed[user_id] = random.random() < self.subscribed_ratio
+        return {"status": "member" if subscribed else "left", "user": _user(user_id)}
+
+    async def _m_getMyStarBalance(self, params: dict) -> dict:
+        return {"amount": 1_000_000_000}
+
+    async def _m_sendGift(self, params: dict) -> bool:
+        self._resolve("sendGift", int(params["user_id"]), True)
+        return True
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        return app
+
+
+def _user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"User {user_id}", "username": f"user{user_id}"}
@@ -0,0 +1,53 @@
+"""
+Миграции схемы БД.
+
+Запускай: python -m app.scripts migrate [--status] [--to N]
+
+Без флагов применяет все новые миграции (то же, что бот делает при старте,
+если DB_MIGRATE_ON_STARTUP=true). --status — применённые и ожидающие.
+"""
+import argparse
+import asyncio
+import os
+import sys
+from typing import Optional
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.database.engine import engine
+from app.database.migrations import MIGRATIONS, apply_migrations, get_applied_migrations
+from app.utils.logging import setup_logging
+
+
+async def main(args: argparse.Namespace) -> None:
+    try:
+        if args.status:
+            applied = await get_applied_migrations()
+            done = {version for version, _, _ in applied}
+            for version, name, applied_at in applied:
+                print(f"✅ {version:>3}  {name}  ({applied_at:%Y-%m-%d %H:%M})")
+            for migration in MIGRATIONS:
+                if migration.version not in done:
+                    print(f"⏳ {migration.version:>3}  {migration.name}")
+            return
+
+        applied = await apply_migrations(args.to)
+        if applied:
+            print(f"✅ Применено миграций: {len(applied)} (до v{applied[-1].version})")
+        else:
+            print("✅ Схема актуальна")
+    finally:
+        await engine.dispose()
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Миграции схемы БД")
+    parser.add_argument("--status", action="store_true", help="показать применённые и ожидающие")
+    parser.add_argument("--to", type=int, default=None, help="применить только до этой версии")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    asyncio.run(main(parse_args()))
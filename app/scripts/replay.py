@@ -0,0 +1,196 @@
+"""
+Replay записанного трафика (RECORD_UPDATES_PATH) через build_dp().
+
+Запускай: python -m app.scripts replay updates.jsonl.gz [--speed 1|10|max]
+
+Апдейты подаются в dp.feed_update() в этом же процессе с исходными
+интервалами (--speed 1), ускоренными в N раз или без пауз (--speed max).
+Бот ходит в фейковый Bot API, проверка VPN — в фейковый Remnawave
+(оба на localhost), БД — настоящая из DATABASE_URL (лучше отдельная база).
+
+Отчёт: перцентили времени обработки апдейта по типам, задержка event loop
+(насколько опаздывает таймер 10 мс) и число запросов к БД на апдейт.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Optional
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from aiogram.types import Update
+
+from app.scripts.loadtest.fake_remnawave import FakeRemnawave
+from app.scripts.loadtest.fake_telegram import FakeTelegram
+from app.scripts.loadtest.utils import free_port, percentile, serve
+from app.utils.config import settings
+from app.utils.logging import setup_logging
+
+# Период сэмплера задержки event loop
+_LAG_INTERVAL = 0.01
+
+
+def load_recording(path: str, limit: int = 0) -> list[tuple[float, dict]]:
+    """(смещение от начала записи, апдейт) — в порядке записи."""
+    records = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            records.append((float(item["t"]), item["update"]))
+            if limit and len(records) >= limit:
+                break
+    return records
+
+
+async def _sample_loop_lag(lags: list[float]) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + _LAG_INTERVAL
+        await asyncio.sleep(_LAG_INTERVAL)
+        lags.append(max(loop.time() - expected, 0.0))
+
+
+def _db_statements() -> int:
+    from app.database.instrumentation import get_db_metrics
+    return sum(child.count for child in get_db_metrics().statements.values())
+
+
+def _report_line(name: str, values: list[float]) -> str:
+    ms = [v * 1000 for v in values]
+    return (
+        f"{name:<18} n={len(ms):<7} p50={percentile(ms, 0.5):>7.1f} p95={percentile(ms, 0.95):>7.1f} "
+        f"p99={percentile(ms, 0.99):>7.1f} max={max(ms, default=0):>7.1f} мс"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    records = load_recording(args.recording, args.limit)
+    if not records:
+        print("Запись пуста")
+        return
+
+    telegram = FakeTelegram(latency=args.tg_latency, subscribed_ratio=args.subscribed_ratio)
+    remnawave = FakeRemnawave(
+        prefix=settings.vpn_username_prefix,
+        latency=args.rw_latency,
+        connected_ratio=args.connected_ratio,
+        auto_users=True,
+    )
+    tg_port, rw_port = free_port(), free_port()
+    runners = [
+        await serve(telegram.build_app(), tg_port),
+        await serve(remnawave.build_app(), rw_port),
+    ]
+
+    # До сборки бота: все внешние вызовы — в фейки, повторно не записываем
+    settings.telegram_api_server = f"http://127.0.0.1:{tg_port}"
+    settings.remnawave_api_url = f"http://127.0.0.1:{rw_port}"
+    settings.remnawave_api_key = "replay"
+    settings.vpn_mirror_interval = 0
+    settings.record_updates_path = None
+
+    from app.__main__ import on_startup
+    from app.database.engine import engine
+    from app.loader import build_bot, build_dp
+
+    dp = build_dp()
+    bot = build_bot("123456:replay")
+    background = await on_startup(bot)
+    updates = [(t, Update.model_validate(data, context={"bot": bot})) for t, data in records]
+
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors = 0
+    lags: list[float] = []
+    limiter = asyncio.Semaphore(args.concurrency) if args.concurrency else None
+
+    async def feed(update: Update) -> None:
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            await dp.feed_update(bot, update)
+        except Exception:
+            errors += 1
+        finally:
+            latencies[update.event_type].append(time.perf_counter() - started)
+            if limiter is not None:
+                limiter.release()
+
+    speed = 0.0 if args.speed == "max" else float(args.speed)
+    sampler = asyncio.create_task(_sample_loop_lag(lags))
+    db_before = _db_statements()
+    first_t = updates[0][0]
+    started = time.perf_counter()
+    tasks = []
+    try:
+        for t, update in updates:
+            if speed:
+                delay = started + (t - first_t) / speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if limiter is not None:
+                await limiter.acquire()
+            tasks.append(asyncio.create_task(feed(update)))
+        await asyncio.gather(*tasks)
+        duration = time.perf_counter() - started
+        if args.drain:
+            # Подарки уходят из очереди фоновыми воркерами — даём им закончить
+            await asyncio.sleep(args.drain)
+        db_statements = _db_statements() - db_before
+    finally:
+        sampler.cancel()
+        for task in background:
+            task.cancel()
+        await bot.session.close()
+        await engine.dispose()
+        for runner in runners:
+            await runner.cleanup()
+
+    recorded = updates[-1][0] - first_t
+    print()
+    print(f"Запись: {args.recording}, апдейтов: {len(updates)}, длительность записи: {recorded:.1f} с, "
+          f"скорость: {args.speed}")
+    print(f"Прогон: {duration:.1f} с, {len(updates) / duration if duration else 0:.0f} апдейтов/с, ошибок: {errors}")
+    every = [v for values in latencies.values() for v in values]
+    print(_report_line("все", every))
+    for update_type, values in sorted(latencies.items()):
+        print(_report_line(update_type, values))
+    print(_report_line("event loop lag", lags))
+    print(f"БД: {db_statements} запросов, {db_statements / len(updates):.2f} на апдейт")
+    print(f"Bot API: {dict(telegram.calls)}")
+    print(f"Remnawave: {remnawave.requests} запросов")
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay записанных апдейтов через build_dp() на фейковых API")
+    parser.add_argument("recording", help="файл RECORD_UPDATES_PATH (gzip JSONL)")
+    parser.add_argument("--speed", default="1", help="1 — как в записи, N — в N раз быстрее, max — без пауз")
+    parser.add_argument("--limit", type=int, default=0, help="взять только первые N апдейтов")
+    parser.add_argument("--concurrency", type=int, default=0, help="одновременно обрабатываемых апдейтов (0 — без ограничения)")
+    parser.add_argument("--drain", type=float, default=1.0, help="сколько секунд ждать фоновые воркеры после прогона")
+    parser.add_argument("--tg-latency", type=float, default=0.05, help="задержка Bot API, с")
+    parser.add_argument("--rw-latency", type=float, default=0.05, help="задержка Remnawave, с")
+    parser.add_argument("--connected-ratio", type=float, default=1.0, help="доля подключивших VPN")
+    parser.add_argument("--subscribed-ratio", type=float, default=1.0, help="доля подписанных")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+    if args.speed != "max":
+        try:
+            if float(args.speed) <= 0:
+                raise ValueError
+        except ValueError:
+            parser.error("--speed: положительное число или max")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    setup_logging(args.log_level)
+    asyncio.run(main(args))
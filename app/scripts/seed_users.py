@@ -0,0 +1,192 @@
+"""
+Синтетические пользователи для бенчмарков: N строк в "user" через COPY.
+
+Запускай: python -m app.scripts seed-users --users 1000000 [--replace]
+
+Доли подписанных/получивших/ожидающих/админов задаются флагами, created_at —
+всплеск после поста о розыгрыше (экспоненциальный спад) поверх равномерного
+фона с суточным ритмом. Синтетические id начинаются с --id-base и не
+пересекаются с настоящими telegram id; --replace удаляет прежние
+синтетические строки. Только для отдельной базы: DATABASE_URL.
+
+Триггеры "user" на время загрузки выключаются, счётчики статистики
+после загрузки пересчитываются (reconcile_user_stats).
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import text
+
+from app.database.engine import engine
+
+# Первый синтетический id: больше любых настоящих telegram id
+ID_BASE = 10**13
+
+_COLUMNS = (
+    "id",
+    "username",
+    "is_admin",
+    "is_subscribed",
+    "subscription_updated_at",
+    "gift_received",
+    "gift_received_at",
+    "pending_gift",
+    "created_at",
+    "updated_at",
+)
+
+
+@dataclass
+class SeedProfile:
+    """Доли: gifted — среди подписанных, pending — среди подписанных без подарка."""
+    subscribed: float = 0.8
+    gifted: float = 0.6
+    pending: float = 0.03
+    admins: float = 0.00001
+    with_username: float = 0.7
+    # Розыгрыш длится days дней, burst — доля пришедших на всплеске после поста
+    days: float = 14.0
+    burst: float = 0.6
+    burst_hours: float = 6.0
+
+
+def _created_at(rng: random.Random, start: datetime, profile: SeedProfile) -> datetime:
+    span = profile.days * 86400
+    while True:
+        if rng.random() < profile.burst:
+            offset = min(rng.expovariate(1 / (profile.burst_hours * 3600)), span)
+        else:
+            offset = rng.uniform(0, span)
+        moment = start + timedelta(seconds=offset)
+        # Суточный ритм: днём и вечером заходят чаще, ночью — в разы реже
+        hour = moment.hour + moment.minute / 60
+        weight = 0.55 + 0.45 * math.sin((hour - 9) / 24 * 2 * math.pi)
+        if rng.random() < weight:
+            return moment
+
+
+def generate_rows(
+    count: int,
+    profile: SeedProfile,
+    *,
+    id_base: int = ID_BASE,
+    first: int = 0,
+    seed: int = 1,
+) -> Iterator[tuple]:
+    """Строки для COPY в порядке _COLUMNS (id = id_base + first + i)."""
+    rng = random.Random(seed + first)
+    start = datetime.utcnow() - timedelta(days=profile.days)
+    for i in range(first, first + count):
+        user_id = id_base + i
+        created_at = _created_at(rng, start, profile)
+        subscribed = rng.random() < profile.subscribed
+        gifted = subscribed and rng.random() < profile.gifted
+        pending = subscribed and not gifted and rng.random() < profile.pending
+        gift_at = created_at + timedelta(seconds=rng.expovariate(1 / 120)) if gifted else None
+        sub_at = created_at + timedelta(seconds=rng.uniform(5, 600)) if rng.random() < 0.5 else None
+        yield (
+            user_id,
+            f"user{user_id}" if rng.random() < profile.with_username else None,
+            rng.random() < profile.admins,
+            subscribed,
+            sub_at,
+            gifted,
+            gift_at,
+            pending,
+            created_at,
+            gift_at or created_at,
+        )
+
+
+async def delete_synthetic(id_base: int = ID_BASE) -> int:
+    """Удалить синтетические строки (id >= id_base)."""
+    async with engine.begin() as conn:
+        await conn.execute(text('ALTER TABLE "user" DISABLE TRIGGER USER'))
+        result = await conn.execute(text('DELETE FROM "user" WHERE id >= :base'), {"base": id_base})
+        await conn.execute(text('ALTER TABLE "user" ENABLE TRIGGER USER'))
+    return result.rowcount
+
+
+async def seed_users(
+    count: int,
+    profile: SeedProfile,
+    *,
+    id_base: int = ID_BASE,
+    first: int = 0,
+    chunk: int = 50_000,
+    seed: int = 1,
+) -> None:
+    """
+    Загрузить count синтетических пользователей (id от id_base + first)
+    через asyncpg copy_records_to_table, пачками по chunk строк.
+    """
+    from app.database.repositories.stats import reconcile_user_stats
+
+    async with engine.begin() as conn:
+        await conn.execute(text('ALTER TABLE "user" DISABLE TRIGGER USER'))
+        raw = (await conn.get_raw_connection()).driver_connection
+        rows = generate_rows(count, profile, id_base=id_base, first=first, seed=seed)
+        while True:
+            batch = [row for _, row in zip(range(chunk), rows)]
+            if not batch:
+                break
+            await raw.copy_records_to_table("user", records=batch, columns=_COLUMNS)
+        await conn.execute(text('ALTER TABLE "user" ENABLE TRIGGER USER'))
+        await conn.execute(text('ANALYZE "user"'))
+
+    await reconcile_user_stats()
+
+
+async def main(args: argparse.Namespace) -> None:
+    from app.__main__ import init_database
+
+    # Таблицы и триггеры — как при старте бота
+    await init_database()
+    if args.replace:
+        print(f"Удалено синтетических: {await delete_synthetic(args.id_base)}")
+
+    profile = SeedProfile(
+        subscribed=args.subscribed,
+        gifted=args.gifted,
+        pending=args.pending,
+        admins=args.admins,
+        days=args.days,
+        burst=args.burst,
+    )
+    started = time.perf_counter()
+    await seed_users(args.users, profile, id_base=args.id_base, chunk=args.chunk, seed=args.seed)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Загружено {args.users} пользователей за {elapsed:.1f} с ({args.users / elapsed:.0f} строк/с)")
+    await engine.dispose()
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    defaults = SeedProfile()
+    parser = argparse.ArgumentParser(description="Синтетические пользователи через COPY")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--subscribed", type=float, default=defaults.subscribed, help="доля подписанных")
+    parser.add_argument("--gifted", type=float, default=defaults.gifted, help="доля получивших среди подписанных")
+    parser.add_argument("--pending", type=float, default=defaults.pending, help="доля ожидающих среди подписанных без подарка")
+    parser.add_argument("--admins", type=float, default=defaults.admins, help="доля админов")
+    parser.add_argument("--days", type=float, default=defaults.days, help="длительность розыгрыша, дней")
+    parser.add_argument("--burst", type=float, default=defaults.burst, help="доля пришедших на всплеске после поста")
+    parser.add_argument("--id-base", type=int, default=ID_BASE, help="первый синтетический id")
+    parser.add_argument("--chunk", type=int, default=50_000, help="строк в одном COPY")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--replace", action="store_true", help="сначала удалить прежние синтетические строки")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,82 @@
+"""Реестр админов: проверка is_admin без обращений к БД и конфигу."""
+from __future__ import annotations
+
+import asyncio
+
+from aiogram import Bot
+from loguru import logger
+
+from app.database.repositories.user import get_admin_user_ids
+from app.utils.config import settings
+
+
+# Админы из ADMIN_IDS — парсим один раз
+_config_admins: frozenset[int] = frozenset(settings.get_admin_ids())
+# Админы из БД (флаг is_admin) — перечитываются по таймеру
+_db_admins: frozenset[int] = frozenset()
+
+
+def is_admin(user_id: int) -> bool:
+    """Проверить, является ли пользователь админом (только память)."""
+    return user_id in _config_admins or user_id in _db_admins
+
+
+def get_config_admin_ids() -> frozenset[int]:
+    """Админы из ADMIN_IDS."""
+    return _config_admins
+
+
+def get_admin_ids() -> frozenset[int]:
+    """Все админы: из ADMIN_IDS и из БД."""
+    return _config_admins | _db_admins
+
+
+async def refresh_admins() -> None:
+    """Перечитать админов из БД (вызывать и после изменения флага is_admin)."""
+    global _db_admins
+    admins = frozenset(await get_admin_user_ids())
+    if admins != _db_admins:
+        logger.info(f"Админы из БД: {sorted(admins)}")
+    _db_admins = admins
+
+
+async def run_admin_refresher() -> None:
+    """Фоновое обновление админов раз в admin_refresh_interval секунд."""
+    while True:
+        await asyncio.sleep(settings.admin_refresh_interval)
+        try:
+            await refresh_admins()
+        except Exception as e:
+            logger.error(f"Не удалось обновить админов: {e}")
+
+
+async def notify_admins_stuck_gifts(bot: Bot, user_ids: list[int]) -> None:
+    """Уведомить админов о подарках, застрявших в отправке."""
+    text = (
+        "⚠️ <b>Подарки зависли при отправке</b>\n\n"
+        "Процесс упал во время send_gift — подарок мог уйти, а мог и нет.\n"
+        "Повторно не отправляем, проверь вручную:\n"
+        + ", ".join(f"<code>{user_id}</code>" for user_id in user_ids)
+    )
+    
+    for admin_id in get_admin_ids():
+        try:
+            await bot.send_message(admin_id, text)
+        except Exception as e:
+            logger.error(f"Failed to notify admin {admin_id}: {e}")
+
+
+async def notify_admins_low_balance(bot: Bot, current_balance: int) -> None:
+    """Уведомить админов о низком балансе."""
+    text = (
+        f"⚠️ <b>Внимание!</b>\n\n"
+        f"Не хватает звёзд для подарка!\n"
+        f"Баланс: {current_balance} ⭐\n\n"
+        f"Пополни: /donate"
+    )
+    
+    for admin_id in get_admin_ids():
+        try:
+            await bot.send_message(admin_id, text)
+        except Exception as e:
+            logger.error(f"Failed to notify admin {admin_id}: {e}")
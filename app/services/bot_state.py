@@ -1,16 +1,63 @@
-"""Состояние бота (пауза и т.д.)."""
+"""
+Состояние бота (пауза и другие runtime-флаги).
 
-# Глобальное состояние паузы
-_is_paused: bool = False
+Флаги хранятся в Postgres (переживают перезапуск) и кэшируются в памяти
+процесса. Изменение рассылается всем процессам через NOTIFY, поэтому
+is_bot_paused() — просто чтение из памяти.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from loguru import logger
+
+from app.database.listener import subscribe
+from app.database.repositories.runtime_flag import (
+    FLAGS_CHANNEL,
+    get_runtime_flags,
+    set_runtime_flag,
+)
+
+
+PAUSED_FLAG = "paused"
+
+# Локальная копия флагов
+_flags: dict[str, Any] = {}
 
 
 def is_bot_paused() -> bool:
     """Проверить, на паузе ли бот."""
-    return _is_paused
+    return bool(_flags.get(PAUSED_FLAG, False))
+
+
+async def set_bot_paused(paused: bool) -> None:
+    """Установить состояние паузы (для всех процессов)."""
+    await set_flag(PAUSED_FLAG, paused)
+
+
+def get_flag(name: str, default: Any = None) -> Any:
+    """Значение флага из локального кэша."""
+    return _flags.get(name, default)
+
+
+async def set_flag(name: str, value: Any) -> None:
+    """Записать флаг в БД; локально применяется сразу, остальным — через NOTIFY."""
+    await set_runtime_flag(name, value)
+    _flags[name] = value
+
+
+async def load_flags() -> None:
+    """Перечитать все флаги из БД."""
+    global _flags
+    _flags = await get_runtime_flags()
+    logger.debug(f"Флаги: {_flags}")
+
 
+def _on_notify(payload: str) -> None:
+    data = json.loads(payload)
+    _flags[data["name"]] = data["value"]
+    logger.info(f"Флаг {data['name']} = {data['value']}")
 
-def set_bot_paused(paused: bool) -> None:
-    """Установить состояние паузы."""
-    global _is_paused
-    _is_paused = paused
 
+subscribe(FLAGS_CHANNEL, _on_notify, resync=load_flags)
@@ -0,0 +1,69 @@
+"""Потоковая выгрузка пользователей в CSV (/export)."""
+from __future__ import annotations
+
+import asyncio
+import gzip
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from typing import BinaryIO, Optional
+
+from app.database.repositories.export import copy_users_csv, get_last_export_at, save_export
+
+
+_CSV_HEADER = "user_id,username,gift_received,pending_gift,created_at\r\n"
+
+
+@dataclass
+class ExportResult:
+    path: str
+    filename: str
+    rows: int
+    since: Optional[datetime]
+    # Момент снимка COPY — граница следующей инкрементальной выгрузки
+    started_at: datetime
+
+
+async def export_users(*, incremental: bool = False, compress: bool = False) -> ExportResult:
+    """
+    Выгрузить пользователей во временный файл (опционально gzip).
+
+    Данные идут потоком COPY → файл, память не зависит от размера таблицы.
+    incremental=True — только строки, созданные/изменённые с прошлой выгрузки
+    (если выгрузок ещё не было — полная). Файл удаляет вызывающий код;
+    выгрузка записывается (commit_export) только после того, как файл
+    доставлен, — иначе следующая /export new потеряла бы эти строки.
+    """
+    since = await get_last_export_at() if incremental else None
+
+    suffix = ".csv.gz" if compress else ".csv"
+    fd, path = tempfile.mkstemp(prefix="export_", suffix=suffix)
+    raw_file = os.fdopen(fd, "wb")
+    out: BinaryIO = gzip.GzipFile(fileobj=raw_file, mode="wb", compresslevel=6) if compress else raw_file
+
+    try:
+        out.write(_CSV_HEADER.encode("utf-8-sig"))  # BOM для Excel
+
+        async def write(chunk: bytes) -> None:
+            # Сжатие и запись на диск — вне event loop
+            await asyncio.to_thread(out.write, chunk)
+
+        rows, started_at = await copy_users_csv(write, since=since)
+    except BaseException:
+        out.close()
+        raw_file.close()
+        os.remove(path)
+        raise
+
+    out.close()
+    raw_file.close()
+
+    kind = "new" if since is not None else "all"
+    filename = f"users_{kind}_{datetime.now().strftime('%Y%m%d_%H%M')}{suffix}"
+    return ExportResult(path=path, filename=filename, rows=rows, since=since, started_at=started_at)
+
+
+async def commit_export(result: ExportResult) -> None:
+    """Файл доставлен — сдвинуть границу инкрементальной выгрузки."""
+    await save_export(result.started_at, result.rows, is_incremental=result.since is not None)
@@ -0,0 +1,220 @@
+"""Массовая отправка ожидающих подарков (/send_pending)."""
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from loguru import logger
+
+from app.database.repositories.gift_drain import (
+    drain_lock,
+    get_active_drain,
+    create_drain,
+    resume_drain,
+    start_drain_chunk,
+    commit_drain_chunk,
+    finish_drain,
+)
+from app.database.repositories.user import get_pending_gift_user_ids
+from app.i18n import tr
+from app.services.gift_outbox import gift_errors, gifts_sent
+from app.services.star_ledger import refund_stars, reserve_stars, settle_stars
+from app.services.stats import get_stats
+from app.utils.config import settings
+
+
+# Сколько раз повторяем отправку одному пользователю после RetryAfter
+_MAX_ATTEMPTS = 5
+
+_running: bool = False
+
+
+class DrainAlreadyRunning(Exception):
+    """Рассылка уже идёт в этом или другом процессе."""
+
+
+@dataclass
+class DrainProgress:
+    """Прогресс рассылки (для статус-сообщения админу)."""
+    total: int
+    sent: int = 0
+    failed: int = 0
+    uncertain: list[int] = field(default_factory=list)
+    resumed: bool = False
+    # Сколько было обработано до текущего запуска (при возобновлении)
+    base: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.failed
+
+    @property
+    def rate(self) -> float:
+        """Подарков в секунду за текущий запуск."""
+        elapsed = time.monotonic() - self.started_at
+        return (self.processed - self.base) / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Оценка оставшегося времени в секундах."""
+        rate = self.rate
+        if not rate:
+            return None
+        return max(self.total - self.processed, 0) / rate
+
+
+class _RateLimiter:
+    """Равномерный темп отправки + общая пауза для всех воркеров по RetryAfter."""
+
+    def __init__(self, rate: float) -> None:
+        self._interval = 1 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        now = time.monotonic()
+        delay = self._next - now
+        self._next = max(now, self._next) + self._interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        self._next = max(self._next, time.monotonic() + seconds)
+
+
+def is_drain_running() -> bool:
+    return _running
+
+
+async def _send_one(bot: Bot, user_id: int, limiter: _RateLimiter) -> bool:
+    if not await reserve_stars():
+        gift_errors.labels("drain", "balance").inc()
+        logger.error(f"Failed to send pending gift to {user_id}: не хватает звёзд")
+        return False
+
+    for _ in range(_MAX_ATTEMPTS):
+        await limiter.wait()
+        try:
+            await bot.send_gift(
+                gift_id=settings.gift_id,
+                user_id=user_id,
+                text=tr("gift.message"),
+            )
+            gifts_sent.labels("drain").inc()
+            await settle_stars()
+            logger.info(f"Pending gift sent to {user_id}")
+            return True
+        except TelegramRetryAfter as e:
+            gift_errors.labels("drain", "retry_after").inc()
+            logger.warning(f"Flood control при отправке {user_id}: пауза {e.retry_after}s")
+            limiter.pause(e.retry_after)
+        except Exception as e:
+            gift_errors.labels("drain", "error").inc()
+            logger.error(f"Failed to send pending gift to {user_id}: {e}")
+            break
+    else:
+        logger.error(f"Failed to send pending gift to {user_id}: flood control не отпустил")
+
+    await refund_stars()
+    return False
+
+
+async def drain_pending_gifts(
+    bot: Bot,
+    on_progress: Callable[[DrainProgress], Awaitable[None]],
+) -> DrainProgress:
+    """
+    Отправить подарки всем ожидающим.
+
+    - id читаются из БД пачками по gift_drain_chunk_size (keyset по id)
+    - пачка отправляется пулом из gift_drain_workers воркеров с общим темпом
+      gift_drain_rate и паузой по TelegramRetryAfter
+    - результат пачки пишется одним UPDATE вместе с чекпоинтом
+
+    Одновременно идёт одна рассылка на все реплики (drain_lock). Если процесс
+    упал посреди пачки, следующий вызов продолжит с чекпоинта. Пользователей
+    прерванной пачки повторно не трогаем (подарок мог уйти): они снимаются
+    с ожидания и возвращаются в DrainProgress.uncertain для ручной проверки.
+    """
+    global _running
+    if _running:
+        raise DrainAlreadyRunning()
+    _running = True
+
+    try:
+        async with drain_lock() as acquired:
+            if not acquired:
+                raise DrainAlreadyRunning()
+            return await _drain(bot, on_progress)
+    finally:
+        _running = False
+
+
+async def _drain(
+    bot: Bot,
+    on_progress: Callable[[DrainProgress], Awaitable[None]],
+) -> DrainProgress:
+    drain = await get_active_drain()
+    progress = DrainProgress(total=0)
+
+    if drain is None:
+        drain = await create_drain()
+    else:
+        progress.resumed = True
+        progress.sent, progress.failed = drain.sent, drain.failed
+        progress.base = progress.processed
+        progress.uncertain = list(drain.uncertain)
+        if drain.in_flight:
+            progress.uncertain += drain.in_flight
+            drain.cursor = max(drain.cursor, max(drain.in_flight))
+            await resume_drain(drain.id, drain.in_flight, progress.uncertain, drain.cursor)
+        logger.warning(
+            f"Продолжаем рассылку #{drain.id} с id > {drain.cursor}, "
+            f"под вопросом: {progress.uncertain}"
+        )
+
+    pending = (await get_stats()).pending
+    # uncertain уже сняты с ожидания и в pending не входят
+    progress.total = progress.base + pending
+    progress.started_at = time.monotonic()
+
+    limiter = _RateLimiter(settings.gift_drain_rate)
+    semaphore = asyncio.Semaphore(settings.gift_drain_workers)
+
+    async def worker(user_id: int) -> tuple[int, bool]:
+        async with semaphore:
+            return user_id, await _send_one(bot, user_id, limiter)
+
+    cursor = drain.cursor
+    while True:
+        user_ids = await get_pending_gift_user_ids(
+            after_id=cursor, limit=settings.gift_drain_chunk_size
+        )
+        if not user_ids:
+            break
+
+        await start_drain_chunk(drain.id, user_ids)
+        results = await asyncio.gather(*(worker(user_id) for user_id in user_ids))
+
+        sent_ids = [user_id for user_id, ok in results if ok]
+        progress.sent += len(sent_ids)
+        progress.failed += len(user_ids) - len(sent_ids)
+        cursor = user_ids[-1]
+
+        await commit_drain_chunk(
+            drain.id,
+            sent_ids,
+            cursor=cursor,
+            sent=progress.sent,
+            failed=progress.failed,
+        )
+        # Новые ожидающие могли появиться во время рассылки
+        progress.total = max(progress.total, progress.processed)
+        await on_progress(progress)
+
+    await finish_drain(drain.id)
+    return progress
@@ -0,0 +1,184 @@
+"""
+Очередь отправки подарков.
+
+Хендлер «Проверить» только ставит подарок в gift_outbox (уникально по
+user_id) и сразу отвечает. Воркеры забирают строки через
+SELECT ... FOR UPDATE SKIP LOCKED, отправляют подарок и обновляют
+сообщение пользователя. Воркеров можно запускать в любом числе процессов.
+
+Гарантия — не больше одного подарка на пользователя: воркер забирает по
+одной строке и переводит её в sending прямо перед send_gift. Если процесс
+упал во время отправки, строка остаётся в sending и повторно не
+отправляется; через GIFT_OUTBOX_STUCK_AFTER секунд она помечается stuck
+и админы получают список пользователей для ручной проверки. Сетевая
+ошибка send_gift (ушёл ли подарок, неизвестно) сразу даёт stuck; отказ
+Telegram — failed, и следующее «Проверить» ставит подарок в очередь заново.
+"""
+from __future__ import annotations
+
+import asyncio
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from loguru import logger
+from sqlalchemy import Row
+
+from app.database.listener import subscribe
+from app.database.repositories.gift_outbox import (
+    OUTBOX_CHANNEL,
+    claim_gift,
+    complete_gift,
+    defer_gift_to_pending,
+    fail_gift,
+    mark_stuck_gifts,
+    retry_gift_later,
+)
+from app.i18n import tr
+from app.services.admins import notify_admins_low_balance, notify_admins_stuck_gifts
+from app.services.star_ledger import (
+    get_available_stars,
+    refund_stars,
+    reserve_stars,
+    settle_stars,
+    sync_star_balance,
+)
+from app.utils.config import settings
+from app.utils.metrics import Counter
+
+
+# Общие для очереди и /send_pending: path = outbox | drain
+gifts_sent = Counter("bot_gifts_sent_total", "Отправленные подарки", ["path"])
+gift_errors = Counter("bot_gift_errors_total", "Неудачные отправки подарков", ["path", "reason"])
+
+
+_wakeup = asyncio.Event()
+
+
+def _on_notify(payload: str) -> None:
+    _wakeup.set()
+
+
+subscribe(OUTBOX_CHANNEL, _on_notify)
+
+
+async def _edit_user_message(bot: Bot, job: Row, text: str) -> None:
+    """Обновить сообщение пользователя (картинка с подписью или просто текст)."""
+    if job.chat_id is None or job.message_id is None:
+        await bot.send_message(job.user_id, text)
+        return
+    try:
+        await bot.edit_message_caption(chat_id=job.chat_id, message_id=job.message_id, caption=text)
+    except TelegramBadRequest as e:
+        if "message is not modified" in str(e):
+            return
+        try:
+            await bot.edit_message_text(chat_id=job.chat_id, message_id=job.message_id, text=text)
+        except TelegramBadRequest as e2:
+            if "message is not modified" not in str(e2):
+                logger.warning(f"Failed to edit message: {e2}")
+
+
+async def _to_pending(bot: Bot, job: Row, balance: int) -> None:
+    await defer_gift_to_pending(job.id, job.user_id)
+    await notify_admins_low_balance(bot, balance)
+    await _edit_user_message(bot, job, tr("start.pending_gift"))
+    logger.warning(f"User {job.user_id} added to pending (balance: {balance})")
+
+
+async def _deliver(bot: Bot, job: Row) -> None:
+    # Резервируем звёзды по локальному учёту (без запроса баланса в Telegram)
+    if not await reserve_stars():
+        gift_errors.labels("outbox", "balance").inc()
+        await _to_pending(bot, job, await get_available_stars() or 0)
+        return
+
+    try:
+        await bot.send_gift(
+            gift_id=settings.gift_id,
+            user_id=job.user_id,
+            text=tr("gift.message"),
+        )
+    except TelegramRetryAfter as e:
+        # Telegram отклонил запрос целиком — подарок точно не ушёл
+        gift_errors.labels("outbox", "retry_after").inc()
+        await refund_stars()
+        await retry_gift_later(job.id, e.retry_after)
+        return
+    except TelegramBadRequest as e:
+        await refund_stars()
+        error_msg = str(e).lower()
+        if "not enough" in error_msg or "balance" in error_msg:
+            gift_errors.labels("outbox", "balance").inc()
+            # Учёт разошёлся с Telegram — сверяемся
+            try:
+                await sync_star_balance(bot)
+            except Exception as sync_error:
+                logger.error(f"Failed to sync star balance: {sync_error}")
+            await _to_pending(bot, job, 0)
+        else:
+            gift_errors.labels("outbox", "bad_request").inc()
+            logger.error(f"Telegram error: {e}")
+            await fail_gift(job.id, str(e))
+            await _edit_user_message(bot, job, tr("errors.gift_send_failed"))
+        return
+    except Exception as e:
+        # Сетевая ошибка: неизвестно, ушёл ли подарок — повторно не шлём, решает админ
+        gift_errors.labels("outbox", "network").inc()
+        await refund_stars()
+        logger.error(f"Error sending gift: {e}")
+        await fail_gift(job.id, str(e), status="stuck")
+        await notify_admins_stuck_gifts(bot, [job.user_id])
+        await _edit_user_message(bot, job, tr("start.gift_stuck"))
+        return
+
+    gifts_sent.labels("outbox").inc()
+    await settle_stars()
+    await complete_gift(job.id, job.user_id)
+    await _edit_user_message(bot, job, tr("start.gift_sent"))
+    logger.info(f"Gift sent to {job.user_id}")
+
+
+async def _worker(bot: Bot) -> None:
+    while True:
+        # Сбрасываем до claim: NOTIFY, пришедший во время claim, не потеряется
+        _wakeup.clear()
+        try:
+            job = await claim_gift()
+        except Exception as e:
+            logger.error(f"Очередь подарков: ошибка claim: {e}")
+            job = None
+
+        if job is None:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=settings.gift_outbox_poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        try:
+            await _deliver(bot, job)
+        except Exception as e:
+            logger.error(f"Очередь подарков: ошибка обработки {job.user_id}: {e}")
+
+
+async def _reaper(bot: Bot) -> None:
+    """Помечать строки, зависшие в sending, и сообщать о них админам."""
+    while True:
+        await asyncio.sleep(settings.gift_outbox_stuck_after)
+        try:
+            user_ids = await mark_stuck_gifts(settings.gift_outbox_stuck_after)
+        except Exception as e:
+            logger.error(f"Очередь подарков: ошибка поиска зависших: {e}")
+            continue
+        if user_ids:
+            gift_errors.labels("outbox", "stuck").inc(len(user_ids))
+            logger.error(f"Очередь подарков: зависли в отправке {len(user_ids)}: {user_ids}")
+            await notify_admins_stuck_gifts(bot, user_ids)
+
+
+async def run_gift_workers(bot: Bot) -> None:
+    """Запустить gift_outbox_workers воркеров очереди подарков и поиск зависших строк."""
+    await asyncio.gather(
+        _reaper(bot),
+        *(_worker(bot) for _ in range(settings.gift_outbox_workers)),
+    )
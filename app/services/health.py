@@ -0,0 +1,92 @@
+"""
+Локальный HTTP-сервер метрик и проб.
+
+- /metrics — метрики в формате Prometheus
+- /healthz — процесс жив (event loop отвечает)
+- /readyz  — старт завершён, БД отвечает, LISTEN-соединение есть
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+
+from aiohttp import web
+from loguru import logger
+from sqlalchemy import text
+
+from app.database.engine import engine
+from app.database.listener import is_listener_connected
+from app.utils.config import settings
+from app.utils.metrics import Gauge, render
+
+
+# Сколько ждём ответа БД в /readyz
+_DB_PING_TIMEOUT = 2.0
+
+_ready: bool = False
+_started_at = time.time()
+
+Gauge("bot_ready", "Готовность принимать апдейты", lambda: float(_ready))
+Gauge("bot_start_time_seconds", "Время старта процесса (unix)", lambda: _started_at)
+
+
+def mark_ready() -> None:
+    """Старт завершён — /readyz начинает отвечать 200 (если БД доступна)."""
+    global _ready
+    _ready = True
+
+
+def mark_not_ready() -> None:
+    """Остановка — снимаем реплику с балансировки."""
+    global _ready
+    _ready = False
+
+
+async def _ping_db() -> bool:
+    try:
+        async with asyncio.timeout(_DB_PING_TIMEOUT):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        return True
+    except Exception as e:
+        logger.warning(f"Readiness: БД не отвечает: {e}")
+        return False
+
+
+async def _metrics(request: web.Request) -> web.Response:
+    return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+
+async def _healthz(request: web.Request) -> web.Response:
+    return web.Response(text="ok")
+
+
+async def _readyz(request: web.Request) -> web.Response:
+    problems = []
+    if not _ready:
+        problems.append("starting")
+    if not is_listener_connected():
+        problems.append("listener")
+    if not await _ping_db():
+        problems.append("database")
+    if problems:
+        return web.Response(status=503, text=", ".join(problems))
+    return web.Response(text="ok")
+
+
+def build_health_app() -> web.Application:
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics)
+    app.router.add_get("/healthz", _healthz)
+    app.router.add_get("/readyz", _readyz)
+    return app
+
+
+async def start_health_server() -> web.AppRunner:
+    """Запустить сервер на metrics_host:metrics_port; остановка — runner.cleanup()."""
+    runner = web.AppRunner(build_health_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.metrics_host, settings.metrics_port)
+    await site.start()
+    logger.info(f"Метрики: http://{settings.metrics_host}:{settings.metrics_port}/metrics")
+    return runner
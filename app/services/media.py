@@ -0,0 +1,195 @@
+"""Реестр медиафайлов: картинка загружается в Telegram один раз, дальше шлём по file_id."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile, Message
+from loguru import logger
+
+from app.database.repositories.media import get_media_file_id, save_media_file_id
+from app.utils.config import settings
+
+
+@dataclass
+class _MediaEntry:
+    mtime_ns: int
+    size: int
+    content_hash: str
+    file_id: Optional[str]
+    data: Optional[bytes]  # держим байты только пока нет file_id
+    checked_at: float
+
+
+_entries: dict[str, _MediaEntry] = {}
+_locks: dict[str, asyncio.Lock] = {}
+
+
+def _prepare_image(data: bytes) -> bytes:
+    """
+    Уменьшить / пережать картинку (если включено в настройках).
+
+    Pillow — необязательная зависимость: без неё отдаём файл как есть.
+    """
+    if not settings.media_max_side and not settings.media_jpeg_quality:
+        return data
+
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.warning("Pillow не установлен — картинки отправляются без обработки")
+        return data
+
+    image = Image.open(io.BytesIO(data))
+    if settings.media_max_side:
+        image.thumbnail((settings.media_max_side, settings.media_max_side))
+
+    out = io.BytesIO()
+    image.convert("RGB").save(
+        out,
+        format="JPEG",
+        quality=settings.media_jpeg_quality or 90,
+        optimize=True,
+    )
+    return out.getvalue()
+
+
+def _read_file(path: Path) -> tuple[bytes, int, int]:
+    stat = path.stat()
+    return _prepare_image(path.read_bytes()), stat.st_mtime_ns, stat.st_size
+
+
+async def _load(path: Path, *, lookup: bool = True) -> _MediaEntry:
+    """Прочитать файл, посчитать хэш и найти уже загруженный file_id в БД."""
+    data, mtime_ns, size = await asyncio.to_thread(_read_file, path)
+    content_hash = hashlib.sha256(data).hexdigest()
+    file_id = await get_media_file_id(content_hash) if lookup else None
+
+    entry = _MediaEntry(
+        mtime_ns=mtime_ns,
+        size=size,
+        content_hash=content_hash,
+        file_id=file_id,
+        data=None if file_id else data,
+        checked_at=time.monotonic(),
+    )
+    _entries[str(path)] = entry
+    return entry
+
+
+async def _get_entry(path: Path) -> _MediaEntry:
+    """Запись из кэша; раз в media_check_interval сверяем mtime/size с диском."""
+    entry = _entries.get(str(path))
+    if entry is None:
+        return await _load(path)
+
+    now = time.monotonic()
+    if now - entry.checked_at < settings.media_check_interval:
+        return entry
+
+    stat = await asyncio.to_thread(path.stat)
+    if stat.st_mtime_ns == entry.mtime_ns and stat.st_size == entry.size:
+        entry.checked_at = now
+        return entry
+
+    logger.info(f"Медиа: файл {path} изменился, будет загружен заново")
+    return await _load(path)
+
+
+async def answer_photo(message: Message, path: str | Path, **kwargs: Any) -> Message:
+    """
+    Ответить картинкой, используя сохранённый file_id.
+
+    Если file_id ещё нет (или Telegram его не принял) — загружаем файл,
+    запоминаем file_id в памяти и в БД. Загрузка одного файла идёт под
+    локом, чтобы параллельные /start не грузили одно и то же.
+    """
+    path = Path(path)
+    key = str(path)
+
+    entry = await _get_entry(path)
+    if entry.file_id:
+        try:
+            return await message.answer_photo(photo=entry.file_id, **kwargs)
+        except TelegramBadRequest as e:
+            logger.warning(f"Медиа: file_id для {path} не принят ({e}), загружаем заново")
+            entry.file_id = None
+
+    lock = _locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        entry = _entries.get(key) or await _load(path)
+        if entry.file_id:
+            return await message.answer_photo(photo=entry.file_id, **kwargs)
+
+        if entry.data is None:
+            # file_id из БД был отвергнут — читаем файл заново, без БД
+            entry = await _load(path, lookup=False)
+
+        sent = await message.answer_photo(
+            photo=BufferedInputFile(entry.data, filename=path.name),
+            **kwargs,
+        )
+        await _store_file_id(entry, key, sent)
+        return sent
+
+
+async def _store_file_id(entry: _MediaEntry, key: str, sent: Message) -> None:
+    """Запомнить file_id загруженной картинки в памяти и в БД."""
+    entry.file_id = sent.photo[-1].file_id
+    entry.data = None
+    await save_media_file_id(entry.content_hash, key, entry.file_id)
+    logger.info(f"Медиа: {key} загружен, file_id сохранён")
+
+
+async def prepare_media(*paths: str | Path) -> None:
+    """Предзагрузка при старте: обработка картинок и поиск file_id в БД."""
+    for path in paths:
+        try:
+            entry = await _load(Path(path))
+        except Exception as e:
+            logger.warning(f"Медиа: не удалось подготовить {path}: {e}")
+            continue
+        state = "file_id из БД" if entry.file_id else "будет загружен при первой отправке"
+        logger.info(f"Медиа: {path} готов ({state})")
+
+
+async def preupload_media(bot: Bot, chat_id: int, *paths: str | Path) -> None:
+    """
+    Загрузить в Telegram подготовленные картинки, у которых ещё нет file_id:
+    фото отправляется в chat_id без звука и сразу удаляется. Первый /start
+    после этого уже шлёт картинку по file_id.
+    """
+    for path in paths:
+        path = Path(path)
+        key = str(path)
+        lock = _locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = _entries.get(key)
+            if entry is None or entry.file_id or entry.data is None:
+                continue
+            try:
+                sent = await bot.send_photo(
+                    chat_id=chat_id,
+                    photo=BufferedInputFile(entry.data, filename=path.name),
+                    disable_notification=True,
+                )
+            except Exception as e:
+                logger.warning(f"Медиа: не удалось заранее загрузить {path}: {e}")
+                continue
+            try:
+                await _store_file_id(entry, key, sent)
+            except Exception as e:
+                # Не страшно: картинка загрузится с первым /start
+                logger.warning(f"Медиа: не удалось сохранить file_id {path}: {e}")
+            finally:
+                try:
+                    await bot.delete_message(chat_id=chat_id, message_id=sent.message_id)
+                except TelegramBadRequest:
+                    pass
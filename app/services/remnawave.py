@@ -1,17 +1,68 @@
 """Клиент Remnawave для проверки VPN подключения."""
 from __future__ import annotations
 
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from typing import Optional
 
 from loguru import logger
 from remnawave import RemnawaveSDK
 from remnawave.exceptions.general import ApiError, NotFoundError
 
+from app.database.repositories.vpn_user import (
+    is_vpn_connected_saved,
+    save_vpn_connected,
+    upsert_vpn_users,
+)
 from app.utils.config import settings
+from app.utils.metrics import Counter, Histogram
 
 
 _sdk: Optional[RemnawaveSDK] = None
 
+_api_seconds = Histogram("bot_remnawave_request_seconds", "Запросы к Remnawave API", ["method"])
+_api_errors = Counter("bot_remnawave_errors_total", "Ошибки Remnawave API", ["method"])
+_vpn_checks = Counter("bot_vpn_checks_total", "Проверки VPN по источнику ответа", ["source"])
+
+
+@dataclass
+class VpnCacheStats:
+    memory_hits: int = 0
+    db_hits: int = 0
+    api_calls: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.memory_hits + self.db_hits + self.api_calls
+        return (self.memory_hits + self.db_hits) / total if total else 0.0
+
+
+@dataclass
+class VpnMirrorStatus:
+    last_sync_at: Optional[float] = None  # monotonic-время окончания последней синхронизации
+    last_duration: float = 0.0
+    last_rows: int = 0  # сколько пользователей прочитали из Remnawave
+    last_upserted: int = 0  # сколько из них подключены (отправлены в upsert)
+
+    @property
+    def lag(self) -> Optional[float]:
+        """Сколько секунд назад закончилась последняя синхронизация."""
+        return None if self.last_sync_at is None else time.monotonic() - self.last_sync_at
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.last_rows / self.last_duration if self.last_duration else 0.0
+
+
+# username → (подключён, monotonic-время проверки); положительные записи без TTL
+_cache: OrderedDict[str, tuple[bool, float]] = OrderedDict()
+_stats = VpnCacheStats()
+_mirror = VpnMirrorStatus()
+
 
 def _get_sdk() -> Optional[RemnawaveSDK]:
     """Получить SDK Remnawave (singleton)."""
@@ -30,23 +81,170 @@ def _get_sdk() -> Optional[RemnawaveSDK]:
     return _sdk
 
 
-async def check_vpn_connected(telegram_id: int, prefix: int | str = 1) -> bool:
+def get_vpn_cache_stats() -> VpnCacheStats:
+    """Статистика кэша проверок VPN (сколько запросов не дошло до панели)."""
+    return _stats
+
+
+def _remember(username: str, connected: bool) -> None:
+    _cache[username] = (connected, time.monotonic())
+    _cache.move_to_end(username)
+    while len(_cache) > settings.vpn_cache_size:
+        _cache.popitem(last=False)
+        _stats.evictions += 1
+
+
+def _to_naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+async def check_vpn_connected(telegram_id: int, prefix: Optional[str] = None) -> bool:
     """
-    Проверить, подключил ли пользователь VPN.
+    Проверить, подключил ли пользователь VPN ('{prefix}_{telegram_id}' в Remnawave,
+    по умолчанию prefix — VPN_USERNAME_PREFIX, как и у зеркала).
     
     Возвращает True если first_connected не пустое.
+    
+    first_connected не сбрасывается, поэтому положительный ответ сохраняется
+    в vpn_user и больше никогда не запрашивается. Отрицательный ответ
+    (и NotFound) кэшируется в памяти на vpn_negative_ttl секунд — гасит
+    повторные нажатия «Проверить». Кэш в памяти — LRU на vpn_cache_size.
+    
+    Фоновое зеркало (run_vpn_mirror) заранее записывает в vpn_user всех
+    подключившихся, так что Remnawave спрашиваем только о тех, кого зеркало
+    ещё не видело подключённым.
     """
     sdk = _get_sdk()
     if sdk is None:
         return False
     
+    if prefix is None:
+        prefix = settings.vpn_username_prefix
     username = f"{prefix}_{telegram_id}"
     
+    cached = _cache.get(username)
+    if cached is not None:
+        connected, checked_at = cached
+        if connected or time.monotonic() - checked_at < settings.vpn_negative_ttl:
+            _cache.move_to_end(username)
+            _stats.memory_hits += 1
+            _vpn_checks.labels("memory").inc()
+            return connected
+    
+    if await is_vpn_connected_saved(username):
+        _stats.db_hits += 1
+        _vpn_checks.labels("db").inc()
+        _remember(username, True)
+        return True
+    
+    _stats.api_calls += 1
+    _vpn_checks.labels("api").inc()
+    started = time.perf_counter()
     try:
         user = await sdk.users.get_user_by_username(username=username)
-        return user.first_connected is not None
     except NotFoundError:
+        _remember(username, False)
         return False
     except ApiError as e:
+        _api_errors.labels("get_user_by_username").inc()
         logger.error(f"Remnawave error: {e}")
         return False
+    finally:
+        _api_seconds.labels("get_user_by_username").observe(time.perf_counter() - started)
+    
+    if user.first_connected is None:
+        _remember(username, False)
+        return False
+    
+    await save_vpn_connected(username, telegram_id, _to_naive_utc(user.first_connected))
+    _remember(username, True)
+    return True
+
+
+# ============ Зеркало пользователей Remnawave ============
+
+def get_vpn_mirror_status() -> VpnMirrorStatus:
+    """Состояние фонового зеркала (лаг, скорость)."""
+    return _mirror
+
+
+def _parse_telegram_id(username: str, prefix: str) -> Optional[int]:
+    """'{prefix}_{telegram_id}' → telegram_id (чужие username — None)."""
+    head, sep, tail = username.partition("_")
+    if not sep or head != prefix or not tail.isdigit():
+        return None
+    return int(tail)
+
+
+async def sync_vpn_mirror() -> None:
+    """
+    Один проход зеркала: постранично читаем всех пользователей Remnawave
+    и пакетно пишем в vpn_user.
+
+    Пишем только подключившихся (first_connected есть) — проверка читает
+    лишь их. Фильтровать по updated_at пользователя нельзя: first_connected
+    приходит из user_traffic, и первое подключение updated_at не меняет.
+    Upsert идемпотентен — уже записанные строки он не трогает.
+    """
+    sdk = _get_sdk()
+    if sdk is None:
+        return
+    
+    started = time.monotonic()
+    prefix = str(settings.vpn_username_prefix)
+    rows_read = 0
+    upserted = 0
+    start = 0
+    
+    while True:
+        page_started = time.perf_counter()
+        try:
+            page = await sdk.users.get_all_users(start=start, size=settings.vpn_mirror_page_size)
+        except Exception:
+            _api_errors.labels("get_all_users").inc()
+            raise
+        finally:
+            _api_seconds.labels("get_all_users").observe(time.perf_counter() - page_started)
+        if not page.users:
+            break
+        
+        rows = []
+        for user in page.users:
+            if user.first_connected is None:
+                continue
+            telegram_id = _parse_telegram_id(user.username, prefix)
+            if telegram_id is None:
+                continue
+            rows.append({
+                "username": user.username,
+                "telegram_id": telegram_id,
+                "first_connected_at": _to_naive_utc(user.first_connected),
+            })
+        
+        await upsert_vpn_users(rows)
+        rows_read += len(page.users)
+        upserted += len(rows)
+        start += len(page.users)
+        if start >= page.total:
+            break
+    
+    _mirror.last_rows = rows_read
+    _mirror.last_upserted = upserted
+    _mirror.last_duration = time.monotonic() - started
+    _mirror.last_sync_at = time.monotonic()
+    logger.info(
+        f"Зеркало Remnawave: прочитано {rows_read}, подключены {upserted} "
+        f"за {_mirror.last_duration:.1f}s ({_mirror.rows_per_second:.0f} строк/с)"
+    )
+
+
+async def run_vpn_mirror() -> None:
+    """Фоновая синхронизация зеркала раз в vpn_mirror_interval секунд."""
+    while True:
+        try:
+            await sync_vpn_mirror()
+        except Exception as e:
+            logger.error(f"Зеркало Remnawave: ошибка синхронизации: {e}")
+        await asyncio.sleep(settings.vpn_mirror_interval)
@@ -0,0 +1,120 @@
+"""
+Локальный учёт звёзд: резерв перед отправкой подарка вместо get_my_star_balance.
+
+Бэкенд выбирается STAR_LEDGER_BACKEND:
+- memory — баланс в памяти процесса (одна реплика)
+- postgres — строка star_ledger, общая для всех реплик
+
+С Telegram баланс сверяется при старте, по таймеру и после пополнения.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Optional
+
+from aiogram import Bot
+from loguru import logger
+
+from app.database.repositories.star_ledger import (
+    get_ledger_available,
+    release_ledger_stars,
+    reserve_ledger_stars,
+    set_ledger_balance,
+)
+from app.utils.config import settings
+
+
+class _MemoryLedger:
+    def __init__(self) -> None:
+        self.balance: Optional[int] = None
+        self.reserved = 0
+
+    async def reserve(self, amount: int) -> Optional[bool]:
+        if self.balance is None:
+            return None
+        if self.balance - self.reserved < amount:
+            return False
+        self.reserved += amount
+        return True
+
+    async def release(self, amount: int, *, spent: bool) -> None:
+        self.reserved = max(self.reserved - amount, 0)
+        if spent and self.balance is not None:
+            self.balance -= amount
+
+    async def set_balance(self, balance: int, *, reset_reserved: bool = False) -> None:
+        self.balance = balance
+        if reset_reserved:
+            self.reserved = 0
+
+    async def available(self) -> Optional[int]:
+        return None if self.balance is None else self.balance - self.reserved
+
+
+class _PostgresLedger:
+    async def reserve(self, amount: int) -> Optional[bool]:
+        return await reserve_ledger_stars(amount)
+
+    async def release(self, amount: int, *, spent: bool) -> None:
+        await release_ledger_stars(amount, spent=spent)
+
+    async def set_balance(self, balance: int, *, reset_reserved: bool = False) -> None:
+        # Резервы общие для реплик — рестарт одной не должен сбрасывать чужие
+        await set_ledger_balance(balance)
+
+    async def available(self) -> Optional[int]:
+        return await get_ledger_available()
+
+
+_ledger = _PostgresLedger() if settings.star_ledger_backend == "postgres" else _MemoryLedger()
+
+
+async def reserve_stars(amount: int | None = None) -> bool:
+    """
+    Зарезервировать звёзды под один подарок.
+
+    False — звёзд не хватает, отправлять не нужно. Если баланс ещё ни разу
+    не удалось получить из Telegram — пропускаем (ошибку поймает send_gift).
+    """
+    reserved = await _ledger.reserve(amount or settings.gift_star_cost)
+    if reserved is None:
+        logger.debug("Баланс звёзд ещё не синхронизирован — отправляем без резерва")
+        return True
+    return reserved
+
+
+async def settle_stars(amount: int | None = None) -> None:
+    """Подарок ушёл — списать резерв с баланса."""
+    await _ledger.release(amount or settings.gift_star_cost, spent=True)
+
+
+async def refund_stars(amount: int | None = None) -> None:
+    """Подарок не ушёл — вернуть резерв."""
+    await _ledger.release(amount or settings.gift_star_cost, spent=False)
+
+
+async def get_available_stars() -> Optional[int]:
+    """Свободный баланс по учёту (None — ещё не синхронизирован)."""
+    return await _ledger.available()
+
+
+async def sync_star_balance(bot: Bot, *, reset_reserved: bool = False) -> int:
+    """
+    Получить баланс из Telegram и записать в учёт.
+
+    reset_reserved (при старте) обнуляет резервы только в памяти процесса:
+    в postgres они принадлежат и другим живым репликам.
+    """
+    balance = await bot.get_my_star_balance()
+    await _ledger.set_balance(balance.amount, reset_reserved=reset_reserved)
+    return balance.amount
+
+
+async def run_star_ledger_sync(bot: Bot) -> None:
+    """Фоновая сверка с Telegram раз в star_ledger_sync_interval секунд."""
+    while True:
+        await asyncio.sleep(settings.star_ledger_sync_interval)
+        try:
+            await sync_star_balance(bot)
+        except Exception as e:
+            logger.error(f"Не удалось синхронизировать баланс звёзд: {e}")
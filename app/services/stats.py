@@ -0,0 +1,44 @@
+"""Статистика розыгрыша: счётчики из stats_counter + периодическая сверка."""
+from __future__ import annotations
+
+import asyncio
+
+from loguru import logger
+
+from app.database.repositories.stats import (
+    UserStats,
+    get_user_stats,
+    install_stats_triggers,
+    reconcile_user_stats,
+)
+from app.utils.config import settings
+
+
+async def get_stats() -> UserStats:
+    """Счётчики пользователей за один запрос, без COUNT(*) по таблице."""
+    return await get_user_stats()
+
+
+async def reconcile_stats() -> UserStats:
+    """Сверить счётчики с таблицей; расхождение — в лог."""
+    before, actual = await reconcile_user_stats()
+    if before != actual:
+        logger.warning(f"Статистика: счётчики разошлись с таблицей: {before} → {actual}")
+    return actual
+
+
+async def init_stats() -> None:
+    """Установить триггер и выставить счётчики по таблице (при старте)."""
+    await install_stats_triggers()
+    stats = await reconcile_stats()
+    logger.info(f"Статистика: {stats}")
+
+
+async def run_stats_reconciler() -> None:
+    """Фоновая сверка раз в stats_reconcile_interval секунд."""
+    while True:
+        await asyncio.sleep(settings.stats_reconcile_interval)
+        try:
+            await reconcile_stats()
+        except Exception as e:
+            logger.error(f"Статистика: ошибка сверки: {e}")
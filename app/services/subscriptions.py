@@ -0,0 +1,98 @@
+"""
+Статус подписки на канал.
+
+Основной источник — события chat_member (бот должен быть админом канала):
+они держат User.is_subscribed актуальным, и проверка читает его из БД.
+События, пришедшие во время простоя или деплоя, теряются (при старте
+drop_pending_updates), поэтому записанному статусу доверяем только
+положительному и не старше subscription_status_max_age секунд. В остальных
+случаях спрашиваем get_chat_member (кэш на subscription_check_ttl секунд)
+и записываем ответ со свежим subscription_updated_at.
+"""
+from __future__ import annotations
+
+import time
+from datetime import datetime
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Chat, ChatMember
+from loguru import logger
+
+from app.database.models.user import User
+from app.database.repositories.user import set_subscription_from_event, update_user_subscription
+from app.utils.config import settings
+
+
+# Ограничение на размер кэша fallback-проверок
+_CACHE_MAX_SIZE = 100_000
+
+# user_id → (подписан, когда проверили)
+_checked: dict[int, tuple[bool, float]] = {}
+
+
+def is_required_channel(chat: Chat) -> bool:
+    return (chat.username or "").lower() == settings.required_channel.lower()
+
+
+def is_member(member: ChatMember) -> bool:
+    if member.status in ("member", "administrator", "creator"):
+        return True
+    # restricted-участник всё ещё в канале, если is_member
+    return member.status == "restricted" and bool(getattr(member, "is_member", False))
+
+
+async def on_member_updated(user_id: int, is_subscribed: bool) -> None:
+    """Событие chat_member по каналу: обновить индекс подписок."""
+    _checked.pop(user_id, None)
+    if not await set_subscription_from_event(user_id, is_subscribed):
+        # Пользователь ещё не нажимал /start — при проверке спросим Telegram
+        logger.debug(f"chat_member для неизвестного пользователя {user_id}")
+
+
+async def _fetch_subscription(bot: Bot, user_id: int) -> bool:
+    try:
+        member = await bot.get_chat_member(
+            chat_id=f"@{settings.required_channel}",
+            user_id=user_id,
+        )
+        return is_member(member)
+    except TelegramBadRequest as e:
+        logger.warning(f"Subscription check failed for {user_id}: {e}")
+        return False
+
+
+def _remember(user_id: int, is_subscribed: bool, now: float) -> None:
+    if len(_checked) >= _CACHE_MAX_SIZE:
+        expired = [uid for uid, (_, at) in _checked.items() if now - at >= settings.subscription_check_ttl]
+        for uid in expired:
+            del _checked[uid]
+        if len(_checked) >= _CACHE_MAX_SIZE:
+            _checked.clear()
+    _checked[user_id] = (is_subscribed, now)
+
+
+async def check_subscription(bot: Bot, user: User) -> bool:
+    """
+    Подписан ли пользователь на канал (по индексу, с fallback на Telegram).
+
+    Ответ Telegram записывается своей короткой транзакцией, а не в сессии
+    апдейта: хендлер дальше ждёт Remnawave и Telegram и не должен держать
+    соединение и блокировку строки "user".
+    """
+    if user.is_subscribed and user.subscription_updated_at is not None:
+        age = (datetime.utcnow() - user.subscription_updated_at).total_seconds()
+        if age < settings.subscription_status_max_age:
+            return True
+
+    now = time.monotonic()
+    cached = _checked.get(user.id)
+    if cached is not None and now - cached[1] < settings.subscription_check_ttl:
+        return cached[0]
+
+    is_subscribed = await _fetch_subscription(bot, user.id)
+    _remember(user.id, is_subscribed, now)
+    # Положительный ответ записываем всегда — он продлевает доверие к статусу
+    if is_subscribed or is_subscribed != user.is_subscribed:
+        await update_user_subscription(user.id, is_subscribed)
+    return is_subscribed
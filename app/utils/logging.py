@@ -0,0 +1,142 @@
+"""
+Настройка логирования (loguru).
+
+- LOG_FORMAT=text — человекочитаемые строки, json — одна JSON-строка на запись
+- LOG_SAMPLING — доля рутинных событий, которые попадают в лог, например
+  {"message": 0.01, "callback": 0.1}; предупреждения и ошибки не сэмплируются
+- LOG_FILE — дополнительный файл, пишется пачками из отдельного потока
+
+Сообщения передаются в loguru шаблоном с аргументами, а не f-строкой:
+форматирование выполняется, только если запись действительно уходит в sink.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import random
+import sys
+import threading
+import traceback
+from collections import deque
+from typing import Any
+
+from loguru import logger
+
+from app.utils.config import settings
+
+
+_TEXT_FORMAT = "{time:YYYY-MM-DD HH:mm:ss.SSS} | {level:<8} | {name}:{function}:{line} - {message}"
+
+# Доли по событиям; нет в словаре — пишем всегда
+_sampling: dict[str, float] = {}
+
+
+def log_sampled(event: str) -> bool:
+    """Писать ли очередное рутинное событие event (решение до форматирования)."""
+    rate = _sampling.get(event)
+    return rate is None or random.random() < rate
+
+
+def _json_format(record: dict[str, Any]) -> str:
+    payload = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+    }
+    extra = {key: value for key, value in record["extra"].items() if not key.startswith("_")}
+    if extra:
+        payload.update(extra)
+    if record["exception"] is not None:
+        error_type, error, tb = record["exception"]
+        payload["exception"] = "".join(traceback.format_exception(error_type, error, tb))
+    # Готовую строку подставляем через extra: loguru не разбирает её как шаблон
+    record["extra"]["_json"] = json.dumps(payload, ensure_ascii=False, default=str)
+    return "{extra[_json]}\n"
+
+
+class BatchedFileSink:
+    """
+    Файловый sink: write() только кладёт строку в очередь, запись на диск —
+    пачками в фоновом потоке раз в flush_interval секунд (или по batch_size).
+    compress=True — файл пишется в gzip (сжатие тоже в фоновом потоке).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        batch_size: int = 512,
+        flush_interval: float = 1.0,
+        compress: bool = False,
+    ) -> None:
+        if compress:
+            self._file = gzip.open(path, "at", encoding="utf-8")
+        else:
+            self._file = open(path, "a", encoding="utf-8")
+        self._queue: deque[str] = deque()
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, message: str) -> None:
+        self._queue.append(message)
+        if len(self._queue) >= self._batch_size:
+            self._wakeup.set()
+
+    def _drain(self) -> None:
+        lines = []
+        while self._queue:
+            lines.append(self._queue.popleft())
+        if lines:
+            self._file.write("".join(lines))
+            self._file.flush()
+
+    def _run(self) -> None:
+        while not self._stopped:
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            self._drain()
+
+    def stop(self) -> None:
+        """Вызывается loguru при logger.remove(): дописать хвост и закрыть файл."""
+        self._stopped = True
+        self._wakeup.set()
+        self._thread.join()
+        self._drain()
+        self._file.close()
+
+
+def setup_logging(level: str | None = None) -> None:
+    """Настроить sink'и по Settings."""
+    global _sampling
+    _sampling = dict(settings.log_sampling)
+    level = level or settings.log_level
+    fmt: Any = _json_format if settings.log_format == "json" else _TEXT_FORMAT
+
+    logger.remove()
+    logger.add(
+        sys.stdout,
+        level=level,
+        backtrace=False,
+        diagnose=False,
+        enqueue=settings.log_enqueue,
+        format=fmt,
+    )
+    if settings.log_file:
+        logger.add(
+            BatchedFileSink(
+                settings.log_file,
+                batch_size=settings.log_batch_size,
+                flush_interval=settings.log_flush_interval,
+            ),
+            level=level,
+            backtrace=False,
+            diagnose=False,
+            format=fmt,
+        )
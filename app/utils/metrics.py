@@ -0,0 +1,195 @@
+"""
+Метрики процесса в формате Prometheus.
+
+Счётчики и гистограммы — обычные списки/числа в памяти: всё выполняется
+в одном event loop, поэтому блокировки не нужны. Корзины гистограмм
+выделяются заранее, observe — bisect и два сложения. Дочерние метрики по
+меткам создаются при первом обращении и дальше берутся из словаря.
+
+render() отдаёт текстовый формат для эндпоинта /metrics.
+"""
+from __future__ import annotations
+
+import bisect
+from typing import Callable, Iterable, Optional, Union
+
+
+# Корзины по умолчанию, секунды
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: list[Union["Counter", "Histogram", "Gauge"]] = []
+
+LabelValues = tuple[str, ...]
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Counter:
+    """Монотонный счётчик (опционально с метками)."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[LabelValues, _CounterChild] = {}
+        if not self.labelnames:
+            self._children[()] = _CounterChild()
+        _registry.append(self)
+
+    def labels(self, *values: str) -> _CounterChild:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = _CounterChild()
+        return child
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._children[()].value += amount
+
+    @property
+    def value(self) -> float:
+        return sum(child.value for child in self._children.values())
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for values, child in self._children.items():
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {child.value}"
+
+
+class HistogramChild:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля по верхней границе корзины."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами (опционально с метками)."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._children: dict[LabelValues, HistogramChild] = {}
+        if not self.labelnames:
+            self._children[()] = HistogramChild(self.buckets)
+        _registry.append(self)
+
+    def labels(self, *values: str) -> HistogramChild:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = HistogramChild(self.buckets)
+        return child
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    @property
+    def child(self) -> HistogramChild:
+        """Гистограмма без меток."""
+        return self._children[()]
+
+    def children(self) -> dict[LabelValues, HistogramChild]:
+        return dict(self._children)
+
+    def __contains__(self, values: LabelValues) -> bool:
+        return values in self._children
+
+    def __len__(self) -> int:
+        return len(self._children)
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets, child.counts):
+                cumulative += n
+                labels = _format_labels(self.labelnames, values, f'le="{bound}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values, 'le="+Inf"')
+            yield f"{self.name}_bucket{labels} {child.count}"
+            plain = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{plain} {child.total}"
+            yield f"{self.name}_count{plain} {child.count}"
+
+
+class Gauge:
+    """Текущее значение, вычисляемое при сборе (размер пула, очереди и т.п.)."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        read: Callable[[], Optional[float]],
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self._read = read
+        _registry.append(self)
+
+    def collect(self) -> Iterable[str]:
+        value = self._read()
+        if value is None:
+            return
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        yield f"{self.name} {value}"
+
+
+def render() -> str:
+    """Все метрики в текстовом формате Prometheus."""
+    lines: list[str] = []
+    for metric in _registry:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"